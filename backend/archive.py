@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import time
+
+import numpy
+
+from backend import settings
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+)
+from backend.candles import (
+    CandlesArchive,
+)
+from backend.limiter import (
+    Priority,
+)
+
+CONCURRENCY = settings.CLIENT_ARCHIVE_CONCURRENCY
+
+
+def get_pages(
+    start: float,
+    end: float,
+    interval: KLineInterval,
+    limit: int = BybitClient.KLINE_MAX_LIMIT
+) -> list[tuple[float, float]]:
+    """(start, end) of the kline requests covering `[start, end)`.
+
+    Bybit treats both bounds as inclusive milliseconds, every page ends a
+    millisecond before the next one starts.
+    """
+    size = limit * interval.seconds
+    return [
+        (float(page), float(min(page + size, end) - 0.001))
+        for page in numpy.arange(start, end, size)
+    ]
+
+
+async def download(
+    archive: CandlesArchive,
+    symbol: str,
+    interval: KLineInterval,
+    start: float,
+    end: float | None = None,
+    concurrency: int = CONCURRENCY
+) -> int:
+    """Archive the closed candles of `[start, end)` after the archived ones.
+
+    The range is split into pages of `KLINE_MAX_LIMIT` candles fetched
+    concurrently through the client rate limiter. Pages are appended in
+    order as soon as all earlier ones are, so a failed download keeps
+    everything before the failed page.
+    """
+    client = BybitClient()
+    seconds = interval.seconds
+    now = time.time()
+    end = now if end is None else min(end, now)
+    last_start = archive.last_start(symbol, interval.value)
+    if last_start is not None:
+        start = max(start, last_start + seconds)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(page_start: float, page_end: float) -> numpy.ndarray:
+        async with semaphore:
+            return await client.get_klines(
+                symbol=symbol,
+                interval=interval,
+                limit=client.KLINE_MAX_LIMIT,
+                start=page_start,
+                end=page_end,
+                priority=Priority.BACKGROUND,
+                user=('archive', symbol)
+            )
+
+    tasks = [
+        asyncio.ensure_future(fetch(page_start, page_end))
+        for page_start, page_end in get_pages(start, end, interval)
+    ]
+    added = 0
+    try:
+        for task in tasks:
+            values = await task
+            closed = values[:, values[0] + seconds <= now]
+            added += archive.append(symbol, interval.value, closed)
+    finally:
+        for task in tasks:
+            task.cancel()
+        archive.flush()
+    return added
+
+
+async def download_all(args: argparse.Namespace) -> None:
+    archive = CandlesArchive(args.directory)
+    interval = KLineInterval(args.interval)
+    start = time.time() - args.days * 86400.0
+    try:
+        for symbol in args.symbols:
+            started = time.perf_counter()
+            added = await download(
+                archive=archive,
+                symbol=symbol,
+                interval=interval,
+                start=start,
+                concurrency=args.concurrency
+            )
+            print(
+                f'{symbol}: {added} candles added, '
+                f'{archive.read(symbol, interval.value).shape[1]} archived, '
+                f'{time.perf_counter() - started:.1f} s',
+                flush=True
+            )
+    finally:
+        await BybitClient().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m backend.archive',
+        description='Download closed candles into the candle archive.'
+    )
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument(
+        '--directory',
+        default=settings.Enviroment().candles_archive,
+        required=not settings.Enviroment().candles_archive,
+        help='archive directory, CANDLES_ARCHIVE by default'
+    )
+    parser.add_argument(
+        '--interval',
+        default=KLineInterval.minute.value
+    )
+    parser.add_argument(
+        '--days',
+        type=float,
+        default=30.0,
+        help='history to keep, only candles after the archived are fetched'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=CONCURRENCY,
+        help='pages requested at once, the rate limiter still applies'
+    )
+    asyncio.run(download_all(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import argparse
+import datetime
+import json
+import os
+import time
+
+import numpy
+
+from backend.bybit import (
+    KLineInterval,
+)
+from backend.candles import (
+    Candles,
+    CandlesArchive,
+    decode_klines,
+)
+from backend.jobs import (
+    BotJobHelper,
+    BotJobsShell,
+)
+
+
+def load_history(path: str) -> numpy.ndarray:
+    """Candle values, oldest first, from a `.npy` array or Bybit JSON.
+
+    A `.npy` file holds the (7, n) array of `decode_klines`, a JSON file
+    either a kline response or its `result.list` rows.
+    """
+    if path.endswith('.npy'):
+        return numpy.load(path)
+    with open(path) as file:
+        json_candles = json.load(file)
+    if isinstance(json_candles, dict):
+        json_candles = json_candles['result']['list']
+    return decode_klines(json_candles)
+
+
+def resample(
+    values: numpy.ndarray,
+    interval: KLineInterval,
+    target: KLineInterval
+) -> numpy.ndarray:
+    """Candles of `interval` merged into candles of a longer `target`."""
+    if target.seconds == interval.seconds:
+        return values
+    if target.seconds % interval.seconds:
+        raise ValueError(f'can not resample {interval} to {target}')
+    start_time = values[0]
+    bucket = numpy.floor(start_time / target.seconds)
+    first = numpy.flatnonzero(
+        numpy.concatenate(([True], bucket[1:] != bucket[:-1]))
+    )
+    last = numpy.concatenate((first[1:], [len(start_time)])) - 1
+    return numpy.vstack((
+        bucket[first] * target.seconds,
+        values[1, first],
+        numpy.maximum.reduceat(values[2], first),
+        numpy.minimum.reduceat(values[3], first),
+        values[4, last],
+        numpy.add.reduceat(values[5], first),
+        numpy.add.reduceat(values[6], first),
+    ))
+
+
+class Backtest:
+    """Job helpers replayed over candle histories of several symbols.
+
+    Histories are continuous candles of one interval per symbol, they are
+    resampled once to every longer interval a helper asks for.
+    """
+
+    def __init__(
+        self,
+        histories: dict[str, numpy.ndarray],
+        interval: KLineInterval
+    ) -> None:
+        self.histories = histories
+        self.interval = interval
+        self.candles: dict[tuple[str, KLineInterval], Candles] = {}
+
+    def get_candles(self, coin: str, interval: KLineInterval) -> Candles:
+        key = (coin, interval)
+        candles = self.candles.get(key)
+        if candles is None:
+            candles = self.candles[key] = Candles(resample(
+                self.histories[coin],
+                self.interval,
+                interval
+            ))
+        return candles
+
+    def run(self, helper: BotJobHelper) -> list[tuple[float, str]]:
+        coin, interval, _ = helper.get_market()
+        return helper.backtest(self.get_candles(coin, interval))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m backend.backtest',
+        description='Replay jobs over candle histories and print the '
+                    'candle closes they would fire on.'
+    )
+    parser.add_argument(
+        'histories',
+        nargs='+',
+        help='<coin>.npy or <coin>.json candle history files, or symbols '
+             'with --archive'
+    )
+    parser.add_argument(
+        '--archive',
+        help='read the histories from this candle archive directory'
+    )
+    parser.add_argument(
+        '--days',
+        type=float,
+        help='only the latest days of archived histories, all by default'
+    )
+    parser.add_argument(
+        '--interval',
+        default=KLineInterval.minute.value,
+        help='interval of the histories'
+    )
+    parser.add_argument(
+        '--job',
+        action='append',
+        required=True,
+        help='job as for /add, with {coin} for every history: '
+             '"rsi {coin} 30 50"'
+    )
+    parser.add_argument(
+        '--summary',
+        action='store_true',
+        help='print only the fire counts'
+    )
+    args = parser.parse_args()
+    if args.days is not None and not args.days > 0.0:
+        parser.error(f'--days invalid value: {args.days}')
+
+    started = time.perf_counter()
+    if args.archive:
+        archive = CandlesArchive(args.archive, readonly=True)
+        histories = {
+            symbol: archive.read(symbol, args.interval)
+            for symbol in args.histories
+        }
+        if args.days is not None:
+            limit = max(1, int(
+                args.days * 86400.0 / KLineInterval(args.interval).seconds
+            ))
+            histories = {
+                symbol: values[:, -limit:]
+                for symbol, values in histories.items()
+            }
+    else:
+        histories = {
+            os.path.splitext(os.path.basename(path))[0]: load_history(path)
+            for path in args.histories
+        }
+    loaded = time.perf_counter()
+    backtest = Backtest(histories, KLineInterval(args.interval))
+    fired = 0
+    for job in args.job:
+        for coin in histories:
+            params = job.format(coin=coin).split()
+            helper_class = BotJobsShell.get_helper_class(params.pop(0))
+            helper = helper_class(0, *params)
+            report = backtest.run(helper)
+            fired += len(report)
+            print(f'{helper.title}: {len(report)} fires')
+            if args.summary:
+                continue
+            for close_time, message in report:
+                moment = datetime.datetime.fromtimestamp(
+                    close_time,
+                    datetime.timezone.utc
+                )
+                text = message.replace('\n', '; ')
+                print(f'  {moment:%Y-%m-%d %H:%M} {text}')
+    finished = time.perf_counter()
+    bars = sum(values.shape[1] for values in histories.values())
+    print(f'{bars} bars of {len(histories)} symbols loaded in '
+          f'{loaded - started:.2f} s, {fired} fires in '
+          f'{finished - loaded:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from telegram import (
@@ -9,14 +10,30 @@ from telegram.ext import (
     ContextTypes,
 )
 
+from backend import metrics
 from backend import settings
+from backend.bybit import (
+    KLineInterval,
+)
 from backend.exceptions import (
     BotJobsShellError,
-    BybitClientError,
 )
 from backend.jobs import (
-    BotJobHelper,
     BotJobsShell,
+    EvaluationEngine,
+    EvaluationGroup,
+)
+from backend.messages import (
+    MessageScheduler,
+)
+from backend.shards import (
+    ShardsHub,
+)
+from backend.storage import (
+    JobStore,
+)
+from backend.stream import (
+    KlineStream,
 )
 
 logger = logging.getLogger(__name__)
@@ -29,21 +46,91 @@ WEBHOOK_SECRET = env.webhook_secret
 WEBHOOK_PATH = env.webhook_path
 WEBHOOK_CERT = env.webhook_cert
 WEBHOOK_KEY = env.webhook_key
+METRICS_PORT = env.metrics_port
+KLINE_STREAM = settings.BOT_KLINE_STREAM and not settings.BOT_SHARDS
+METRICS_LOG_INTERVAL = settings.BOT_METRICS_LOG_INTERVAL
+
+ERRORS = metrics.Counter(
+    'bot_errors_total',
+    'Errors reported to the application error handler.',
+    ('error',)
+)
 
 
 async def jobs_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
-    job = context.job.data
-    if isinstance(job, BotJobHelper):
-        try:
-            message = await job.execute()
-        except BybitClientError as error:
-            message = f'Baybit API client error: {error}'
-        finally:
-            if message:
-                await context.bot.send_message(
-                    chat_id=context.job.chat_id,
-                    text=message
-                )
+    group = context.job.data
+    if isinstance(group, EvaluationGroup):
+        messages = await EvaluationEngine().evaluate(group)
+        scheduler = context.bot_data['scheduler']
+        for chat_id, message in messages:
+            scheduler.send(chat_id, message)
+
+
+async def candle_close_handler(
+    app: Application,
+    symbol: str,
+    interval: KLineInterval,
+    start_time: float
+) -> None:
+    engine = EvaluationEngine()
+    scheduler = app.bot_data['scheduler']
+    close_time = start_time + interval.seconds
+    for group in engine.get_due_groups(symbol, interval, close_time):
+        messages = await engine.evaluate(group)
+        for chat_id, message in messages:
+            scheduler.send(chat_id, message)
+
+
+async def log_metrics_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        metrics.log_metrics()
+
+
+async def post_init(app: Application) -> None:
+    if METRICS_PORT:
+        app.bot_data['metrics_server'] = metrics.serve(METRICS_PORT)
+    if METRICS_LOG_INTERVAL:
+        app.bot_data['metrics_task'] = asyncio.create_task(
+            log_metrics_periodically(METRICS_LOG_INTERVAL)
+        )
+    scheduler = app.bot_data['scheduler'] = MessageScheduler(app.bot)
+    hub = ShardsHub.get_instance()
+    if hub is not None:
+
+        def send_messages(messages: list[tuple[int, str]]) -> None:
+            for chat_id, message in messages:
+                scheduler.send(chat_id, message)
+
+        await hub.start(send_messages)
+    store = JobStore.get_instance()
+    if store is not None:
+        count = BotJobsShell.restore_jobs(
+            queue=app.job_queue,
+            callback=jobs_callback,
+            store=store
+        )
+        logger.info(f'restored {count} jobs')
+    if KLINE_STREAM:
+        KlineStream().start(
+            lambda symbol, interval, start_time: candle_close_handler(
+                app, symbol, interval, start_time
+            )
+        )
+
+
+async def post_shutdown(app: Application) -> None:
+    if KLINE_STREAM:
+        await KlineStream().stop()
+    hub = ShardsHub.get_instance()
+    if hub is not None:
+        await hub.stop()
+    await app.bot_data['scheduler'].stop()
+    EvaluationEngine().executor.shutdown()
+    if 'metrics_task' in app.bot_data:
+        app.bot_data['metrics_task'].cancel()
+    if 'metrics_server' in app.bot_data:
+        app.bot_data['metrics_server'].stop()
 
 
 async def add_command_handler(
@@ -125,6 +212,7 @@ async def errors_handler(
     context: ContextTypes.DEFAULT_TYPE
 ) -> None:
     error = context.error
+    ERRORS.labels(type(error).__name__).inc()
     text = [str(type(error))]
     while error.__cause__ is not None:
         error = error.__cause__
@@ -133,7 +221,13 @@ async def errors_handler(
 
 
 def build_bot_application() -> Application:
-    app = Application.builder().token(TELEGRAM_TOKEN).build()
+    app = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     app.add_handler(
         CommandHandler('add', add_command_handler)
     )
@@ -1,29 +1,79 @@
 import asyncio
 import enum
+import random
+import time
 from typing import (
     Any,
+    Hashable,
     Self,
 )
 
 import httpx
-from pandas import (
-    DataFrame,
-)
+import numpy
 
 from backend.exceptions import (
+    BybitClientApiError,
     BybitClientConnectionError,
     BybitClientError,
     BybitClientResponseError,
 )
+from backend import metrics
 from backend import settings
 from backend import ta
+from backend.candles import (
+    Candles,
+    CandlesArchive,
+    CandlesBuffer,
+    CandlesCache,
+    CandlesStore,
+    decode_klines,
+)
+from backend.limiter import (
+    Priority,
+    RateLimiter,
+    TokenBucket,
+)
+from backend.streaming import (
+    MarketIndicators,
+)
 
 DEBUG = settings.Enviroment().debug
+API_URL = settings.Enviroment().bybit_api_url
 MAX_PER_SECOND = settings.CLIENT_MAX_PER_SECOND
 MAX_PER_MINUTE = settings.CLIENT_MAX_PER_MINUTE
+CANDLES_STORE_MAX_BYTES = settings.CLIENT_CANDLES_STORE_MAX_BYTES
+RETRY_ATTEMPTS = settings.CLIENT_RETRY_ATTEMPTS
+RETRY_BASE_DELAY = settings.CLIENT_RETRY_BASE_DELAY
+RETRY_MAX_DELAY = settings.CLIENT_RETRY_MAX_DELAY
+SYMBOLS_TTL = settings.CLIENT_SYMBOLS_TTL
+
+REQUEST_SECONDS = metrics.Histogram(
+    'bybit_request_seconds',
+    'BybitClient.get latency including retries.',
+    ('endpoint',)
+)
+REQUEST_RETRIES = metrics.Counter(
+    'bybit_request_retries_total',
+    'Retried Bybit requests.',
+    ('endpoint',)
+)
+REQUEST_ERRORS = metrics.Counter(
+    'bybit_request_errors_total',
+    'BybitClient.get calls failed after retries.',
+    ('endpoint',)
+)
+RATE_LIMIT_WAIT_SECONDS = metrics.Histogram(
+    'bybit_rate_limit_wait_seconds',
+    'Time requests waited for the client rate limiter.'
+)
 
 
 class RateLimitTransport(httpx.AsyncHTTPTransport):
+    """Transport waiting for the rate limiter before every request.
+
+    Requests pick their lane with the `priority` extension and are shared
+    fairly between values of the `user` extension.
+    """
 
     def __init__(
         self,
@@ -31,56 +81,63 @@ class RateLimitTransport(httpx.AsyncHTTPTransport):
         max_per_minute: int,
         **kwargs
     ) -> None:
-        self.loop = asyncio.get_running_loop()
-        self.max_per_second = max_per_second
-        self.max_per_minute = max_per_minute
-        self.second = []
-        self.minute = []
+        buckets = []
+        if max_per_second:
+            buckets.append(TokenBucket(max_per_second, max_per_second))
+        if max_per_minute:
+            buckets.append(TokenBucket(max_per_minute / 60.0, max_per_minute))
+        self.limiter = RateLimiter(buckets)
         super().__init__(**kwargs)
 
-    async def notify_period(
-        self,
-        history: list[float],
-        period: float,
-        max_per_period: int
-    ) -> float:
-        while True:
-            now = self.loop.time()
-            while history and now - history[0] > period:
-                history.pop(0)
-            if len(history) < max_per_period:
-                break
-            await asyncio.sleep(max(0.0, period - (now - history[0])))
-        return now
-
-    async def notify(self):
-        if not self.max_per_second and not self.max_per_minute:
-            return
-        if self.max_per_second:
-            now = await self.notify_period(
-                history=self.second,
-                period=1.0,
-                max_per_period=self.max_per_second
-            )
-        if self.max_per_minute:
-            now = await self.notify_period(
-                history=self.minute,
-                period=60.0,
-                max_per_period=self.max_per_minute
-            )
-        self.second.append(now)
-        self.minute.append(now)
-
     async def handle_async_request(
         self,
         request: httpx.Request
     ) -> httpx.Response:
-        await self.notify()
+        waited = await self.limiter.acquire(
+            priority=request.extensions.get('priority', Priority.BACKGROUND),
+            user=request.extensions.get('user')
+        )
+        RATE_LIMIT_WAIT_SECONDS.observe(waited)
         return await super().handle_async_request(request)
 
-    async def __aenter__(self) -> Self:
-        await self.notify()
-        return await super().__aenter__()
+
+class RetryPolicy:
+    """Exponential backoff with jitter for retryable request errors.
+
+    Network errors, throttling and server errors are retried, other HTTP
+    errors and Bybit `retCode` errors such as an invalid symbol are not.
+    A server provided delay is never shortened.
+    """
+
+    RETRYABLE_STATUS_CODES = {403, 429, 500, 502, 503, 504}
+    RETRYABLE_RET_CODES = {10000, 10002, 10006, 10016}
+
+    def __init__(
+        self,
+        attempts: int,
+        base_delay: float,
+        max_delay: float,
+        jitter: float = 0.5
+    ) -> None:
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            status_code = error.response.status_code
+            return status_code in type(self).RETRYABLE_STATUS_CODES
+        if isinstance(error, BybitClientApiError):
+            return error.ret_code in type(self).RETRYABLE_RET_CODES
+        return isinstance(error, (httpx.TransportError, ValueError))
+
+    def get_delay(self, attempt: int, retry_after: float | None) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay *= random.uniform(1.0 - self.jitter, 1.0)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
 
 
 class KLineInterval(enum.Enum):
@@ -98,6 +155,12 @@ class KLineInterval(enum.Enum):
     hour_x6 = '360'
     hour_x12 = '720'
 
+    @property
+    def seconds(self) -> float:
+        if self.value.isdigit():
+            return int(self.value) * 60.0
+        return {'D': 86400.0, 'W': 604800.0, 'M': 2678400.0}[self.value]
+
 
 class BybitClient:
 
@@ -107,65 +170,95 @@ class BybitClient:
     TEST_HOST = 'api-testnet.bybit.com'
 
     KLINE_ENDPOINT = 'v5/market/kline'
+    INSTRUMENTS_ENDPOINT = 'v5/market/instruments-info'
+
+    RETRY_AFTER_HEADER = 'Retry-After'
+    LIMIT_STATUS_HEADER = 'X-Bapi-Limit-Status'
+    LIMIT_RESET_HEADER = 'X-Bapi-Limit-Reset-Timestamp'
 
     KLINE_MIN_LIMIT = 1
     KLINE_MAX_LIMIT = 1000
+    INSTRUMENTS_MAX_LIMIT = 1000
 
-    START_TIME_COLUMN = 'start_time'
-    OPEN_PRICE_COLUMN = 'open_price'
-    HIGH_PRICE_COLUMN = 'high_price'
-    LOW_PRICE_COLUMN = 'low_price'
-    CLOSE_PRICE_COLUMN = 'close_price'
-    VOLUME_COLUMN = 'volume'
-    TURNOVER_COLUMN = 'turnover'
+    START_TIME_COLUMN = Candles.START_TIME_COLUMN
+    OPEN_PRICE_COLUMN = Candles.OPEN_PRICE_COLUMN
+    HIGH_PRICE_COLUMN = Candles.HIGH_PRICE_COLUMN
+    LOW_PRICE_COLUMN = Candles.LOW_PRICE_COLUMN
+    CLOSE_PRICE_COLUMN = Candles.CLOSE_PRICE_COLUMN
+    VOLUME_COLUMN = Candles.VOLUME_COLUMN
+    TURNOVER_COLUMN = Candles.TURNOVER_COLUMN
 
     @classmethod
-    def rsi(cls, data: DataFrame) -> float:
-        indicator = ta.rsi(data[cls.CLOSE_PRICE_COLUMN])
-        return float(indicator.iloc[-1])
+    def rsi(
+        cls,
+        data: Candles,
+        indicators: MarketIndicators | None = None
+    ) -> float:
+        if indicators is not None:
+            return indicators.rsi
+        return data.memoize('rsi', lambda: float(ta.rsi(data.close)[-1]))
 
     @classmethod
-    def volatility(cls, data: DataFrame) -> float:
-        indicator = ta.volatility(
-            high=data[cls.HIGH_PRICE_COLUMN],
-            low=data[cls.LOW_PRICE_COLUMN],
-            close=data[cls.CLOSE_PRICE_COLUMN]
-        )
-        return float(indicator.iloc[-1])
+    def volatility(
+        cls,
+        data: Candles,
+        indicators: MarketIndicators | None = None
+    ) -> float:
+        if indicators is not None:
+            return indicators.atr
+        return data.memoize('volatility', lambda: float(
+            ta.volatility(
+                high=data.high,
+                low=data.low,
+                close=data.close
+            )[-1]
+        ))
 
     @classmethod
     def flats(
         cls,
-        data: DataFrame,
+        data: Candles,
         max_difference: float,
         min_length: int,
         va: float
     ) -> list[dict[str, float]]:
-        flats = ta.flats(
-            close=data[cls.CLOSE_PRICE_COLUMN],
-            max_difference=max_difference,
-            min_length=min_length
+        return data.memoize(
+            ('flats', max_difference, min_length, va),
+            lambda: ta.value_areas(
+                high=data.high,
+                low=data.low,
+                volume=data.volume,
+                flats=ta.flats(
+                    close=data.close,
+                    max_difference=max_difference,
+                    min_length=min_length
+                ),
+                va=va
+            )
         )
-        result = []
-        if flats:
-            for flat in flats:
-                frame = data.iloc[flat[0]:flat[1]]
-                result.append(ta.poc_val_vah(
-                    high=frame[cls.HIGH_PRICE_COLUMN],
-                    low=frame[cls.LOW_PRICE_COLUMN],
-                    volume=frame[cls.VOLUME_COLUMN],
-                    va=va
-                ))
-        return result
 
     @classmethod
-    def trend(cls, data: DataFrame, length: int = 14) -> int:
-        return ta.trend(
-            high=data[cls.HIGH_PRICE_COLUMN][:-4],
-            low=data[cls.LOW_PRICE_COLUMN][:-4],
-            close=data[cls.CLOSE_PRICE_COLUMN][:-4],
+    def trend(
+        cls,
+        data: Candles,
+        length: int = 14,
+        indicators: MarketIndicators | None = None
+    ) -> int:
+        if indicators is not None:
+            pos, neg = indicators.directions(float(data.start_time[-9]))
+            return ta.trend_change(
+                pos=pos,
+                neg=neg,
+                high=data.high[:-4],
+                low=data.low[:-4],
+                close=data.close[:-4]
+            )
+        return data.memoize(('trend', length), lambda: ta.trend(
+            high=data.high[:-4],
+            low=data.low[:-4],
+            close=data.close[:-4],
             length=length
-        )
+        ))
 
     def __new__(cls) -> Self:
         if cls.__instance is None:
@@ -173,12 +266,36 @@ class BybitClient:
         return cls.__instance
 
     def __init__(self) -> None:
+        if hasattr(self, 'client'):
+            return
         self.host = type(self).TEST_HOST if DEBUG else type(self).HOST
-        self.client = httpx.AsyncClient(
-            transport=RateLimitTransport(
-                max_per_second=MAX_PER_SECOND,
-                max_per_minute=MAX_PER_MINUTE
+        self.url = (API_URL or f'https://{self.host}').rstrip('/')
+        self.retry = RetryPolicy(
+            attempts=RETRY_ATTEMPTS,
+            base_delay=RETRY_BASE_DELAY,
+            max_delay=RETRY_MAX_DELAY
+        )
+        self.transport = RateLimitTransport(
+            max_per_second=MAX_PER_SECOND,
+            max_per_minute=MAX_PER_MINUTE
+        )
+        self.client = httpx.AsyncClient(transport=self.transport)
+        self.cache = CandlesCache()
+        self.store = CandlesStore(CANDLES_STORE_MAX_BYTES)
+        self.archive = CandlesArchive.get_instance()
+        self.symbols: list[str] = []
+        self.symbols_expires = 0.0
+        registry = metrics.MetricsRegistry()
+        registry.add_stats('bybit_candles_cache', lambda: self.cache.stats)
+        registry.add_stats('bybit_candles_store', lambda: self.store.stats)
+        if self.archive is not None:
+            registry.add_stats(
+                'bybit_candles_archive',
+                lambda: self.archive.stats
             )
+        registry.add_stats(
+            'bybit_rate_limiter',
+            lambda: self.transport.limiter.stats
         )
 
     async def close(self) -> None:
@@ -188,15 +305,45 @@ class BybitClient:
         self,
         endpoint: str,
         params: dict[str, Any],
-        countdown: int = 10,
-        sleep: float = 30.0
+        retry: RetryPolicy | None = None,
+        priority: Priority = Priority.BACKGROUND,
+        user: Hashable = None
     ) -> dict[str, Any]:
-        while countdown > 0:
+        started = time.perf_counter()
+        try:
+            return await self.request(
+                endpoint=endpoint,
+                params=params,
+                retry=retry or self.retry,
+                priority=priority,
+                user=user
+            )
+        except Exception:
+            REQUEST_ERRORS.labels(endpoint).inc()
+            raise
+        finally:
+            REQUEST_SECONDS.labels(endpoint).observe(
+                time.perf_counter() - started
+            )
+
+    async def request(
+        self,
+        endpoint: str,
+        params: dict[str, Any],
+        retry: RetryPolicy,
+        priority: Priority,
+        user: Hashable
+    ) -> dict[str, Any]:
+        attempt = 0
+        while True:
+            response = None
             try:
                 response = await self.client.get(
-                    url=f'https://{self.host}/{endpoint}',
-                    params=params
+                    url=f'{self.url}/{endpoint}',
+                    params=params,
+                    extensions={'priority': priority, 'user': user}
                 )
+                self.update_limits(response)
                 status_code = response.status_code
                 if not status_code == httpx.codes.OK:
                     raise httpx.HTTPStatusError(
@@ -204,48 +351,216 @@ class BybitClient:
                         request=response.request,
                         response=response
                     )
-            except Exception:
-                countdown -= 1
-                await asyncio.sleep(sleep)
+                json = response.json()
+                ret_code = json.get('retCode', 0)
+                if ret_code:
+                    raise BybitClientApiError(ret_code, json.get('retMsg'))
+            except Exception as error:
+                attempt += 1
+                if not retry.is_retryable(error):
+                    if isinstance(error, BybitClientApiError):
+                        raise
+                    raise BybitClientConnectionError() from error
+                if attempt >= retry.attempts:
+                    raise BybitClientConnectionError() from error
+                REQUEST_RETRIES.labels(endpoint).inc()
+                await asyncio.sleep(retry.get_delay(
+                    attempt=attempt,
+                    retry_after=self.get_retry_after(response)
+                ))
             else:
-                return response.json()
-        else:
-            raise BybitClientConnectionError()
+                return json
+
+    def update_limits(self, response: httpx.Response) -> None:
+        headers = response.headers
+        try:
+            remaining = int(headers[self.LIMIT_STATUS_HEADER])
+            reset = int(headers[self.LIMIT_RESET_HEADER]) / 1000.0
+        except (KeyError, ValueError):
+            return
+        self.transport.limiter.adjust(
+            remaining=remaining,
+            reset_in=reset - time.time()
+        )
+
+    def get_retry_after(self, response: httpx.Response | None) -> float | None:
+        if response is None:
+            return None
+        headers = response.headers
+        try:
+            if self.RETRY_AFTER_HEADER in headers:
+                return float(headers[self.RETRY_AFTER_HEADER])
+            if headers.get(self.LIMIT_STATUS_HEADER) == '0':
+                reset = int(headers[self.LIMIT_RESET_HEADER]) / 1000.0
+                return reset - time.time()
+        except (KeyError, ValueError):
+            pass
+        return None
+
+    async def get_symbols(
+        self,
+        priority: Priority = Priority.BACKGROUND,
+        user: Hashable = None
+    ) -> list[str]:
+        """Trading linear symbols, cached for `SYMBOLS_TTL` seconds."""
+        if time.time() < self.symbols_expires:
+            return self.symbols
+        symbols = []
+        cursor = None
+        while True:
+            params = {
+                'category': 'linear',
+                'limit': self.INSTRUMENTS_MAX_LIMIT,
+            }
+            if cursor:
+                params['cursor'] = cursor
+            json = await self.get(
+                endpoint=self.INSTRUMENTS_ENDPOINT,
+                params=params,
+                priority=priority,
+                user=user
+            )
+            try:
+                result = json['result']
+                symbols.extend(
+                    instrument['symbol'] for instrument in result['list']
+                    if instrument.get('status') == 'Trading'
+                )
+                cursor = result.get('nextPageCursor')
+            except Exception as error:
+                raise BybitClientResponseError() from error
+            if not cursor:
+                break
+        self.symbols = symbols
+        self.symbols_expires = time.time() + SYMBOLS_TTL
+        return symbols
 
     async def get_candles(
         self,
         symbol: str,
         interval: KLineInterval,
-        limit: int
-    ) -> DataFrame:
+        limit: int,
+        priority: Priority = Priority.BACKGROUND,
+        user: Hashable = None
+    ) -> Candles:
         if limit < self.KLINE_MIN_LIMIT or limit > self.KLINE_MAX_LIMIT:
             raise BybitClientError(f'limit invalid value: {limit}')
+        return await self.cache.get(
+            key=(symbol, interval, limit),
+            loader=lambda: self.fetch_candles(
+                symbol, interval, limit, priority, user
+            ),
+            expires=lambda data: float(data.start_time[-1]) + interval.seconds
+        )
+
+    async def fetch_candles(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        limit: int,
+        priority: Priority = Priority.BACKGROUND,
+        user: Hashable = None
+    ) -> Candles:
+        key = (symbol, interval)
+        buffer = self.store.get(key)
+        if buffer is None:
+            buffer = self.load_candles(symbol, interval, limit)
+        if buffer is not None and buffer.size >= limit:
+            if buffer.live:
+                return Candles(buffer.window(limit))
+            start = buffer.last_start
+            missing = int((time.time() - start) // interval.seconds) + 1
+            if missing <= self.KLINE_MAX_LIMIT:
+                values = await self.get_klines(
+                    symbol=symbol,
+                    interval=interval,
+                    limit=missing,
+                    start=start,
+                    priority=priority,
+                    user=user
+                )
+                if values.shape[1] and values[0, 0] == start:
+                    buffer.merge(values)
+                    self.save_candles(symbol, interval, values[:, :-1])
+                    return Candles(buffer.window(limit))
+        values = await self.get_klines(
+            symbol=symbol,
+            interval=interval,
+            limit=limit,
+            priority=priority,
+            user=user
+        )
+        if not values.shape[1] == limit:
+            raise BybitClientResponseError()
+        self.store.put(key, CandlesBuffer.from_values(values))
+        self.save_candles(symbol, interval, values[:, :-1])
+        return Candles(values)
+
+    def load_candles(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        limit: int
+    ) -> CandlesBuffer | None:
+        """Candle buffer seeded with the latest archived candles."""
+        if self.archive is None:
+            return None
+        values = self.archive.window(symbol, interval.value, limit)
+        if values.shape[1] < limit:
+            return None
+        buffer = CandlesBuffer.from_values(values)
+        self.store.put((symbol, interval), buffer)
+        return buffer
+
+    def save_candles(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        values: numpy.ndarray
+    ) -> None:
+        """Archive closed candles continuing the archived ones.
+
+        Candles after a gap are left to `backend.archive` downloads.
+        """
+        if self.archive is None or not values.shape[1]:
+            return
+        last_start = self.archive.last_start(symbol, interval.value)
+        if last_start is not None and (
+            values[0, 0] > last_start + interval.seconds
+        ):
+            return
+        self.archive.append(symbol, interval.value, values)
+
+    async def get_klines(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        limit: int,
+        start: float | None = None,
+        end: float | None = None,
+        priority: Priority = Priority.BACKGROUND,
+        user: Hashable = None
+    ) -> numpy.ndarray:
+        params = {
+            'category': 'linear',
+            'symbol': symbol,
+            'interval': interval.value,
+            'limit': limit,
+        }
+        if start is not None:
+            params['start'] = int(start * 1000)
+        if end is not None:
+            params['end'] = int(end * 1000)
         json = await self.get(
             endpoint=self.KLINE_ENDPOINT,
-            params={
-                'category': 'linear',
-                'symbol': symbol,
-                'interval': interval.value,
-                'limit': limit,
-            }
+            params=params,
+            priority=priority,
+            user=user
         )
         try:
             json_candles = json['result']['list']
-            if not len(json_candles) == limit:
-                raise BybitClientResponseError()
-            candles = [
-                {
-                    type(self).START_TIME_COLUMN: float(candle[0]) / 1000.0,
-                    type(self).OPEN_PRICE_COLUMN: float(candle[1]),
-                    type(self).HIGH_PRICE_COLUMN: float(candle[2]),
-                    type(self).LOW_PRICE_COLUMN: float(candle[3]),
-                    type(self).CLOSE_PRICE_COLUMN: float(candle[4]),
-                    type(self).VOLUME_COLUMN: float(candle[5]),
-                    type(self).TURNOVER_COLUMN: float(candle[6]),
-                }
-                for candle in reversed(json_candles)
-            ]
+            values = decode_klines(json_candles)
         except Exception as error:
             raise BybitClientResponseError() from error
         else:
-            return DataFrame(candles)
+            return values
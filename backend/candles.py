@@ -0,0 +1,549 @@
+import asyncio
+from collections import (
+    OrderedDict,
+)
+from itertools import (
+    chain,
+)
+import os
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Hashable,
+    Self,
+)
+
+import numpy
+
+if TYPE_CHECKING:
+    from pandas import (
+        DataFrame,
+        Series,
+    )
+
+from backend import settings
+
+
+COLUMNS_COUNT = 7
+
+
+def decode_klines(json_candles: list[list[str]]) -> numpy.ndarray:
+    """Decode `result.list` of a kline response in a single pass.
+
+    Bybit returns candles newest first. The result has one contiguous
+    float64 row per column with candles in ascending order and the start
+    time converted to seconds.
+    """
+    count = len(json_candles)
+    values = numpy.fromiter(
+        chain.from_iterable(
+            candle[:COLUMNS_COUNT] for candle in reversed(json_candles)
+        ),
+        dtype=numpy.float64,
+        count=count * COLUMNS_COUNT
+    ).reshape(count, COLUMNS_COUNT).T.copy()
+    values[0] /= 1000.0
+    return values
+
+
+class Candles:
+    """Columnar candles backed by float64 arrays.
+
+    pandas is imported and a `DataFrame` built only on first access to
+    `frame` or to a column by name.
+    """
+
+    __slots__ = ('__values', '__frame', '__memo')
+
+    START_TIME_COLUMN = 'start_time'
+    OPEN_PRICE_COLUMN = 'open_price'
+    HIGH_PRICE_COLUMN = 'high_price'
+    LOW_PRICE_COLUMN = 'low_price'
+    CLOSE_PRICE_COLUMN = 'close_price'
+    VOLUME_COLUMN = 'volume'
+    TURNOVER_COLUMN = 'turnover'
+
+    COLUMNS = (
+        START_TIME_COLUMN,
+        OPEN_PRICE_COLUMN,
+        HIGH_PRICE_COLUMN,
+        LOW_PRICE_COLUMN,
+        CLOSE_PRICE_COLUMN,
+        VOLUME_COLUMN,
+        TURNOVER_COLUMN,
+    )
+
+    def __init__(self, values: numpy.ndarray) -> None:
+        self.__values = values
+        self.__frame = None
+        self.__memo = {}
+
+    def __len__(self) -> int:
+        return self.__values.shape[1]
+
+    def __getitem__(self, column: str) -> 'Series':
+        return self.frame[column]
+
+    def memoize(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """Compute a value derived from these candles only once."""
+        if key not in self.__memo:
+            self.__memo[key] = function()
+        return self.__memo[key]
+
+    @property
+    def values(self) -> numpy.ndarray:
+        return self.__values
+
+    @property
+    def start_time(self) -> numpy.ndarray:
+        return self.__values[0]
+
+    @property
+    def open(self) -> numpy.ndarray:
+        return self.__values[1]
+
+    @property
+    def high(self) -> numpy.ndarray:
+        return self.__values[2]
+
+    @property
+    def low(self) -> numpy.ndarray:
+        return self.__values[3]
+
+    @property
+    def close(self) -> numpy.ndarray:
+        return self.__values[4]
+
+    @property
+    def volume(self) -> numpy.ndarray:
+        return self.__values[5]
+
+    @property
+    def turnover(self) -> numpy.ndarray:
+        return self.__values[6]
+
+    @property
+    def frame(self) -> 'DataFrame':
+        if self.__frame is None:
+            import pandas
+            self.__frame = pandas.DataFrame(
+                dict(zip(type(self).COLUMNS, self.__values))
+            )
+        return self.__frame
+
+
+class CandlesCache:
+    """Shared cache of kline responses with single-flight loading.
+
+    Concurrent callers asking for the same key wait on one in-flight
+    request. Cached values are shared between callers and must not be
+    modified.
+    """
+
+    def __init__(self) -> None:
+        self.__entries: dict[Hashable, tuple[float, Any]] = {}
+        self.__pending: dict[Hashable, asyncio.Future] = {}
+        self.__hits = 0
+        self.__misses = 0
+        self.__coalesced = 0
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        expires: Callable[[Any], float]
+    ) -> Any:
+        entry = self.__entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if time.time() < expires_at:
+                self.__hits += 1
+                return value
+            del self.__entries[key]
+        pending = self.__pending.get(key)
+        if pending is not None:
+            self.__coalesced += 1
+            return await asyncio.shield(pending)
+        self.__misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.__pending[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            future.exception()
+            raise
+        else:
+            self.__entries[key] = (expires(value), value)
+            future.set_result(value)
+            return value
+        finally:
+            del self.__pending[key]
+
+    def peek(self, key: Hashable) -> Any | None:
+        """Cached value if still valid, never loads nor counts."""
+        entry = self.__entries.get(key)
+        if entry is not None and time.time() < entry[0]:
+            return entry[1]
+        return None
+
+    def clear(self) -> None:
+        self.__entries.clear()
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def coalesced(self) -> int:
+        return self.__coalesced
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.__hits,
+            'misses': self.__misses,
+            'coalesced': self.__coalesced,
+            'entries': len(self.__entries),
+        }
+
+
+class CandlesBuffer:
+    """Ring buffer with the latest candles of one (symbol, interval).
+
+    Values are stored column-wise, the first column is the candle start
+    time in seconds. The last stored candle may still be forming and is
+    overwritten by a newer version of the same candle.
+    """
+
+    @classmethod
+    def from_values(cls, values: numpy.ndarray) -> Self:
+        buffer = cls(values.shape[1])
+        buffer.merge(values)
+        return buffer
+
+    def __init__(self, capacity: int) -> None:
+        self.__values = numpy.empty(
+            (COLUMNS_COUNT, capacity),
+            dtype=numpy.float64
+        )
+        self.__size = 0
+        self.__head = 0
+        self.live = False
+
+    def merge(self, values: numpy.ndarray) -> None:
+        if self.__size:
+            last_start = self.last_start
+            values = values[:, values[0] >= last_start]
+            if values.shape[1] and values[0, 0] == last_start:
+                self.__values[:, (self.__head - 1) % self.capacity] = (
+                    values[:, 0]
+                )
+                values = values[:, 1:]
+        count = values.shape[1]
+        if not count:
+            return
+        if count > self.capacity:
+            values = values[:, -self.capacity:]
+            count = self.capacity
+        indices = (self.__head + numpy.arange(count)) % self.capacity
+        self.__values[:, indices] = values
+        self.__head = (self.__head + count) % self.capacity
+        self.__size = min(self.__size + count, self.capacity)
+
+    def window(self, limit: int) -> numpy.ndarray:
+        limit = min(limit, self.__size)
+        indices = (self.__head - limit + numpy.arange(limit)) % self.capacity
+        return self.__values[:, indices]
+
+    @property
+    def capacity(self) -> int:
+        return self.__values.shape[1]
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def last_start(self) -> float:
+        return float(self.__values[0, (self.__head - 1) % self.capacity])
+
+    @property
+    def nbytes(self) -> int:
+        return self.__values.nbytes
+
+
+class CandlesStore:
+    """Candle buffers per (symbol, interval) within a memory budget.
+
+    When the budget is exceeded the least recently used buffers are
+    evicted. A zero budget disables the store.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.__max_bytes = max_bytes
+        self.__buffers: OrderedDict[Hashable, CandlesBuffer] = OrderedDict()
+        self.__nbytes = 0
+        self.__evictions = 0
+
+    def get(self, key: Hashable) -> CandlesBuffer | None:
+        buffer = self.__buffers.get(key)
+        if buffer is not None:
+            self.__buffers.move_to_end(key)
+        return buffer
+
+    def put(self, key: Hashable, buffer: CandlesBuffer) -> None:
+        if buffer.nbytes > self.__max_bytes:
+            return
+        self.remove(key)
+        self.__buffers[key] = buffer
+        self.__nbytes += buffer.nbytes
+        while self.__nbytes > self.__max_bytes:
+            _, evicted = self.__buffers.popitem(last=False)
+            self.__nbytes -= evicted.nbytes
+            self.__evictions += 1
+
+    def remove(self, key: Hashable) -> None:
+        buffer = self.__buffers.pop(key, None)
+        if buffer is not None:
+            self.__nbytes -= buffer.nbytes
+
+    @property
+    def nbytes(self) -> int:
+        return self.__nbytes
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'buffers': len(self.__buffers),
+            'nbytes': self.__nbytes,
+            'evictions': self.__evictions,
+        }
+
+
+class CandlesColumns:
+    """Append-only candle columns of one (symbol, interval) in a file.
+
+    The file is a 64 byte header followed by `COLUMNS_COUNT` float64
+    columns of `capacity` values, all mapped into memory. Rows are only
+    appended and the row count is written after the rows, so a reader
+    never sees a partial row. The reserved tail of every column stays
+    sparse on disk. A full file is copied once into a file twice as
+    large and the old one is marked as moved for readers still mapping it.
+    """
+
+    MAGIC = int.from_bytes(b'CANDLES1', 'little')
+    HEADER_SIZE = 8
+    MAGIC_FIELD = 0
+    CAPACITY_FIELD = 1
+    COUNT_FIELD = 2
+    MOVED_FIELD = 3
+    DEFAULT_CAPACITY = 1 << 16
+
+    @classmethod
+    def create(cls, path: str, capacity: int) -> None:
+        with open(path, 'wb') as file:
+            file.truncate(8 * (cls.HEADER_SIZE + COLUMNS_COUNT * capacity))
+        header = numpy.memmap(
+            path,
+            dtype=numpy.int64,
+            mode='r+',
+            shape=(cls.HEADER_SIZE,)
+        )
+        header[cls.MAGIC_FIELD] = cls.MAGIC
+        header[cls.CAPACITY_FIELD] = capacity
+        header.flush()
+
+    def __init__(
+        self,
+        path: str,
+        readonly: bool = False,
+        capacity: int = DEFAULT_CAPACITY
+    ) -> None:
+        if not readonly and not os.path.exists(path):
+            type(self).create(path, capacity)
+        self.__path = path
+        self.__mode = 'r' if readonly else 'r+'
+        self.open()
+
+    def open(self) -> None:
+        header = numpy.memmap(
+            self.__path,
+            dtype=numpy.int64,
+            mode=self.__mode,
+            shape=(type(self).HEADER_SIZE,)
+        )
+        if not header[type(self).MAGIC_FIELD] == type(self).MAGIC:
+            raise ValueError(f'not a candles archive: {self.__path}')
+        self.__header = header
+        self.__values = numpy.memmap(
+            self.__path,
+            dtype=numpy.float64,
+            mode=self.__mode,
+            offset=8 * type(self).HEADER_SIZE,
+            shape=(COLUMNS_COUNT, int(header[type(self).CAPACITY_FIELD]))
+        )
+
+    def append(self, values: numpy.ndarray) -> int:
+        """Append candles newer than the last stored one."""
+        count = self.count
+        if count:
+            values = values[:, values[0] > self.__values[0, count - 1]]
+        added = values.shape[1]
+        if not added:
+            return 0
+        if count + added > self.capacity:
+            self.grow(max(2 * self.capacity, count + added))
+        self.__values[:, count:count + added] = values
+        self.__header[type(self).COUNT_FIELD] = count + added
+        return added
+
+    def grow(self, capacity: int) -> None:
+        count = self.count
+        path = f'{self.__path}.tmp'
+        type(self).create(path, capacity)
+        columns = type(self)(path)
+        columns.__values[:, :count] = self.__values[:, :count]
+        columns.__header[type(self).COUNT_FIELD] = count
+        columns.flush()
+        os.replace(path, self.__path)
+        self.__header[type(self).MOVED_FIELD] = 1
+        self.flush()
+        self.open()
+
+    def flush(self) -> None:
+        self.__values.flush()
+        self.__header.flush()
+
+    @property
+    def values(self) -> numpy.ndarray:
+        """All stored candles, a view of the mapped file."""
+        if self.__header[type(self).MOVED_FIELD]:
+            self.open()
+        return numpy.asarray(self.__values[:, :self.count])
+
+    @property
+    def capacity(self) -> int:
+        return self.__values.shape[1]
+
+    @property
+    def count(self) -> int:
+        return int(self.__header[type(self).COUNT_FIELD])
+
+    @property
+    def last_start(self) -> float | None:
+        count = self.count
+        if not count:
+            return None
+        return float(self.__values[0, count - 1])
+
+
+class CandlesArchive:
+    """Directory of `CandlesColumns` files, one per (symbol, interval).
+
+    Only closed candles are archived, start times are strictly ascending.
+    Intervals are given by their Bybit value such as `'1'` or `'D'`.
+    """
+
+    __instance: Self = None
+
+    SUFFIX = '.candles'
+
+    @classmethod
+    def get_instance(cls) -> Self | None:
+        directory = settings.Enviroment.get_instance().candles_archive
+        if not directory:
+            return None
+        if cls.__instance is None:
+            cls.__instance = cls(directory)
+        return cls.__instance
+
+    def __init__(self, directory: str, readonly: bool = False) -> None:
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self.__directory = directory
+        self.__readonly = readonly
+        self.__columns: dict[tuple[str, str], CandlesColumns] = {}
+        self.__appended = 0
+
+    def get_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(
+            self.__directory,
+            f'{symbol}_{interval}{type(self).SUFFIX}'
+        )
+
+    def get_columns(
+        self,
+        symbol: str,
+        interval: str,
+        create: bool = False
+    ) -> CandlesColumns | None:
+        key = (symbol, interval)
+        columns = self.__columns.get(key)
+        if columns is None:
+            path = self.get_path(symbol, interval)
+            if not create and not os.path.exists(path):
+                return None
+            columns = self.__columns[key] = CandlesColumns(
+                path,
+                readonly=self.__readonly
+            )
+        return columns
+
+    def keys(self) -> list[tuple[str, str]]:
+        suffix = type(self).SUFFIX
+        return sorted(
+            tuple(name[:-len(suffix)].rsplit('_', 1))
+            for name in os.listdir(self.__directory)
+            if name.endswith(suffix)
+        )
+
+    def read(self, symbol: str, interval: str) -> numpy.ndarray:
+        columns = self.get_columns(symbol, interval)
+        if columns is None:
+            return numpy.empty((COLUMNS_COUNT, 0), dtype=numpy.float64)
+        return columns.values
+
+    def window(self, symbol: str, interval: str, limit: int) -> numpy.ndarray:
+        values = self.read(symbol, interval)
+        return values[:, max(0, values.shape[1] - limit):]
+
+    def last_start(self, symbol: str, interval: str) -> float | None:
+        columns = self.get_columns(symbol, interval)
+        return None if columns is None else columns.last_start
+
+    def append(
+        self,
+        symbol: str,
+        interval: str,
+        values: numpy.ndarray
+    ) -> int:
+        if not values.shape[1]:
+            return 0
+        added = self.get_columns(symbol, interval, create=True).append(values)
+        self.__appended += added
+        return added
+
+    def flush(self) -> None:
+        for columns in self.__columns.values():
+            columns.flush()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'files': len(self.__columns),
+            'rows': sum(
+                columns.count for columns in self.__columns.values()
+            ),
+            'appended': self.__appended,
+        }
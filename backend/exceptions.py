@@ -18,6 +18,16 @@ class BybitClientResponseError(BybitClientError):
         return type(self).MESSAGE
 
 
+class BybitClientApiError(BybitClientError):
+
+    def __init__(self, ret_code: int, ret_msg: str) -> None:
+        self.ret_code = ret_code
+        self.ret_msg = ret_msg
+
+    def __str__(self) -> str:
+        return f'{self.ret_msg} (retCode {self.ret_code})'
+
+
 class BotJobsShellError(Exception):
 
     def __init__(self, message: str) -> None:
@@ -0,0 +1,139 @@
+import asyncio
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+import importlib
+import multiprocessing
+from multiprocessing.shared_memory import (
+    SharedMemory,
+)
+import os
+from typing import (
+    Any,
+    Callable,
+)
+
+import numpy
+
+THREAD = 'thread'
+PROCESS = 'process'
+
+
+def call_shared(
+    function: Callable[..., Any],
+    name: str,
+    shape: tuple[int, ...],
+    *args: Any
+) -> Any:
+    """Call `function(values, *args)` on values in shared memory.
+
+    Runs in a worker process. The result must not keep references to the
+    values, the memory is closed when the function returns.
+    """
+    memory = SharedMemory(name=name)
+    try:
+        values = numpy.ndarray(shape, dtype=numpy.float64, buffer=memory.buf)
+        try:
+            return function(values, *args)
+        finally:
+            del values
+    finally:
+        memory.close()
+
+
+class IndicatorsExecutor:
+    """Pool computing indicators on candle values off the event loop.
+
+    `kind` is `thread` or `process` for a pool of `workers`, by default
+    one per core, empty to run functions inline on the loop. Process
+    workers get the values through shared memory, one copy per task, and
+    import `backend.jobs` when started.
+    """
+
+    def __init__(self, kind: str = '', workers: int = 0) -> None:
+        if kind not in ('', THREAD, PROCESS):
+            raise ValueError(f'indicators executor invalid value: {kind}')
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.__executor: Executor | None = None
+        self.__tasks = 0
+        self.__running = 0
+        self.__shared_bytes = 0
+
+    def get_executor(self) -> Executor | None:
+        if self.__executor is None:
+            if self.kind == THREAD:
+                self.__executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='indicators'
+                )
+            elif self.kind == PROCESS:
+                self.__executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('forkserver'),
+                    initializer=importlib.import_module,
+                    initargs=('backend.jobs',)
+                )
+        return self.__executor
+
+    async def run(
+        self,
+        function: Callable[..., Any],
+        values: numpy.ndarray,
+        *args: Any
+    ) -> Any:
+        """`function(values, *args)` computed by the pool.
+
+        Several jobs are meant to share one call, every call to a process
+        pool copies `values` to shared memory once.
+        """
+        executor = self.get_executor()
+        if executor is None:
+            return function(values, *args)
+        loop = asyncio.get_running_loop()
+        self.__tasks += 1
+        self.__running += 1
+        try:
+            if self.kind == THREAD:
+                return await loop.run_in_executor(
+                    executor, function, values, *args
+                )
+            memory = SharedMemory(create=True, size=max(1, values.nbytes))
+            try:
+                shared = numpy.ndarray(
+                    values.shape,
+                    dtype=numpy.float64,
+                    buffer=memory.buf
+                )
+                shared[:] = values
+                del shared
+                self.__shared_bytes += values.nbytes
+                return await loop.run_in_executor(
+                    executor,
+                    call_shared,
+                    function,
+                    memory.name,
+                    values.shape,
+                    *args
+                )
+            finally:
+                memory.close()
+                memory.unlink()
+        finally:
+            self.__running -= 1
+
+    def shutdown(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'workers': self.workers if self.kind else 0,
+            'tasks': self.__tasks,
+            'running': self.__running,
+            'shared_bytes': self.__shared_bytes,
+        }
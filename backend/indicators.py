@@ -0,0 +1,135 @@
+"""RSI, ATR and ADX over float64 arrays, without pandas.
+
+Every function takes arrays of shape `(..., bars)` and computes along the
+last axis, so a `(symbols, bars)` array is evaluated for all symbols in
+one call. Results match `pandas_ta` bar for bar, NaN where it has no
+value yet.
+"""
+import math
+import sys
+
+import numpy
+
+RMA_BLOCK = 64
+RMA_MAX_SCALE = 1e12
+EPSILON = sys.float_info.epsilon
+
+
+def shift(values: numpy.ndarray) -> numpy.ndarray:
+    """Values of the previous bar, NaN for the first one."""
+    result = numpy.empty_like(values)
+    result[..., 0] = numpy.nan
+    result[..., 1:] = values[..., :-1]
+    return result
+
+
+def rma(values: numpy.ndarray, length: int) -> numpy.ndarray:
+    """`pandas_ta.rma`: mean with weights decaying by `1 - 1 / length`.
+
+    Weights follow absolute bar positions and NaN bars are left out, as
+    in `pandas.Series.ewm(adjust=True)`. The weighted sums are cumulative
+    sums of values scaled by growing powers of the decay, restarted every
+    block so the scale stays small.
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    valid = ~numpy.isnan(values)
+    decay = 1.0 - 1.0 / length
+    if decay <= 0.0:
+        # the latest value only, kept over NaN bars
+        index = numpy.where(valid, numpy.arange(values.shape[-1]), 0)
+        numpy.maximum.accumulate(index, axis=-1, out=index)
+        result = numpy.take_along_axis(values, index, axis=-1)
+        result[numpy.cumsum(valid, axis=-1) < 1] = numpy.nan
+        return result
+    data = numpy.where(valid, values, 0.0)
+    weights = valid.astype(numpy.float64)
+    block = RMA_BLOCK
+    if decay ** block < 1.0 / RMA_MAX_SCALE:
+        block = max(1, int(math.log(1.0 / RMA_MAX_SCALE, decay)))
+    powers = decay ** numpy.arange(block, dtype=numpy.float64)
+    scales = 1.0 / powers
+    sums = numpy.empty_like(data)
+    totals = numpy.empty_like(data)
+    carry_sum = numpy.zeros(data.shape[:-1])
+    carry_total = numpy.zeros(data.shape[:-1])
+    size = data.shape[-1]
+    for start in range(0, size, block):
+        stop = min(start + block, size)
+        power = powers[:stop - start]
+        scale = scales[:stop - start]
+        sums[..., start:stop] = power * (
+            numpy.cumsum(data[..., start:stop] * scale, axis=-1) +
+            decay * carry_sum[..., None]
+        )
+        totals[..., start:stop] = power * (
+            numpy.cumsum(weights[..., start:stop] * scale, axis=-1) +
+            decay * carry_total[..., None]
+        )
+        carry_sum = sums[..., stop - 1]
+        carry_total = totals[..., stop - 1]
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        result = sums / totals
+    result[numpy.cumsum(valid, axis=-1) < length] = numpy.nan
+    return result
+
+
+def rsi(close: numpy.ndarray, length: int = 14) -> numpy.ndarray:
+    close = numpy.asarray(close, dtype=numpy.float64)
+    difference = close - shift(close)
+    positive = rma(numpy.maximum(difference, 0.0), length)
+    negative = rma(numpy.maximum(-difference, 0.0), length)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        return 100.0 * positive / (positive + negative)
+
+
+def true_range(
+    high: numpy.ndarray,
+    low: numpy.ndarray,
+    close: numpy.ndarray
+) -> numpy.ndarray:
+    """`pandas_ta.true_range`, with its epsilon on zero high-low ranges."""
+    high = numpy.asarray(high, dtype=numpy.float64)
+    low = numpy.asarray(low, dtype=numpy.float64)
+    close = numpy.asarray(close, dtype=numpy.float64)
+    ranges = high - low
+    ranges = ranges + EPSILON * (ranges == 0.0).any(axis=-1, keepdims=True)
+    previous = shift(close)
+    result = numpy.maximum(
+        numpy.abs(ranges),
+        numpy.maximum(numpy.abs(high - previous), numpy.abs(low - previous))
+    )
+    result[..., 0] = numpy.nan
+    return result
+
+
+def atr(
+    high: numpy.ndarray,
+    low: numpy.ndarray,
+    close: numpy.ndarray,
+    length: int = 14
+) -> numpy.ndarray:
+    return rma(true_range(high, low, close), length)
+
+
+def adx(
+    high: numpy.ndarray,
+    low: numpy.ndarray,
+    close: numpy.ndarray,
+    length: int = 14
+) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """ADX, +DI and -DI, the columns of `pandas_ta.adx`."""
+    high = numpy.asarray(high, dtype=numpy.float64)
+    low = numpy.asarray(low, dtype=numpy.float64)
+    up = high - shift(high)
+    down = shift(low) - low
+    positive = numpy.where((up > down) & (up > 0.0), up, 0.0)
+    negative = numpy.where((down > up) & (down > 0.0), down, 0.0)
+    for moves in (positive, negative):
+        moves[numpy.abs(moves) < EPSILON] = 0.0
+        moves[..., 0] = numpy.nan
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        scale = 100.0 / atr(high, low, close, length)
+        plus = scale * rma(positive, length)
+        minus = scale * rma(negative, length)
+        dx = 100.0 * numpy.abs(plus - minus) / (plus + minus)
+    return rma(dx, length), plus, minus
@@ -1,9 +1,19 @@
+import asyncio
+import fnmatch
+import logging
+import time
+import traceback
 from typing import (
     Coroutine,
+    Iterator,
+    Self,
     Type,
 )
+import zlib
 
+import numpy
 from telegram.ext import (
+    Job,
     JobQueue,
 )
 
@@ -11,18 +21,138 @@ from backend.bybit import (
     BybitClient,
     KLineInterval,
 )
+from backend.candles import (
+    Candles,
+)
 from backend.exceptions import (
     BotJobsShellError,
+    BybitClientError,
+)
+from backend.executor import (
+    IndicatorsExecutor,
 )
+from backend import metrics
 from backend import settings
+from backend import ta
+from backend.storage import (
+    JobStore,
+)
+from backend.shards import (
+    FetcherClient,
+    ShardsHub,
+)
+from backend.stream import (
+    KlineStream,
+)
+from backend.streaming import (
+    IndicatorsRegistry,
+    MarketIndicators,
+)
+
+logger = logging.getLogger(__name__)
 
 RSI_INTERVAL = settings.BOT_RSI_JOB_INTERVAL
 VOLATILITY_INTERVAL = settings.BOT_VOLATILITY_JOB_INTERVAL
 FLATS_INTERVAL = settings.BOT_FLATS_JOB_INTERVAL
 TREND_INTERVAL = settings.BOT_TREND_JOB_INTERVAL
+STREAMING_INDICATORS = settings.BOT_STREAMING_INDICATORS
+KLINE_STREAM = settings.BOT_KLINE_STREAM and not settings.BOT_SHARDS
+SCANNER_CONCURRENCY = settings.BOT_SCANNER_CONCURRENCY
+INDICATORS_EXECUTOR = settings.BOT_INDICATORS_EXECUTOR
+INDICATORS_WORKERS = settings.BOT_INDICATORS_WORKERS
+SCHEDULE_ALIGNED = settings.BOT_SCHEDULE_ALIGNED
+SCHEDULE_SETTLE = settings.BOT_SCHEDULE_SETTLE
+SCHEDULE_JITTER = settings.BOT_SCHEDULE_JITTER
+SKIP_UNCHANGED = settings.BOT_SKIP_UNCHANGED
+
+JOB_SECONDS = metrics.Histogram(
+    'bot_job_evaluate_seconds',
+    'Evaluation time of one job on fetched candles.',
+    ('job',),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+             0.05, 0.1, 0.25, 1.0)
+)
+GROUP_SECONDS = metrics.Histogram(
+    'bot_group_seconds',
+    'Evaluation group run time including the candles fetch.'
+)
+GROUP_LATENESS_SECONDS = metrics.Histogram(
+    'bot_group_lateness_seconds',
+    'Delay of evaluation group runs past their job interval.',
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+)
+GROUP_OVERLAPS = metrics.Counter(
+    'bot_group_overlaps_total',
+    'Evaluation group runs started before the previous run finished.'
+)
+GROUP_RUNS = metrics.Counter(
+    'bot_group_runs_total',
+    'Evaluation group runs: evaluated, unchanged when skipped before the '
+    'fetch while the next candle is forming, fetched when skipped as the '
+    'fetched window has no new closed candle.',
+    ('result',)
+)
+GROUP_SKIP_RATIO = metrics.Gauge(
+    'bot_group_skip_ratio',
+    'Share of evaluation group runs skipped because no candle closed.'
+)
+JOBS = metrics.Gauge(
+    'bot_jobs',
+    'Subscribed jobs per job type.',
+    ('job',)
+)
+GROUPS = metrics.Gauge(
+    'bot_groups',
+    'Evaluation groups.'
+)
+SCAN_SYMBOLS = metrics.Gauge(
+    'bot_scan_symbols',
+    'Symbols evaluated by the last run of a scanner group.',
+    ('group',)
+)
+SCAN_ERRORS = metrics.Counter(
+    'bot_scan_errors_total',
+    'Symbols skipped by scanner groups because of client errors.'
+)
+
+
+def is_pattern(coin: str) -> bool:
+    """If a job coin is a symbol pattern such as `*USDT`."""
+    return any(char in coin for char in '*?[')
+
+
+def get_closed(
+    data: Candles,
+    interval: KLineInterval,
+    now: float
+) -> float | None:
+    """Start time of the latest candle of a window closed by `now`."""
+    start_time = data.start_time
+    closed = start_time[start_time + interval.seconds <= now]
+    return float(closed[-1]) if closed.size else None
+
+
+def get_indicators(
+    coin: str,
+    interval: KLineInterval,
+    limit: int,
+    data: Candles
+) -> MarketIndicators | None:
+    if STREAMING_INDICATORS:
+        return IndicatorsRegistry().get(
+            (coin, interval, limit),
+            limit
+        ).feed(data)
 
 
 class BotJobHelper:
+    """Immutable job spec, every attribute is set once.
+
+    Subclasses declare their attributes in `__slots__`, the name and title
+    are built on first access and cached.
+    """
+
+    __slots__ = ('__user_id', '__name', '__title')
 
     job_prefix: str
     job_interval: float
@@ -42,6 +172,14 @@ class BotJobHelper:
     def __init__(self, user_id: int) -> None:
         self.__user_id = user_id
 
+    def __setattr__(self, name: str, value: object) -> None:
+        if hasattr(self, name):
+            raise AttributeError(f'{type(self).__name__} is immutable')
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
     def get_job_params(self) -> list[str]:
         raise NotImplementedError()
 
@@ -55,24 +193,87 @@ class BotJobHelper:
         params = ', '.join(self.get_job_params())
         return f'{prefix}[{params}]'
 
-    async def execute(self) -> str | None:
+    def get_market(self) -> tuple[str, KLineInterval, int]:
+        """Coin, kline interval and number of candles the job evaluates."""
+        raise NotImplementedError()
+
+    def evaluate(self, data: Candles) -> str | None:
+        raise NotImplementedError()
+
+    def evaluate_windows(
+        self,
+        history: Candles,
+        ends: numpy.ndarray
+    ) -> tuple[numpy.ndarray, list[str]]:
+        """Window ends the job fires on and their messages.
+
+        Windows are the job candles count ending at every index of `ends`,
+        they may be ticks of one history or markets laid end to end.
+        """
         raise NotImplementedError()
 
+    def backtest(self, history: Candles) -> list[tuple[float, str]]:
+        """Close times and messages of the ticks the job fires on."""
+        ends, messages = self.evaluate_windows(
+            history,
+            self.get_ticks(history)
+        )
+        return self.get_report(history, ends, messages)
+
+    def get_ticks(self, history: Candles) -> numpy.ndarray:
+        """Last bar of every tick window over a candle history.
+
+        Ticks are one job interval apart at candle closes, so the last bar
+        of a window is complete.
+        """
+        _, interval, limit = self.get_market()
+        step = max(1, round(type(self).get_job_interval() / interval.seconds))
+        return numpy.arange(limit - 1, len(history), step)
+
+    def get_report(
+        self,
+        history: Candles,
+        ends: numpy.ndarray,
+        messages: list[str]
+    ) -> list[tuple[float, str]]:
+        _, interval, _ = self.get_market()
+        close_time = history.start_time[ends] + interval.seconds
+        return list(zip(close_time.tolist(), messages))
+
+    async def execute(self) -> str | None:
+        coin, interval, limit = self.get_market()
+        data = await BybitClient().get_candles(
+            symbol=coin,
+            interval=interval,
+            limit=limit
+        )
+        return self.evaluate(data)
+
     @property
     def user_id(self) -> int:
         return self.__user_id
 
     @property
     def name(self) -> str:
-        return self.get_name()
+        try:
+            return self.__name
+        except AttributeError:
+            self.__name = self.get_name()
+            return self.__name
 
     @property
     def title(self) -> str:
-        return self.get_title()
+        try:
+            return self.__title
+        except AttributeError:
+            self.__title = self.get_title()
+            return self.__title
 
 
 class RsiJob(BotJobHelper):
 
+    __slots__ = ('__coin', '__timeframe', '__setpoint')
+
     job_prefix = 'rsi'
     job_interval = RSI_INTERVAL
     timeframes: dict[str, tuple[int, KLineInterval]] = {
@@ -111,20 +312,38 @@ class RsiJob(BotJobHelper):
             str(self.__setpoint),
         ]
 
-    async def execute(self) -> str | None:
+    def get_market(self) -> tuple[str, KLineInterval, int]:
         limit, interval = self.timeframes[self.__timeframe]
-        data = await BybitClient().get_candles(
-            symbol=self.__coin,
-            interval=interval,
-            limit=limit
+        return self.__coin, interval, limit
+
+    def evaluate(self, data: Candles) -> str | None:
+        coin, interval, limit = self.get_market()
+        value = BybitClient.rsi(
+            data=data,
+            indicators=get_indicators(coin, interval, limit, data)
         )
-        value = BybitClient.rsi(data)
-        if value < self.__setpoint * 0.15 or value > self.__setpoint * 0.85:
+        if self.check(value):
             return f'{value:.2f}'
 
+    def check(self, value: float | numpy.ndarray) -> bool | numpy.ndarray:
+        return ((value < self.__setpoint * 0.15) |
+                (value > self.__setpoint * 0.85))
+
+    def evaluate_windows(
+        self,
+        history: Candles,
+        ends: numpy.ndarray
+    ) -> tuple[numpy.ndarray, list[str]]:
+        _, _, limit = self.get_market()
+        values = ta.rsi_windows(history.close, ends, limit)
+        fired = self.check(values)
+        return ends[fired], [f'{value:.2f}' for value in values[fired]]
+
 
 class VolatilityJob(BotJobHelper):
 
+    __slots__ = ('__coin', '__timeframe', '__setpoint')
+
     job_prefix = 'volatility'
     job_interval = VOLATILITY_INTERVAL
     timeframes: dict[str, tuple[int, KLineInterval]] = {
@@ -163,20 +382,46 @@ class VolatilityJob(BotJobHelper):
             str(self.__setpoint),
         ]
 
-    async def execute(self) -> str | None:
+    def get_market(self) -> tuple[str, KLineInterval, int]:
         limit, interval = self.timeframes[self.__timeframe]
-        data = await BybitClient().get_candles(
-            symbol=self.__coin,
-            interval=interval,
-            limit=limit,
+        return self.__coin, interval, limit
+
+    def evaluate(self, data: Candles) -> str | None:
+        coin, interval, limit = self.get_market()
+        value = BybitClient.volatility(
+            data=data,
+            indicators=get_indicators(coin, interval, limit, data)
         )
-        value = BybitClient.volatility(data)
-        if value < self.__setpoint * 0.15 or value > self.__setpoint * 0.85:
+        if self.check(value):
             return f'{value:.2f}'
 
+    def check(self, value: float | numpy.ndarray) -> bool | numpy.ndarray:
+        return ((value < self.__setpoint * 0.15) |
+                (value > self.__setpoint * 0.85))
+
+    def evaluate_windows(
+        self,
+        history: Candles,
+        ends: numpy.ndarray
+    ) -> tuple[numpy.ndarray, list[str]]:
+        _, _, limit = self.get_market()
+        values = ta.volatility_windows(
+            history.high, history.low, history.close, ends, limit
+        )
+        fired = self.check(values)
+        return ends[fired], [f'{value:.2f}' for value in values[fired]]
+
 
 class FlatsJob(BotJobHelper):
 
+    __slots__ = (
+        '__coin',
+        '__timeframe',
+        '__max_difference',
+        '__min_length',
+        '__va',
+    )
+
     job_prefix = 'flats'
     job_interval = FLATS_INTERVAL
     timeframes: dict[str, tuple[int, KLineInterval]] = {
@@ -226,13 +471,11 @@ class FlatsJob(BotJobHelper):
             str(self.__va),
         ]
 
-    async def execute(self) -> str | None:
+    def get_market(self) -> tuple[str, KLineInterval, int]:
         limit, interval = self.timeframes[self.__timeframe]
-        data = await BybitClient().get_candles(
-            symbol=self.__coin,
-            interval=interval,
-            limit=limit
-        )
+        return self.__coin, interval, limit
+
+    def evaluate(self, data: Candles) -> str | None:
         flats = BybitClient.flats(
             data=data,
             max_difference=self.__max_difference,
@@ -240,15 +483,54 @@ class FlatsJob(BotJobHelper):
             va=self.__va
         )
         if flats:
-            result = [
-                f'val={flat["val"]:.2f}, poc={flat["poc"]}, vah={flat["vah"]}'
-                for flat in flats
-            ]
-            return '\n'.join(result)
+            return self.format(flats)
+
+    @staticmethod
+    def format(flats: list[dict[str, float]]) -> str:
+        return '\n'.join(
+            f'val={flat["val"]:.2f}, poc={flat["poc"]}, vah={flat["vah"]}'
+            for flat in flats
+        )
+
+    def evaluate_windows(
+        self,
+        history: Candles,
+        ends: numpy.ndarray
+    ) -> tuple[numpy.ndarray, list[str]]:
+        _, _, limit = self.get_market()
+        windows = ta.flats_windows(
+            history.close,
+            ends,
+            limit,
+            self.__max_difference,
+            self.__min_length
+        )
+        fired = numpy.array([bool(flats) for flats in windows], dtype=bool)
+        windows = [flats for flats in windows if flats]
+        unique = list(dict.fromkeys(
+            flat for flats in windows for flat in flats
+        ))
+        areas = dict(zip(unique, ta.value_areas(
+            history.high,
+            history.low,
+            history.volume,
+            unique,
+            self.__va
+        )))
+        texts = {}
+        messages = []
+        for flats in windows:
+            for flat in flats:
+                if flat not in texts:
+                    texts[flat] = self.format([areas[flat]])
+            messages.append('\n'.join(texts[flat] for flat in flats))
+        return ends[fired], messages
 
 
 class TrendJob(BotJobHelper):
 
+    __slots__ = ('__coin', '__timeframe')
+
     job_prefix = 'trend'
     job_interval = TREND_INTERVAL
     timeframes: dict[str, tuple[int, KLineInterval]] = {
@@ -280,19 +562,550 @@ class TrendJob(BotJobHelper):
             self.__timeframe,
         ]
 
-    async def execute(self) -> str | None:
+    def get_market(self) -> tuple[str, KLineInterval, int]:
         limit, interval = self.timeframes[self.__timeframe]
-        data = await BybitClient().get_candles(
-            symbol=self.__coin,
-            interval=interval,
-            limit=limit
+        return self.__coin, interval, limit
+
+    def evaluate(self, data: Candles) -> str | None:
+        coin, interval, limit = self.get_market()
+        result = BybitClient.trend(
+            data=data,
+            indicators=get_indicators(coin, interval, limit, data)
         )
-        result = BybitClient.trend(data)
+        return self.format(result)
+
+    @staticmethod
+    def format(result: int) -> str | None:
         if result > 0:
             return 'downtrend to uptrend'
         if result < 0:
             return 'uptrend to downtrend'
 
+    def evaluate_windows(
+        self,
+        history: Candles,
+        ends: numpy.ndarray
+    ) -> tuple[numpy.ndarray, list[str]]:
+        _, _, limit = self.get_market()
+        pos, neg = ta.directions_windows(
+            history.high, history.low, history.close, ends - 8, limit - 8
+        )
+        results = ta.trend_changes(
+            pos, neg, history.high, history.low, history.close, ends - 4
+        )
+        fired = results != 0
+        return ends[fired], [self.format(result) for result in results[fired]]
+
+
+GroupKey = tuple[str, KLineInterval, int, float]
+HelperResult = tuple[str | None, float, str | None]
+WindowsResult = tuple[list[int], list[str], float, str | None]
+
+
+def evaluate_helpers(
+    values: numpy.ndarray,
+    helpers: list[BotJobHelper]
+) -> list[HelperResult]:
+    """Message, seconds and error of every helper on one candles window.
+
+    Runs on the indicators executor as one task, the helpers share the
+    memoized indicators of the candles.
+    """
+    data = Candles(values)
+    results = []
+    for helper in helpers:
+        started = time.perf_counter()
+        try:
+            message = helper.evaluate(data)
+        except Exception:
+            results.append((None, 0.0, traceback.format_exc()))
+        else:
+            results.append((message, time.perf_counter() - started, None))
+    return results
+
+
+def evaluate_helpers_windows(
+    values: numpy.ndarray,
+    helpers: list[BotJobHelper],
+    ends: numpy.ndarray
+) -> list[WindowsResult]:
+    """`evaluate_windows` of every helper with seconds and error."""
+    history = Candles(values)
+    results = []
+    for helper in helpers:
+        started = time.perf_counter()
+        try:
+            fired, texts = helper.evaluate_windows(history, ends)
+        except Exception:
+            results.append(([], [], 0.0, traceback.format_exc()))
+        else:
+            results.append((
+                fired.tolist(),
+                texts,
+                time.perf_counter() - started,
+                None
+            ))
+    return results
+
+
+class Subscription:
+
+    __slots__ = ('helper', 'chat_id')
+
+    def __init__(self, helper: BotJobHelper, chat_id: int) -> None:
+        self.helper = helper
+        self.chat_id = chat_id
+
+
+class EvaluationGroup:
+    """Subscriptions evaluated on one candles window every tick."""
+
+    @staticmethod
+    def get_key(helper: BotJobHelper) -> GroupKey:
+        coin, interval, limit = helper.get_market()
+        return coin, interval, limit, type(helper).get_job_interval()
+
+    def __init__(self, key: GroupKey) -> None:
+        self.__key = key
+        self.subscriptions: dict[str, Subscription] = {}
+        self.evaluated_at = 0.0
+        self.started_at: float | None = None
+        self.running = 0
+        self.job: Job | None = None
+        self.version = 0
+        self.closed: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
+
+    @property
+    def key(self) -> GroupKey:
+        return self.__key
+
+    @property
+    def name(self) -> str:
+        coin, interval, limit, _ = self.__key
+        return f'group-{coin}-{interval.value}-{limit}'
+
+    @property
+    def interval(self) -> float:
+        return self.__key[3]
+
+    @property
+    def scanner(self) -> bool:
+        """If the group scans every symbol matching its coin pattern."""
+        return is_pattern(self.__key[0])
+
+    @property
+    def phase(self) -> float:
+        """Offset of the group ticks within its interval, in seconds.
+
+        A hash of the group name picks one of the candle closes in the
+        interval and a jitter inside that candle, ticks come at least
+        `SCHEDULE_SETTLE` seconds after the close and before the next one.
+        """
+        _, interval, _, job_interval = self.__key
+        candle = interval.seconds
+        digest = zlib.crc32(self.name.encode())
+        slots = max(1, int(job_interval // candle))
+        jitter = (
+            (digest >> 16) / 0x10000 *
+            SCHEDULE_JITTER * max(0.0, candle - SCHEDULE_SETTLE)
+        )
+        return (digest % slots) * candle + SCHEDULE_SETTLE + jitter
+
+    def get_delay(self, now: float) -> float:
+        """Seconds from the `now` timestamp to the next group tick."""
+        return (self.phase - now) % self.interval
+
+    @property
+    def owner(self) -> int | None:
+        """User the group's requests are accounted to by the limiter."""
+        for subscription in self.subscriptions.values():
+            return subscription.helper.user_id
+
+
+class JobIndex:
+    """Subscriptions by user and job prefix, groups by (coin, interval).
+
+    Buckets map job names or group keys to their objects, lookups
+    intersect the smallest bucket instead of scanning every subscription.
+    """
+
+    def __init__(self) -> None:
+        self.users: dict[int, dict[str, Subscription]] = {}
+        self.prefixes: dict[str, dict[str, Subscription]] = {}
+        self.markets: dict[
+            tuple[str, KLineInterval],
+            dict[GroupKey, EvaluationGroup]
+        ] = {}
+
+    @staticmethod
+    def discard(index: dict, key: object, name: object) -> None:
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(name, None)
+            if not bucket:
+                del index[key]
+
+    def add(self, subscription: Subscription) -> None:
+        helper = subscription.helper
+        name = helper.name
+        self.users.setdefault(helper.user_id, {})[name] = subscription
+        self.prefixes.setdefault(
+            helper.get_job_prefix(),
+            {}
+        )[name] = subscription
+
+    def remove(self, subscription: Subscription) -> None:
+        helper = subscription.helper
+        self.discard(self.users, helper.user_id, helper.name)
+        self.discard(self.prefixes, helper.get_job_prefix(), helper.name)
+
+    def add_group(self, group: EvaluationGroup) -> None:
+        coin, interval, _, _ = group.key
+        self.markets.setdefault((coin, interval), {})[group.key] = group
+
+    def remove_group(self, group: EvaluationGroup) -> None:
+        coin, interval, _, _ = group.key
+        self.discard(self.markets, (coin, interval), group.key)
+
+    def clear(self) -> None:
+        self.users.clear()
+        self.prefixes.clear()
+        self.markets.clear()
+
+    def find(
+        self,
+        user_id: int,
+        prefix: str | None = None
+    ) -> list[Subscription]:
+        """Subscriptions of a user, of one job prefix if given."""
+        subscriptions = self.users.get(user_id, {})
+        if prefix is None:
+            return list(subscriptions.values())
+        jobs = self.prefixes.get(prefix, {})
+        if len(jobs) < len(subscriptions):
+            return [
+                subscription for name, subscription in jobs.items()
+                if name in subscriptions
+            ]
+        return [
+            subscription for name, subscription in subscriptions.items()
+            if name in jobs
+        ]
+
+
+def get_first(
+    group: EvaluationGroup,
+    first: float | None = None
+) -> float | None:
+    """Delay of the first group run, the group phase if not given."""
+    if first is None and SCHEDULE_ALIGNED:
+        return group.get_delay(time.time())
+    return first
+
+
+class EvaluationEngine:
+    """Subscriptions grouped by (coin, interval, limit, job interval).
+
+    Candles are fetched and indicators computed once per group and tick,
+    the threshold checks of every subscription are fanned out over the
+    shared candles.
+    """
+
+    __instance: Self = None
+
+    def __new__(cls) -> Self:
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    def __init__(self) -> None:
+        if hasattr(self, 'groups'):
+            return
+        self.groups: dict[GroupKey, EvaluationGroup] = {}
+        self.subscriptions: dict[str, EvaluationGroup] = {}
+        self.index = JobIndex()
+        self.client: BybitClient | FetcherClient | None = None
+        self.runs = 0
+        self.skips = 0
+        if STREAMING_INDICATORS and INDICATORS_EXECUTOR:
+            logger.warning('streaming indicators keep state in the bot '
+                           'process, the indicators executor is not used')
+            self.executor = IndicatorsExecutor()
+        else:
+            self.executor = IndicatorsExecutor(
+                INDICATORS_EXECUTOR,
+                INDICATORS_WORKERS
+            )
+        registry = metrics.MetricsRegistry()
+        registry.on_collect(self.update_metrics)
+        registry.add_stats(
+            'bot_indicators_executor',
+            lambda: self.executor.stats
+        )
+
+    def get_client(self) -> BybitClient | FetcherClient:
+        """Candles source, the bot process fetcher in a shard worker."""
+        if self.client is None:
+            return BybitClient()
+        return self.client
+
+    def update_metrics(self) -> None:
+        counts = dict.fromkeys(JOBS.values, 0)
+        for group in self.groups.values():
+            for subscription in group.subscriptions.values():
+                key = (subscription.helper.get_job_prefix(),)
+                counts[key] = counts.get(key, 0) + 1
+        for key, count in counts.items():
+            JOBS.labels(*key).set(count)
+        GROUPS.set(len(self.groups))
+        GROUP_SKIP_RATIO.set(self.skips / self.runs if self.runs else 0.0)
+
+    def add(
+        self,
+        helper: BotJobHelper,
+        chat_id: int
+    ) -> tuple[EvaluationGroup, bool]:
+        """Subscribe a helper, returns its group and if it was created."""
+        key = EvaluationGroup.get_key(helper)
+        group = self.groups.get(key)
+        created = group is None
+        if created:
+            group = self.groups[key] = EvaluationGroup(key)
+            self.index.add_group(group)
+        subscription = Subscription(helper, chat_id)
+        group.version += 1
+        group.closed = None
+        previous = group.subscriptions.get(helper.name)
+        if previous is not None:
+            self.index.remove(previous)
+        group.subscriptions[helper.name] = subscription
+        self.subscriptions[helper.name] = group
+        self.index.add(subscription)
+        return group, created
+
+    def remove(
+        self,
+        name: str
+    ) -> tuple[Subscription | None, EvaluationGroup | None]:
+        """Unsubscribe by job name, the group is returned once empty."""
+        group = self.subscriptions.pop(name, None)
+        if group is None:
+            return None, None
+        subscription = group.subscriptions.pop(name)
+        group.version += 1
+        group.closed = None
+        self.index.remove(subscription)
+        if group:
+            return subscription, None
+        del self.groups[group.key]
+        self.index.remove_group(group)
+        coin, interval, limit, _ = group.key
+        if not any(
+            other.key[2] == limit
+            for other in self.index.markets.get((coin, interval), {}).values()
+        ):
+            IndicatorsRegistry().remove((coin, interval, limit))
+        return subscription, group
+
+    def clear(self) -> None:
+        self.groups.clear()
+        self.subscriptions.clear()
+        self.index.clear()
+        IndicatorsRegistry().clear()
+
+    def get_due_groups(
+        self,
+        coin: str,
+        interval: KLineInterval,
+        close_time: float
+    ) -> list[EvaluationGroup]:
+        """Groups to evaluate on a candle close, at most once per interval."""
+        groups = []
+        for group in self.index.markets.get((coin, interval), {}).values():
+            if close_time - group.evaluated_at >= group.interval:
+                group.evaluated_at = close_time
+                groups.append(group)
+        return groups
+
+    def find(
+        self,
+        user_id: int,
+        helper_class: Type[BotJobHelper] = BotJobHelper
+    ) -> Iterator[BotJobHelper]:
+        if helper_class is BotJobHelper:
+            subscriptions = self.index.find(user_id)
+        else:
+            subscriptions = self.index.find(
+                user_id,
+                helper_class.get_job_prefix()
+            )
+        for subscription in subscriptions:
+            yield subscription.helper
+
+    async def evaluate(self, group: EvaluationGroup) -> list[tuple[int, str]]:
+        """Messages produced by a group tick as (chat_id, text) pairs."""
+        started = time.perf_counter()
+        if group.running:
+            GROUP_OVERLAPS.inc()
+        if group.started_at is not None:
+            GROUP_LATENESS_SECONDS.observe(
+                max(0.0, started - group.started_at - group.interval)
+            )
+        group.started_at = started
+        group.running += 1
+        try:
+            return await self.run(group)
+        finally:
+            group.running -= 1
+            GROUP_SECONDS.observe(time.perf_counter() - started)
+
+    def skip(self, result: str) -> list[tuple[int, str]]:
+        """No messages for a group run without a newly closed candle."""
+        GROUP_RUNS.labels(result).inc()
+        self.skips += 1
+        return []
+
+    async def run(self, group: EvaluationGroup) -> list[tuple[int, str]]:
+        if group.scanner:
+            return await self.scan(group)
+        self.runs += 1
+        coin, interval, limit, _ = group.key
+        subscriptions = list(group.subscriptions.values())
+        version = group.version
+        client = self.get_client()
+        # the candle after the last evaluated closed one is still forming
+        if SKIP_UNCHANGED and group.closed is not None and (
+            time.time() < group.closed + 2 * interval.seconds
+        ):
+            return self.skip('unchanged')
+        try:
+            data = await client.get_candles(
+                symbol=coin,
+                interval=interval,
+                limit=limit,
+                user=group.owner
+            )
+        except BybitClientError as error:
+            group.closed = None
+            return [
+                (
+                    subscription.chat_id,
+                    f'{subscription.helper.title}\n'
+                    f'Baybit API client error: {error}'
+                )
+                for subscription in subscriptions
+            ]
+        closed = get_closed(data, interval, time.time())
+        if SKIP_UNCHANGED and closed is not None and closed == group.closed:
+            return self.skip('fetched')
+        GROUP_RUNS.labels('evaluated').inc()
+        results = await self.executor.run(
+            evaluate_helpers,
+            data.values,
+            [subscription.helper for subscription in subscriptions]
+        )
+        messages = []
+        failed = False
+        for subscription, (message, seconds, error) in zip(
+            subscriptions,
+            results
+        ):
+            helper = subscription.helper
+            if error is not None:
+                logger.error(f'{helper.name} failed\n{error}')
+                failed = True
+                continue
+            JOB_SECONDS.labels(helper.get_job_prefix()).observe(seconds)
+            if message:
+                messages.append(
+                    (subscription.chat_id, f'{helper.title}\n{message}')
+                )
+        if not failed and version == group.version:
+            group.closed = closed
+        return messages
+
+    async def scan(self, group: EvaluationGroup) -> list[tuple[int, str]]:
+        """Evaluate the subscriptions on every matching symbol at once.
+
+        Candles are fetched with at most `SCANNER_CONCURRENCY` requests in
+        flight and laid end to end, every subscription then checks all
+        markets in one batch and gets a single message for them.
+        """
+        pattern, interval, limit, _ = group.key
+        subscriptions = list(group.subscriptions.values())
+        client = self.get_client()
+        try:
+            symbols = [
+                symbol for symbol in await client.get_symbols(
+                    user=group.owner
+                )
+                if fnmatch.fnmatchcase(symbol, pattern)
+            ]
+        except BybitClientError as error:
+            return [
+                (
+                    subscription.chat_id,
+                    f'{subscription.helper.title}\n'
+                    f'Baybit API client error: {error}'
+                )
+                for subscription in subscriptions
+            ]
+        semaphore = asyncio.Semaphore(SCANNER_CONCURRENCY)
+
+        async def fetch(symbol: str) -> Candles | None:
+            async with semaphore:
+                try:
+                    return await client.get_candles(
+                        symbol=symbol,
+                        interval=interval,
+                        limit=limit,
+                        user=group.owner
+                    )
+                except BybitClientError as error:
+                    SCAN_ERRORS.inc()
+                    logger.warning(f'{group.name} {symbol}: {error!r}')
+
+        results = await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+        markets = [
+            (symbol, data) for symbol, data in zip(symbols, results)
+            if data is not None and len(data) == limit
+        ]
+        SCAN_SYMBOLS.labels(group.name).set(len(markets))
+        if not markets:
+            return []
+        values = numpy.concatenate(
+            [data.values for _, data in markets],
+            axis=1
+        )
+        results = await self.executor.run(
+            evaluate_helpers_windows,
+            values,
+            [subscription.helper for subscription in subscriptions],
+            numpy.arange(limit - 1, values.shape[1], limit)
+        )
+        messages = []
+        for subscription, (fired, texts, seconds, error) in zip(
+            subscriptions,
+            results
+        ):
+            helper = subscription.helper
+            if error is not None:
+                logger.error(f'{helper.name} failed\n{error}')
+                continue
+            JOB_SECONDS.labels(helper.get_job_prefix()).observe(seconds)
+            if fired:
+                messages.append((subscription.chat_id, '\n'.join([
+                    helper.title,
+                    *(
+                        f'{markets[end // limit][0]}: {text}'
+                        for end, text in zip(fired, texts)
+                    )
+                ])))
+        return messages
+
 
 class BotJobsShell:
 
@@ -304,23 +1117,100 @@ class BotJobsShell:
     ]
 
     @staticmethod
-    def remove_jobs_by_name(queue: JobQueue, name: str) -> str | None:
-        jobs = queue.get_jobs_by_name(name)
-        if jobs:
-            for job in jobs:
-                job.schedule_removal()
-            return 'Remove job:\n' + '\n'.join(
-                [
-                    job.data.title
-                    for job in jobs
-                    if isinstance(job.data, BotJobHelper)
-                ]
+    def schedule_group(
+        queue: JobQueue,
+        callback: Coroutine,
+        group: EvaluationGroup,
+        first: float | None = None
+    ) -> None:
+        if KLINE_STREAM and not group.scanner:
+            coin, interval, _, _ = group.key
+            KlineStream().subscribe(coin, interval)
+        else:
+            group.job = queue.run_repeating(
+                callback=callback,
+                interval=group.interval,
+                first=get_first(group, first),
+                name=group.name,
+                data=group
             )
 
+    @staticmethod
+    def remove_jobs_by_name(queue: JobQueue, name: str) -> str | None:
+        subscription, group = EvaluationEngine().remove(name)
+        if group is not None:
+            if KLINE_STREAM and not group.scanner:
+                coin, interval, _, _ = group.key
+                KlineStream().unsubscribe(coin, interval)
+            if group.job is not None:
+                group.job.schedule_removal()
+                group.job = None
+        if subscription is not None:
+            hub = ShardsHub.get_instance()
+            if hub is not None:
+                hub.remove(name)
+            store = JobStore.get_instance()
+            if store is not None:
+                store.delete(name)
+            return f'Remove job:\n{subscription.helper.title}'
+
     @staticmethod
     def remove_all_jobs(queue: JobQueue) -> None:
-        for job in queue.jobs():
-            job.schedule_removal()
+        engine = EvaluationEngine()
+        for group in engine.groups.values():
+            if KLINE_STREAM and not group.scanner:
+                coin, interval, _, _ = group.key
+                KlineStream().unsubscribe(coin, interval)
+            if group.job is not None:
+                group.job.schedule_removal()
+                group.job = None
+        engine.clear()
+        hub = ShardsHub.get_instance()
+        if hub is not None:
+            hub.clear()
+        store = JobStore.get_instance()
+        if store is not None:
+            store.clear()
+
+    @classmethod
+    def restore_jobs(
+        cls,
+        queue: JobQueue,
+        callback: Coroutine,
+        store: JobStore
+    ) -> int:
+        """Subscribe all stored jobs, first group runs are spread evenly.
+
+        Aligned groups start at their own phase instead. With shard
+        workers the jobs are recorded and sent to each worker when it
+        connects.
+        """
+        engine = EvaluationEngine()
+        hub = ShardsHub.get_instance()
+        groups = []
+        count = 0
+        for user_id, chat_id, prefix, params in store.load():
+            try:
+                helper = cls.get_helper_class(prefix)(user_id, *params)
+            except Exception as error:
+                logger.warning(f'stored job {prefix} {params}: {error!r}')
+                continue
+            group, created = engine.add(helper, chat_id)
+            if hub is not None:
+                hub.add(helper, chat_id)
+            elif created:
+                groups.append(group)
+            count += 1
+        for number, group in enumerate(groups):
+            cls.schedule_group(
+                queue=queue,
+                callback=callback,
+                group=group,
+                first=None if SCHEDULE_ALIGNED else (
+                    group.interval * (number + 1) / len(groups)
+                )
+            )
+        return count
 
     @classmethod
     def get_helper_class(cls, prefix: str) -> Type[BotJobHelper]:
@@ -354,14 +1244,21 @@ class BotJobsShell:
                 ) from error
             else:
                 removed = cls.remove_jobs_by_name(queue, helper.name)
-                queue.run_repeating(
-                    callback=callback,
-                    interval=helper_class.get_job_interval(),
-                    name=helper.name,
-                    chat_id=chat_id,
-                    user_id=user_id,
-                    data=helper
-                )
+                group, created = EvaluationEngine().add(helper, chat_id)
+                hub = ShardsHub.get_instance()
+                if hub is not None:
+                    hub.add(helper, chat_id)
+                elif created:
+                    cls.schedule_group(queue, callback, group)
+                store = JobStore.get_instance()
+                if store is not None:
+                    store.save(
+                        name=helper.name,
+                        user_id=user_id,
+                        chat_id=chat_id,
+                        prefix=helper_class.get_job_prefix(),
+                        params=helper.get_job_params()
+                    )
                 if removed:
                     return f'{removed}\nAdd job:\n{helper.title}'
                 return f'Add job:\n{helper.title}'
@@ -395,17 +1292,9 @@ class BotJobsShell:
         try:
             if args:
                 helper_class = cls.get_helper_class(args[0])
-                jobs = [
-                    job.data for job in queue.jobs()
-                    if (job.user_id == user_id and
-                        isinstance(job.data, helper_class))
-                ]
             else:
-                jobs = [
-                    job.data for job in queue.jobs()
-                    if (job.user_id == user_id and
-                        isinstance(job.data, BotJobHelper))
-                ]
+                helper_class = BotJobHelper
+            jobs = list(EvaluationEngine().find(user_id, helper_class))
         except Exception as error:
             prefixes = [helper.get_job_prefix() for helper in cls.HELPERS]
             raise BotJobsShellError(
@@ -0,0 +1,169 @@
+import asyncio
+from collections import (
+    OrderedDict,
+    deque,
+)
+import enum
+from typing import (
+    Hashable,
+)
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class TokenBucket:
+    """Token bucket in GCRA form: one theoretical arrival time per bucket.
+
+    `rate` tokens per second with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tat = 0.0
+
+    @property
+    def emission(self) -> float:
+        return 1.0 / self.rate
+
+    def get_delay(self, now: float) -> float:
+        tolerance = self.emission * (self.burst - 1)
+        return max(0.0, self.tat - tolerance - now)
+
+    def consume(self, now: float) -> None:
+        self.tat = max(self.tat, now) + self.emission
+
+    def pause(self, now: float, seconds: float) -> None:
+        """Let nothing through for `seconds`, whatever the burst."""
+        tolerance = self.emission * (self.burst - 1)
+        self.tat = max(self.tat, now + seconds + tolerance)
+
+
+class RateLimiter:
+    """FIFO rate limiter over several token buckets.
+
+    Waiters are served by priority lane first. Inside a lane the users
+    take turns, so one user with many queued requests can not starve the
+    others, and requests of one user keep their order.
+    """
+
+    def __init__(self, buckets: list[TokenBucket]) -> None:
+        self.buckets = buckets
+        self.server: TokenBucket | None = None
+        self.server_until = 0.0
+        self.lanes: dict[Priority, OrderedDict[Hashable, deque]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self.waiting = 0
+        self.task: asyncio.Task | None = None
+        self.requests = 0
+        self.delayed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def get_buckets(self, now: float) -> list[TokenBucket]:
+        if self.server is not None and now < self.server_until:
+            return self.buckets + [self.server]
+        return self.buckets
+
+    def get_delay(self, now: float) -> float:
+        return max(
+            (bucket.get_delay(now) for bucket in self.get_buckets(now)),
+            default=0.0
+        )
+
+    def consume(self, now: float, waited: float) -> None:
+        for bucket in self.get_buckets(now):
+            bucket.consume(now)
+        self.requests += 1
+        if waited > 0.0:
+            self.delayed += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def adjust(self, remaining: int, reset_in: float) -> None:
+        """Follow the allowance reported by the server.
+
+        `remaining` requests are spread evenly over the `reset_in` seconds
+        left in the server window, no request is let through before the
+        window resets when nothing remains. The server bucket keeps its
+        arrival time across responses, only its rate follows the headers.
+        """
+        now = asyncio.get_running_loop().time()
+        reset_in = max(reset_in, 0.0)
+        if self.server is None:
+            self.server = TokenBucket(1.0, 1)
+        if remaining > 0:
+            self.server.rate = remaining / max(reset_in, 1e-3)
+            self.server.tat = max(self.server.tat, now)
+        else:
+            self.server.tat = max(self.server.tat, now + reset_in)
+        self.server_until = now + reset_in
+
+    async def acquire(
+        self,
+        priority: Priority = Priority.BACKGROUND,
+        user: Hashable = None
+    ) -> float:
+        """Wait for a free slot, returns the waited time in seconds."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if not self.waiting and self.get_delay(now) <= 0.0:
+            self.consume(now, 0.0)
+            return 0.0
+        future = loop.create_future()
+        lane = self.lanes[priority]
+        if user not in lane:
+            lane[user] = deque()
+        lane[user].append((now, future))
+        self.waiting += 1
+        if self.task is None:
+            self.task = asyncio.create_task(self.dispatch())
+        return await future
+
+    def pop(self) -> tuple[float, asyncio.Future] | None:
+        for lane in self.lanes.values():
+            while lane:
+                user, waiters = next(iter(lane.items()))
+                created, future = waiters.popleft()
+                self.waiting -= 1
+                if waiters:
+                    lane.move_to_end(user)
+                else:
+                    del lane[user]
+                if not future.done():
+                    return created, future
+        return None
+
+    async def dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self.waiting:
+                delay = self.get_delay(loop.time())
+                if delay > 0.0:
+                    await asyncio.sleep(delay)
+                    continue
+                waiter = self.pop()
+                if waiter is None:
+                    continue
+                created, future = waiter
+                now = loop.time()
+                self.consume(now, now - created)
+                future.set_result(now - created)
+        finally:
+            self.task = None
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            'requests': self.requests,
+            'delayed': self.delayed,
+            'waiting': self.waiting,
+            'wait_total': self.wait_total,
+            'wait_max': self.wait_max,
+            'wait_mean': self.wait_total / self.requests if self.requests
+            else 0.0,
+        }
@@ -0,0 +1,224 @@
+import asyncio
+from collections import (
+    OrderedDict,
+    deque,
+)
+import logging
+
+from telegram import (
+    Bot,
+)
+from telegram.error import (
+    RetryAfter,
+    TelegramError,
+)
+
+from backend import metrics
+from backend import settings
+from backend.limiter import (
+    TokenBucket,
+)
+
+logger = logging.getLogger(__name__)
+
+WINDOW = settings.BOT_MESSAGES_WINDOW
+MAX_PER_SECOND = settings.BOT_MESSAGES_MAX_PER_SECOND
+CHAT_MAX_PER_SECOND = settings.BOT_CHAT_MESSAGES_MAX_PER_SECOND
+GROUP_MAX_PER_MINUTE = settings.BOT_GROUP_MESSAGES_MAX_PER_MINUTE
+
+SEND_SECONDS = metrics.Histogram(
+    'telegram_send_seconds',
+    'Telegram sendMessage call latency.'
+)
+DELIVERY_SECONDS = metrics.Histogram(
+    'telegram_delivery_seconds',
+    'Time from a batched message being queued to being sent.'
+)
+
+
+def split_message(texts: list[str], max_length: int) -> list[str]:
+    """Join texts with blank lines into as few messages as possible."""
+    messages = []
+    current = ''
+    for text in texts:
+        while len(text) > max_length:
+            if current:
+                messages.append(current)
+                current = ''
+            messages.append(text[:max_length])
+            text = text[max_length:]
+        if not current:
+            current = text
+        elif len(current) + 2 + len(text) <= max_length:
+            current = f'{current}\n\n{text}'
+        else:
+            messages.append(current)
+            current = text
+    if current:
+        messages.append(current)
+    return messages
+
+
+class MessageScheduler:
+    """Outbound alerts merged per chat and paced under Telegram limits.
+
+    Alerts for a chat arriving within `window` seconds are sent as one
+    message, split only at the Telegram message length limit. Sending is
+    paced globally and per chat, group chats get the lower group limit.
+    """
+
+    MAX_MESSAGE_LENGTH = 4096
+
+    def __init__(self, bot: Bot, window: float = WINDOW) -> None:
+        self.bot = bot
+        self.window = window
+        self.pending: dict[int, list[str]] = {}
+        self.chats: OrderedDict[int, deque[tuple[float, str]]] = (
+            OrderedDict()
+        )
+        self.buckets: dict[int, TokenBucket] = {}
+        self.bucket = TokenBucket(MAX_PER_SECOND, MAX_PER_SECOND)
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        metrics.MetricsRegistry().add_stats(
+            'telegram_messages',
+            lambda: self.stats
+        )
+
+    def get_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            if chat_id < 0:
+                bucket = TokenBucket(GROUP_MAX_PER_MINUTE / 60.0, 1)
+            else:
+                bucket = TokenBucket(CHAT_MAX_PER_SECOND, 1)
+            self.buckets[chat_id] = bucket
+        return bucket
+
+    def send(self, chat_id: int, text: str) -> None:
+        texts = self.pending.get(chat_id)
+        if texts is None:
+            self.pending[chat_id] = [text]
+            asyncio.get_running_loop().call_later(
+                self.window,
+                self.flush,
+                chat_id
+            )
+        else:
+            texts.append(text)
+
+    def flush(self, chat_id: int) -> None:
+        texts = self.pending.pop(chat_id, None)
+        if not texts:
+            return
+        now = asyncio.get_running_loop().time()
+        queue = self.chats.setdefault(chat_id, deque())
+        for message in split_message(texts, type(self).MAX_MESSAGE_LENGTH):
+            queue.append((now, message))
+            self.queued += 1
+        self.wakeup.set()
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def pop(self, now: float) -> tuple[int, float, str] | float:
+        """Next message of a chat allowed to send, or the time to wait."""
+        delay = None
+        for chat_id, queue in self.chats.items():
+            chat_delay = self.get_bucket(chat_id).get_delay(now)
+            if chat_delay <= 0.0:
+                created, text = queue.popleft()
+                self.queued -= 1
+                if queue:
+                    self.chats.move_to_end(chat_id)
+                else:
+                    del self.chats[chat_id]
+                return chat_id, created, text
+            delay = chat_delay if delay is None else min(delay, chat_delay)
+        return delay
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self.chats:
+                now = loop.time()
+                delay = self.bucket.get_delay(now)
+                if delay <= 0.0:
+                    item = self.pop(now)
+                    if isinstance(item, float):
+                        delay = item
+                if delay > 0.0:
+                    self.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                chat_id, created, text = item
+                self.bucket.consume(now)
+                self.get_bucket(chat_id).consume(now)
+                await self.deliver(chat_id, created, text)
+        finally:
+            self.task = None
+
+    async def deliver(self, chat_id: int, created: float, text: str) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text)
+        except RetryAfter as error:
+            retry_after = error.retry_after
+            if not isinstance(retry_after, (int, float)):
+                retry_after = retry_after.total_seconds()
+            self.chats.setdefault(chat_id, deque()).appendleft(
+                (created, text)
+            )
+            self.chats.move_to_end(chat_id, last=False)
+            self.queued += 1
+            self.get_bucket(chat_id).pause(loop.time(), retry_after)
+        except TelegramError as error:
+            self.failed += 1
+            logger.error(f'send message to {chat_id} failed: {error}')
+        except Exception:
+            self.failed += 1
+            logger.exception(f'send message to {chat_id} failed')
+        else:
+            now = loop.time()
+            SEND_SECONDS.observe(now - started)
+            latency = now - created
+            DELIVERY_SECONDS.observe(latency)
+            self.sent += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Send what is queued for up to `timeout` seconds, then drop it."""
+        for chat_id in list(self.pending):
+            self.flush(chat_id)
+        task = self.task
+        if task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            'pending_chats': len(self.pending),
+            'queued': self.queued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'latency_max': self.latency_max,
+            'latency_mean': self.latency_total / self.sent if self.sent
+            else 0.0,
+        }
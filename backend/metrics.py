@@ -0,0 +1,262 @@
+import bisect
+import logging
+import math
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    Self,
+)
+
+from tornado.httpserver import (
+    HTTPServer,
+)
+from tornado.web import (
+    Application,
+    RequestHandler,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    return ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+        )
+        for name, value in zip(names, values)
+    )
+
+
+class CounterValue:
+
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def get_samples(self) -> Iterator[tuple[str, str, float]]:
+        yield '', '', self.value
+
+
+class GaugeValue(CounterValue):
+
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class HistogramValue:
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_samples(self) -> Iterator[tuple[str, str, float]]:
+        total = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            total += count
+            yield '_bucket', f'le="{format_value(bound)}"', total
+        yield '_sum', '', self.sum
+        yield '_count', '', self.count
+
+
+class Metric:
+    """Named metric with optional labels, rendered in Prometheus format.
+
+    Updates are plain attribute arithmetic without locks, every update is
+    made from the event loop thread. A metric without labels is updated
+    directly, a labelled one through `labels(*values)`.
+    """
+
+    type_name: str
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = ()
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.values: dict[tuple[str, ...], Any] = {}
+        if not labels:
+            self.value = self.values[()] = self.make_value()
+        MetricsRegistry().register(self)
+
+    def make_value(self) -> Any:
+        raise NotImplementedError()
+
+    def labels(self, *values: str) -> Any:
+        value = self.values.get(values)
+        if value is None:
+            if not len(values) == len(self.label_names):
+                raise ValueError(f'{self.name} labels: {self.label_names}')
+            value = self.values[values] = self.make_value()
+        return value
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} {self.type_name}'
+        for values, value in self.values.items():
+            pairs = format_labels(self.label_names, values)
+            for suffix, extra, sample in value.get_samples():
+                labels = ','.join(filter(None, (pairs, extra)))
+                if labels:
+                    labels = f'{{{labels}}}'
+                yield f'{self.name}{suffix}{labels} {format_value(sample)}'
+
+
+class Counter(Metric):
+
+    type_name = 'counter'
+
+    def make_value(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value.value += amount
+
+
+class Gauge(Metric):
+
+    type_name = 'gauge'
+
+    def make_value(self) -> GaugeValue:
+        return GaugeValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value.value = value
+
+
+class Histogram(Metric):
+
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def make_value(self) -> HistogramValue:
+        return HistogramValue(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self.value.observe(value)
+
+
+class MetricsRegistry:
+    """All metrics of the process and the stats sampled when rendering.
+
+    `add_stats` exposes the `stats` dict of a component as gauges named
+    `{prefix}_{key}`, `on_collect` callbacks run before every render.
+    """
+
+    __instance: Self = None
+
+    def __new__(cls) -> Self:
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    def __init__(self) -> None:
+        if hasattr(self, 'metrics'):
+            return
+        self.metrics: dict[str, Metric] = {}
+        self.stats: dict[str, Callable[[], dict[str, float]]] = {}
+        self.callbacks: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f'metric already registered: {metric.name}')
+        self.metrics[metric.name] = metric
+
+    def add_stats(
+        self,
+        prefix: str,
+        source: Callable[[], dict[str, float]]
+    ) -> None:
+        self.stats[prefix] = source
+
+    def on_collect(self, callback: Callable[[], None]) -> None:
+        self.callbacks.append(callback)
+
+    def render(self) -> str:
+        for callback in self.callbacks:
+            callback()
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        for prefix, source in self.stats.items():
+            for key, value in source().items():
+                name = f'{prefix}_{key}'
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {format_value(value)}')
+        lines.append('')
+        return '\n'.join(lines)
+
+
+class MetricsHandler(RequestHandler):
+
+    def get(self) -> None:
+        self.set_header('Content-Type', CONTENT_TYPE)
+        self.write(MetricsRegistry().render())
+
+
+def serve(port: int, address: str = '') -> HTTPServer:
+    """Serve `GET /metrics` on `port`."""
+    server = HTTPServer(Application(
+        [('/metrics', MetricsHandler)],
+        log_function=lambda handler: None
+    ))
+    server.listen(port, address)
+    logger.info(f'metrics on port {port}')
+    return server
+
+
+def log_metrics() -> None:
+    logger.info('metrics\n' + MetricsRegistry().render())
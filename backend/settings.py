@@ -14,9 +14,32 @@ BOT_RSI_JOB_INTERVAL = 1800.0
 BOT_VOLATILITY_JOB_INTERVAL = 1800.0
 BOT_FLATS_JOB_INTERVAL = 1800.0
 BOT_TREND_JOB_INTERVAL = 1800.0
+BOT_STREAMING_INDICATORS = False
+BOT_KLINE_STREAM = False
+BOT_MESSAGES_WINDOW = 1.0
+BOT_MESSAGES_MAX_PER_SECOND = 25
+BOT_CHAT_MESSAGES_MAX_PER_SECOND = 1.0
+BOT_GROUP_MESSAGES_MAX_PER_MINUTE = 20
+BOT_METRICS_LOG_INTERVAL = 0.0
+BOT_SCANNER_CONCURRENCY = 8
+BOT_INDICATORS_EXECUTOR = ''
+BOT_INDICATORS_WORKERS = 0
+BOT_INDICATORS_ENGINE = 'pandas_ta'
+BOT_SHARDS = 0
+BOT_SHARDS_WATCH_INTERVAL = 5.0
+BOT_SCHEDULE_ALIGNED = False
+BOT_SCHEDULE_SETTLE = 2.0
+BOT_SCHEDULE_JITTER = 1.0
+BOT_SKIP_UNCHANGED = False
 
 CLIENT_MAX_PER_SECOND = 3
 CLIENT_MAX_PER_MINUTE = 100
+CLIENT_CANDLES_STORE_MAX_BYTES = 64 * 1024 * 1024
+CLIENT_RETRY_ATTEMPTS = 6
+CLIENT_RETRY_BASE_DELAY = 1.0
+CLIENT_RETRY_MAX_DELAY = 30.0
+CLIENT_ARCHIVE_CONCURRENCY = 8
+CLIENT_SYMBOLS_TTL = 3600.0
 
 
 class Enviroment:
@@ -31,6 +54,10 @@ class Enviroment:
     WEBHOOK_KEY = 'WEBHOOK_KEY'
     BYBIT_API_KEY = 'BYBIT_API_KEY'
     BYBIT_API_SECRET = 'BYBIT_API_SECRET'
+    JOBS_DATABASE = 'JOBS_DATABASE'
+    BYBIT_API_URL = 'BYBIT_API_URL'
+    METRICS_PORT = 'METRICS_PORT'
+    CANDLES_ARCHIVE = 'CANDLES_ARCHIVE'
 
     __instance: Self = None
 
@@ -57,6 +84,10 @@ class Enviroment:
         self.__webhook_key = os.getenv(type(self).WEBHOOK_KEY)
         self.__bybit_api_key = os.getenv(type(self).BYBIT_API_KEY)
         self.__bybit_api_secret = os.getenv(type(self).BYBIT_API_SECRET)
+        self.__jobs_database = os.getenv(type(self).JOBS_DATABASE)
+        self.__bybit_api_url = os.getenv(type(self).BYBIT_API_URL)
+        self.__metrics_port = int(os.getenv(type(self).METRICS_PORT, 0))
+        self.__candles_archive = os.getenv(type(self).CANDLES_ARCHIVE)
 
     @property
     def debug(self) -> bool:
@@ -97,3 +128,19 @@ class Enviroment:
     @property
     def bybit_api_secret(self) -> str | None:
         return self.__bybit_api_secret
+
+    @property
+    def jobs_database(self) -> str | None:
+        return self.__jobs_database
+
+    @property
+    def bybit_api_url(self) -> str | None:
+        return self.__bybit_api_url
+
+    @property
+    def metrics_port(self) -> int:
+        return self.__metrics_port
+
+    @property
+    def candles_archive(self) -> str | None:
+        return self.__candles_archive
@@ -0,0 +1,485 @@
+"""Job groups sharded over worker processes sharing one Bybit client.
+
+The bot process keeps the Telegram application, the job registry and the
+`BybitClient` with the whole request budget. Every subscription is sent
+to the worker owning its (coin, interval), workers evaluate their groups
+on their own event loop and get candles and symbols from the bot process
+over a Unix socket, their alerts come back the same way.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+from multiprocessing.process import (
+    BaseProcess,
+)
+import os
+import shutil
+import struct
+import tempfile
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Self,
+    TYPE_CHECKING,
+)
+import zlib
+
+import numpy
+
+from backend import metrics
+from backend import settings
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+)
+from backend.candles import (
+    Candles,
+)
+from backend.exceptions import (
+    BybitClientError,
+)
+from backend.limiter import (
+    Priority,
+)
+
+if TYPE_CHECKING:
+    from backend.jobs import (
+        BotJobHelper,
+        EvaluationGroup,
+    )
+
+logger = logging.getLogger(__name__)
+
+SHARDS = settings.BOT_SHARDS
+WATCH_INTERVAL = settings.BOT_SHARDS_WATCH_INTERVAL
+SCHEDULE_ALIGNED = settings.BOT_SCHEDULE_ALIGNED
+LOG_LEVEL = settings.LOG_LEVEL
+
+FRAME = struct.Struct('!II')
+
+HELLO = 'hello'
+ADD = 'add'
+REMOVE = 'remove'
+CLEAR = 'clear'
+CANDLES = 'candles'
+SYMBOLS = 'symbols'
+MESSAGES = 'messages'
+
+
+async def read_frame(
+    reader: asyncio.StreamReader
+) -> tuple[dict[str, Any], bytes]:
+    """JSON header and binary payload of one frame."""
+    size, payload_size = FRAME.unpack(await reader.readexactly(FRAME.size))
+    message = json.loads(await reader.readexactly(size))
+    payload = await reader.readexactly(payload_size) if payload_size else b''
+    return message, payload
+
+
+def write_frame(
+    writer: asyncio.StreamWriter,
+    message: dict[str, Any],
+    payload: bytes = b''
+) -> None:
+    data = json.dumps(message).encode()
+    writer.write(FRAME.pack(len(data), len(payload)) + data + payload)
+
+
+def get_shard(coin: str, interval: KLineInterval, shards: int) -> int:
+    """Worker of a market, stable across restarts.
+
+    All groups of a market share a worker, so streaming indicators of the
+    market stay in one process.
+    """
+    return zlib.crc32(f'{coin}-{interval.value}'.encode()) % shards
+
+
+class ShardsHub:
+    """Bot process side: worker processes, subscriptions and candles.
+
+    Subscriptions sent to a worker are recorded, a worker connecting or
+    reconnecting after a restart gets all of its subscriptions again with
+    the first runs of its groups spread over their interval, unless the
+    schedule is aligned to candle closes.
+    """
+
+    __instance: Self = None
+
+    @classmethod
+    def get_instance(cls) -> Self | None:
+        if not SHARDS:
+            return None
+        if cls.__instance is None:
+            cls.__instance = cls(SHARDS)
+        return cls.__instance
+
+    def __init__(self, shards: int) -> None:
+        self.shards = shards
+        self.directory = tempfile.mkdtemp(prefix='bot-shards-')
+        self.path = os.path.join(self.directory, 'hub.sock')
+        self.processes: list[BaseProcess | None] = [None] * shards
+        self.writers: list[asyncio.StreamWriter | None] = [None] * shards
+        self.records: dict[str, dict[str, Any]] = {}
+        self.on_messages: Callable[[list[tuple[int, str]]], None] = (
+            lambda messages: None
+        )
+        self.__server: asyncio.Server | None = None
+        self.__tasks: set[asyncio.Task] = set()
+        self.__requests = 0
+        self.__errors = 0
+        self.__sent_bytes = 0
+        self.__restarts = 0
+        metrics.MetricsRegistry().add_stats('bot_shards', lambda: self.stats)
+
+    async def start(
+        self,
+        on_messages: Callable[[list[tuple[int, str]]], None]
+    ) -> None:
+        """Listen for workers and start them, alerts go to `on_messages`."""
+        self.on_messages = on_messages
+        self.__server = await asyncio.start_unix_server(
+            self.handle,
+            path=self.path
+        )
+        for shard in range(self.shards):
+            self.spawn(shard)
+        self.spawn_task(self.watch())
+
+    async def stop(self) -> None:
+        for task in list(self.__tasks):
+            task.cancel()
+        if self.__server is not None:
+            self.__server.close()
+            self.__server = None
+        for writer in self.writers:
+            if writer is not None:
+                writer.close()
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+                process.join(timeout=5.0)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def spawn(self, shard: int) -> None:
+        process = multiprocessing.get_context('forkserver').Process(
+            target=run_worker,
+            args=(self.path, shard),
+            name=f'shard-{shard}',
+            daemon=True
+        )
+        process.start()
+        self.processes[shard] = process
+
+    def spawn_task(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+    async def watch(self) -> None:
+        """Restart workers that exited."""
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            for shard, process in enumerate(self.processes):
+                if process is not None and not process.is_alive():
+                    logger.warning(f'shard {shard} exited with code '
+                                   f'{process.exitcode}, restarting')
+                    self.__restarts += 1
+                    self.spawn(shard)
+
+    async def handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        shard = None
+        try:
+            message, _ = await read_frame(reader)
+            shard = message['shard']
+            self.writers[shard] = writer
+            self.sync(shard)
+            logger.info(f'shard {shard} connected')
+            while True:
+                message, _ = await read_frame(reader)
+                if message['type'] == MESSAGES:
+                    self.on_messages([
+                        (chat_id, text)
+                        for chat_id, text in message['messages']
+                    ])
+                else:
+                    self.spawn_task(self.reply(writer, message))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if shard is not None and self.writers[shard] is writer:
+                self.writers[shard] = None
+                logger.warning(f'shard {shard} disconnected')
+            writer.close()
+
+    async def reply(
+        self,
+        writer: asyncio.StreamWriter,
+        message: dict[str, Any]
+    ) -> None:
+        """Answer a candles or symbols request of a worker."""
+        client = BybitClient()
+        response = {'id': message['id']}
+        payload = b''
+        self.__requests += 1
+        try:
+            if message['type'] == CANDLES:
+                data = await client.get_candles(
+                    symbol=message['symbol'],
+                    interval=KLineInterval(message['interval']),
+                    limit=message['limit'],
+                    user=message['user']
+                )
+                values = numpy.ascontiguousarray(data.values)
+                response['shape'] = values.shape
+                payload = values.tobytes()
+            else:
+                response['symbols'] = await client.get_symbols(
+                    user=message['user']
+                )
+        except BybitClientError as error:
+            self.__errors += 1
+            response['error'] = str(error)
+        if writer.is_closing():
+            return
+        write_frame(writer, response, payload)
+        self.__sent_bytes += len(payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def send(self, shard: int, message: dict[str, Any]) -> None:
+        writer = self.writers[shard]
+        if writer is not None and not writer.is_closing():
+            write_frame(writer, message)
+
+    def sync(self, shard: int) -> None:
+        """Send all subscriptions of a worker, replacing what it has."""
+        self.send(shard, {'type': CLEAR})
+        records = [
+            record for record in self.records.values()
+            if record['shard'] == shard
+        ]
+        groups: dict[str, float] = {}
+        for record in records:
+            groups.setdefault(record['group'], record['interval'])
+        firsts = {
+            group: None if SCHEDULE_ALIGNED else (
+                interval * (number + 1) / len(groups)
+            )
+            for number, (group, interval) in enumerate(groups.items())
+        }
+        for record in records:
+            self.send(shard, dict(record, first=firsts[record['group']]))
+
+    def add(
+        self,
+        helper: 'BotJobHelper',
+        chat_id: int,
+        first: float | None = None
+    ) -> None:
+        """Subscribe a job helper on its worker.
+
+        `first` is the delay of the first run if the subscription creates
+        a group on the worker, by default the group phase when aligned or
+        one interval.
+        """
+        coin, interval, limit = helper.get_market()
+        shard = get_shard(coin, interval, self.shards)
+        record = {
+            'type': ADD,
+            'shard': shard,
+            'group': f'{coin}-{interval.value}-{limit}',
+            'interval': type(helper).get_job_interval(),
+            'user_id': helper.user_id,
+            'chat_id': chat_id,
+            'prefix': type(helper).get_job_prefix(),
+            'params': helper.get_job_params(),
+        }
+        self.records[helper.name] = record
+        self.send(shard, dict(record, first=first))
+
+    def remove(self, name: str) -> None:
+        record = self.records.pop(name, None)
+        if record is not None:
+            self.send(record['shard'], {'type': REMOVE, 'name': name})
+
+    def clear(self) -> None:
+        self.records.clear()
+        for shard in range(self.shards):
+            self.send(shard, {'type': CLEAR})
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'shards': self.shards,
+            'connected': sum(writer is not None for writer in self.writers),
+            'subscriptions': len(self.records),
+            'requests': self.__requests,
+            'errors': self.__errors,
+            'sent_bytes': self.__sent_bytes,
+            'restarts': self.__restarts,
+        }
+
+
+class FetcherClient:
+    """`BybitClient` calls of a worker, served by the bot process."""
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.pending: dict[int, asyncio.Future] = {}
+        self.__number = 0
+
+    async def request(
+        self,
+        message: dict[str, Any]
+    ) -> tuple[dict[str, Any], bytes]:
+        self.__number += 1
+        message['id'] = self.__number
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.__number] = future
+        try:
+            write_frame(self.writer, message)
+            response, payload = await future
+        finally:
+            self.pending.pop(message['id'], None)
+        if 'error' in response:
+            raise BybitClientError(response['error'])
+        return response, payload
+
+    def resolve(self, response: dict[str, Any], payload: bytes) -> None:
+        future = self.pending.get(response['id'])
+        if future is not None and not future.done():
+            future.set_result((response, payload))
+
+    def fail(self, error: Exception) -> None:
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def get_symbols(
+        self,
+        priority: Priority = Priority.BACKGROUND,
+        user: Hashable = None
+    ) -> list[str]:
+        response, _ = await self.request({'type': SYMBOLS, 'user': user})
+        return response['symbols']
+
+    async def get_candles(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        limit: int,
+        priority: Priority = Priority.BACKGROUND,
+        user: Hashable = None
+    ) -> Candles:
+        response, payload = await self.request({
+            'type': CANDLES,
+            'symbol': symbol,
+            'interval': interval.value,
+            'limit': limit,
+            'user': user,
+        })
+        values = numpy.frombuffer(payload, dtype=numpy.float64)
+        return Candles(values.reshape(response['shape']))
+
+
+class ShardWorker:
+    """Worker process side: its groups evaluated on their intervals."""
+
+    def __init__(self, path: str, shard: int) -> None:
+        from backend.jobs import (
+            EvaluationEngine,
+        )
+        self.path = path
+        self.shard = shard
+        self.engine = EvaluationEngine()
+        self.tasks: dict[tuple, asyncio.Task] = {}
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def run(self) -> None:
+        reader, self.writer = await asyncio.open_unix_connection(self.path)
+        client = FetcherClient(self.writer)
+        self.engine.client = client
+        write_frame(self.writer, {'type': HELLO, 'shard': self.shard})
+        try:
+            while True:
+                message, payload = await read_frame(reader)
+                if 'id' in message:
+                    client.resolve(message, payload)
+                else:
+                    self.dispatch(message)
+        except (asyncio.IncompleteReadError, ConnectionError) as error:
+            logger.info(f'shard {self.shard}: bot process closed')
+            client.fail(BybitClientError(f'fetcher closed: {error!r}'))
+        finally:
+            self.clear()
+            self.engine.executor.shutdown()
+            self.writer.close()
+
+    def dispatch(self, message: dict[str, Any]) -> None:
+        from backend.jobs import (
+            BotJobsShell,
+            get_first,
+        )
+        if message['type'] == ADD:
+            helper = BotJobsShell.get_helper_class(message['prefix'])(
+                message['user_id'],
+                *message['params']
+            )
+            group, created = self.engine.add(helper, message['chat_id'])
+            if created:
+                first = get_first(group, message['first'])
+                self.tasks[group.key] = asyncio.create_task(self.repeat(
+                    group,
+                    group.interval if first is None else first
+                ))
+        elif message['type'] == REMOVE:
+            _, group = self.engine.remove(message['name'])
+            if group is not None:
+                self.tasks.pop(group.key).cancel()
+        elif message['type'] == CLEAR:
+            self.clear()
+
+    def clear(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+        self.engine.clear()
+
+    async def repeat(
+        self,
+        group: 'EvaluationGroup',
+        first: float
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        due = loop.time() + first
+        while True:
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            due += group.interval
+            try:
+                messages = await self.engine.evaluate(group)
+            except Exception:
+                logger.exception(f'{group.name} failed')
+                continue
+            if messages and not self.writer.is_closing():
+                write_frame(self.writer, {
+                    'type': MESSAGES,
+                    'messages': messages,
+                })
+
+
+def run_worker(path: str, shard: int) -> None:
+    """Entry point of a worker process."""
+    logging.basicConfig(
+        format=f'%(asctime)s - shard {shard} - %(name)s - %(levelname)s - '
+               f'%(message)s',
+        level=LOG_LEVEL
+    )
+    asyncio.run(ShardWorker(path, shard).run())
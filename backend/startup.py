@@ -0,0 +1,179 @@
+"""Import time and memory of the bot start, per top-level module.
+
+Run with `python -m backend.startup`. Every measurement runs in a fresh
+interpreter: `-X importtime` gives the import time, `tracemalloc` the
+memory allocated while importing grouped by the package of the file that
+allocated it. `--first-use` also measures the first indicator call, which
+imports the numeric stack loaded lazily, its time includes the overhead
+of `tracemalloc`.
+"""
+import argparse
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+IMPORT_TIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)')
+BACKEND = 'backend'
+
+
+def get_rss() -> int:
+    """Resident set size of this process in bytes."""
+    with open('/proc/self/statm') as file:
+        pages = int(file.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def get_group(module: str) -> str:
+    """`backend.<module>` for the bot modules, the top package otherwise."""
+    parts = module.split('.')
+    if parts[0] == BACKEND:
+        return '.'.join(parts[:2])
+    return parts[0]
+
+
+def get_import_times(module: str) -> dict[str, list[float]]:
+    """Self and cumulative import milliseconds per module group."""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times: dict[str, list[float]] = {}
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match is None:
+            continue
+        own, cumulative, name = match.groups()
+        group = get_group(name)
+        values = times.setdefault(group, [0.0, 0.0])
+        values[0] += int(own) / 1000.0
+        if name == group:
+            values[1] = int(cumulative) / 1000.0
+    return times
+
+
+def first_use() -> None:
+    import numpy
+    from backend.bybit import BybitClient
+    from backend.candles import Candles
+    values = numpy.ones((7, 240))
+    values[4] += numpy.sin(numpy.arange(240) / 10.0)
+    BybitClient.rsi(Candles(values))
+
+
+def get_sources() -> list[tuple[str, str]]:
+    """(path, group) of the loaded modules, longest path first.
+
+    The path of a package is its directory, so that files of submodules
+    never imported still fall into it.
+    """
+    sources = []
+    for name, loaded in list(sys.modules.items()):
+        path = getattr(loaded, '__file__', None)
+        if not path:
+            continue
+        if os.path.basename(path) == '__init__.py':
+            path = os.path.dirname(path) + os.sep
+        sources.append((path, get_group(name)))
+    return sorted(sources, key=lambda source: -len(source[0]))
+
+
+def measure(module: str, use: bool) -> dict:
+    """Memory of importing `module` in this process."""
+    tracemalloc.start()
+    rss = get_rss()
+    started = time.perf_counter()
+    importlib.import_module(module)
+    imported = time.perf_counter()
+    rss_imported = get_rss()
+    if use:
+        first_use()
+    used = time.perf_counter()
+    snapshot = tracemalloc.take_snapshot()
+    sources = get_sources()
+    memory: dict[str, int] = {}
+    for statistic in snapshot.statistics('filename'):
+        filename = statistic.traceback[0].filename
+        group = next(
+            (group for path, group in sources if filename.startswith(path)),
+            '<other>'
+        )
+        memory[group] = memory.get(group, 0) + statistic.size
+    return {
+        'import_seconds': imported - started,
+        'first_use_seconds': used - imported,
+        'rss_before': rss,
+        'rss_imported': rss_imported,
+        'rss_used': get_rss(),
+        'memory': memory,
+    }
+
+
+def run_measure(module: str, use: bool) -> dict:
+    command = [sys.executable, '-m', 'backend.startup', module, '--measure']
+    if use:
+        command.append('--first-use')
+    process = subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def report(module: str, use: bool, top: int) -> None:
+    times = get_import_times(module)
+    result = run_measure(module, use)
+    memory = result['memory']
+    groups = sorted(
+        set(times) | set(memory),
+        key=lambda group: (
+            -times.get(group, [0.0, 0.0])[1],
+            -memory.get(group, 0)
+        )
+    )
+    print(f'{"module":<24}{"self ms":>10}{"total ms":>10}{"memory KiB":>12}')
+    for group in groups[:top]:
+        own, cumulative = times.get(group, [0.0, 0.0])
+        print(f'{group:<24}{own:>10.1f}{cumulative:>10.1f}'
+              f'{memory.get(group, 0) / 1024:>12.0f}')
+    megabyte = 1024 * 1024
+    print(f'import {module}: {times[get_group(module)][1]:.0f} ms, RSS '
+          f'{result["rss_before"] / megabyte:.0f} -> '
+          f'{result["rss_imported"] / megabyte:.0f} MiB')
+    if use:
+        print(f'first indicator call: {result["first_use_seconds"]:.2f} s '
+              f'traced, RSS {result["rss_used"] / megabyte:.0f} MiB')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m backend.startup',
+        description='Report import time and memory per module of the bot '
+                    'start.'
+    )
+    parser.add_argument('module', nargs='?', default='backend.main')
+    parser.add_argument(
+        '--first-use',
+        action='store_true',
+        help='also measure the first indicator call'
+    )
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--measure', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.module, args.first_use)))
+    else:
+        report(args.module, args.first_use, args.top)
+
+
+if __name__ == '__main__':
+    main()
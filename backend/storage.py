@@ -0,0 +1,89 @@
+import json
+import sqlite3
+from typing import (
+    Self,
+)
+
+from backend import settings
+
+JobRecord = tuple[int, int, str, list[str]]
+
+
+class JobStore:
+    """SQLite table of subscribed jobs, one row per job name.
+
+    A row keeps what is needed to build the job helper again: user, chat,
+    job prefix and the job parameters.
+    """
+
+    __instance: Self = None
+
+    @classmethod
+    def get_instance(cls) -> Self | None:
+        path = settings.Enviroment.get_instance().jobs_database
+        if not path:
+            return None
+        if cls.__instance is None:
+            cls.__instance = cls(path)
+        return cls.__instance
+
+    def __init__(self, path: str) -> None:
+        self.__connection = sqlite3.connect(path)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'name TEXT PRIMARY KEY, '
+            'user_id INTEGER NOT NULL, '
+            'chat_id INTEGER NOT NULL, '
+            'prefix TEXT NOT NULL, '
+            'params TEXT NOT NULL)'
+        )
+        self.__connection.commit()
+
+    def save(
+        self,
+        name: str,
+        user_id: int,
+        chat_id: int,
+        prefix: str,
+        params: list[str]
+    ) -> None:
+        with self.__connection:
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)',
+                (name, user_id, chat_id, prefix, json.dumps(params))
+            )
+
+    def save_many(self, records: list[tuple[str, JobRecord]]) -> None:
+        with self.__connection:
+            self.__connection.executemany(
+                'INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)',
+                [
+                    (name, user_id, chat_id, prefix, json.dumps(params))
+                    for name, (user_id, chat_id, prefix, params) in records
+                ]
+            )
+
+    def delete(self, name: str) -> None:
+        with self.__connection:
+            self.__connection.execute(
+                'DELETE FROM jobs WHERE name = ?',
+                (name,)
+            )
+
+    def clear(self) -> None:
+        with self.__connection:
+            self.__connection.execute('DELETE FROM jobs')
+
+    def load(self) -> list[JobRecord]:
+        with self.__connection:
+            rows = self.__connection.execute(
+                'SELECT user_id, chat_id, prefix, params FROM jobs'
+            ).fetchall()
+        return [
+            (user_id, chat_id, prefix, json.loads(params))
+            for user_id, chat_id, prefix, params in rows
+        ]
+
+    def close(self) -> None:
+        self.__connection.close()
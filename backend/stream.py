@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Self,
+)
+
+import numpy
+from tornado.websocket import (
+    WebSocketClientConnection,
+    WebSocketClosedError,
+    websocket_connect,
+)
+
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+)
+from backend import settings
+
+logger = logging.getLogger(__name__)
+
+DEBUG = settings.Enviroment().debug
+
+CandleCloseCallback = Callable[[str, KLineInterval, float], Awaitable[None]]
+
+
+class KlineStream:
+    """Bybit public kline WebSocket feeding the candle store.
+
+    Every kline update is merged into the `BybitClient` candle buffer of
+    its (symbol, interval), which then serves windows without polling.
+    The callback is awaited when a candle closes. Topics are subscribed
+    again after every reconnect.
+    """
+
+    __instance: Self = None
+
+    URL = 'wss://stream.bybit.com/v5/public/linear'
+    TEST_URL = 'wss://stream-testnet.bybit.com/v5/public/linear'
+
+    PING_INTERVAL = 20.0
+    RECONNECT_MIN_DELAY = 1.0
+    RECONNECT_MAX_DELAY = 60.0
+    TOPICS_PER_REQUEST = 10
+
+    @staticmethod
+    def get_topic(symbol: str, interval: KLineInterval) -> str:
+        return f'kline.{interval.value}.{symbol}'
+
+    @staticmethod
+    def parse_topic(topic: str) -> tuple[str, KLineInterval]:
+        _, interval, symbol = topic.split('.', 2)
+        return symbol, KLineInterval(interval)
+
+    def __new__(cls) -> Self:
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    def __init__(self) -> None:
+        if hasattr(self, 'topics'):
+            return
+        self.url = type(self).TEST_URL if DEBUG else type(self).URL
+        self.topics: dict[str, int] = {}
+        self.callback: CandleCloseCallback | None = None
+        self.connection: WebSocketClientConnection | None = None
+        self.task: asyncio.Task | None = None
+        self.callbacks: set[asyncio.Task] = set()
+
+    def subscribe(self, symbol: str, interval: KLineInterval) -> None:
+        topic = type(self).get_topic(symbol, interval)
+        self.topics[topic] = self.topics.get(topic, 0) + 1
+        if self.topics[topic] == 1:
+            self.send('subscribe', [topic])
+
+    def unsubscribe(self, symbol: str, interval: KLineInterval) -> None:
+        topic = type(self).get_topic(symbol, interval)
+        count = self.topics.get(topic, 0) - 1
+        if count > 0:
+            self.topics[topic] = count
+        elif topic in self.topics:
+            del self.topics[topic]
+            self.send('unsubscribe', [topic])
+            self.set_live(topic, False)
+
+    def send(self, operation: str, args: list[str]) -> None:
+        if self.connection is None:
+            return
+        step = type(self).TOPICS_PER_REQUEST
+        try:
+            for index in range(0, len(args), step):
+                self.connection.write_message(json.dumps({
+                    'op': operation,
+                    'args': args[index:index + step],
+                }))
+        except WebSocketClosedError:
+            pass
+
+    def set_live(self, topic: str, live: bool) -> None:
+        buffer = BybitClient().store.get(type(self).parse_topic(topic))
+        if buffer is not None:
+            buffer.live = live
+
+    def start(self, callback: CandleCloseCallback) -> None:
+        self.callback = callback
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        delay = type(self).RECONNECT_MIN_DELAY
+        while True:
+            try:
+                self.connection = await websocket_connect(self.url)
+                delay = type(self).RECONNECT_MIN_DELAY
+                self.send('subscribe', list(self.topics))
+                await self.listen(self.connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.warning(f'kline stream error: {error!r}')
+            finally:
+                if self.connection is not None:
+                    self.connection.close()
+                    self.connection = None
+                for topic in self.topics:
+                    self.set_live(topic, False)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, type(self).RECONNECT_MAX_DELAY)
+
+    async def listen(self, connection: WebSocketClientConnection) -> None:
+        ping = asyncio.create_task(self.ping(connection))
+        try:
+            while True:
+                message = await connection.read_message()
+                if message is None:
+                    return
+                await self.handle(json.loads(message))
+        finally:
+            ping.cancel()
+
+    async def ping(self, connection: WebSocketClientConnection) -> None:
+        while True:
+            await asyncio.sleep(type(self).PING_INTERVAL)
+            try:
+                connection.write_message(json.dumps({'op': 'ping'}))
+            except WebSocketClosedError:
+                return
+
+    async def handle(self, message: dict[str, Any]) -> None:
+        topic = message.get('topic', '')
+        if not topic.startswith('kline.') or topic not in self.topics:
+            return
+        symbol, interval = type(self).parse_topic(topic)
+        for kline in message.get('data', []):
+            start_time = float(kline['start']) / 1000.0
+            self.merge(symbol, interval, start_time, kline)
+            if kline.get('confirm') and self.callback is not None:
+                task = asyncio.create_task(
+                    self.callback(symbol, interval, start_time)
+                )
+                self.callbacks.add(task)
+                task.add_done_callback(self.callback_done)
+
+    def callback_done(self, task: asyncio.Task) -> None:
+        self.callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f'candle close callback error: {task.exception()!r}'
+            )
+
+    def merge(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        start_time: float,
+        kline: dict[str, Any]
+    ) -> None:
+        buffer = BybitClient().store.get((symbol, interval))
+        if buffer is None:
+            return
+        if start_time > buffer.last_start + interval.seconds:
+            buffer.live = False
+            return
+        values = numpy.array([
+            [start_time],
+            [float(kline['open'])],
+            [float(kline['high'])],
+            [float(kline['low'])],
+            [float(kline['close'])],
+            [float(kline['volume'])],
+            [float(kline['turnover'])],
+        ])
+        buffer.merge(values)
+        buffer.live = True
+        if kline.get('confirm'):
+            BybitClient().save_candles(symbol, interval, values)
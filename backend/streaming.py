@@ -0,0 +1,280 @@
+from collections import (
+    deque,
+)
+import math
+import sys
+from typing import (
+    Hashable,
+    Self,
+)
+
+from backend.candles import (
+    Candles,
+)
+
+NAN = math.nan
+EPSILON = sys.float_info.epsilon
+HISTORY_LENGTH = 16
+
+
+def true_range(high: float, low: float, previous: float) -> float:
+    """`pandas_ta.true_range`, which never drops to zero."""
+    return max(
+        high - low,
+        abs(high - previous),
+        abs(low - previous)
+    ) or EPSILON
+
+
+class WilderWindow:
+    """Streaming `pandas_ta.rma` of the latest `count` values only.
+
+    Jobs compute their indicators on a candles window, so the average
+    starts over at the first value of the window. The window values
+    weighted by powers of the decay are summed, a new value decays the sum
+    and the value leaving the window is taken out with the weight it has
+    reached by then.
+    """
+
+    __slots__ = ('length', 'decay', 'tail', 'values', 'total')
+
+    def __init__(self, length: int, count: int) -> None:
+        count = max(1, count)
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.tail = self.decay ** (count - 1)
+        self.values: deque[float] = deque(maxlen=count)
+        self.total = 0.0
+
+    def update(self, value: float) -> float:
+        self.total = value + self.decay * self.get_head()
+        self.values.append(value)
+        return self.value
+
+    def peek(self, value: float) -> float:
+        """Average of the window ending at a provisional value."""
+        return self.get_mean(
+            value + self.decay * self.get_head(),
+            len(self.values) + 1
+        )
+
+    def get_head(self) -> float:
+        """Weighted sum of the values a new value keeps in the window."""
+        if len(self.values) == self.values.maxlen:
+            return self.total - self.tail * self.values[0]
+        return self.total
+
+    def get_mean(self, total: float, count: int) -> float:
+        count = min(count, self.values.maxlen)
+        if count < self.length:
+            return NAN
+        return total * (1.0 - self.decay) / (1.0 - self.decay ** count)
+
+    @property
+    def value(self) -> float:
+        return self.get_mean(self.total, len(self.values))
+
+
+def get_rsi(positive: float, negative: float) -> float:
+    total = positive + negative
+    if not total > 0.0:
+        return NAN
+    return 100.0 * positive / total
+
+
+class StreamingRsi:
+    """RSI of a window of `size` bars advanced by one closed bar."""
+
+    __slots__ = ('previous', 'positive', 'negative')
+
+    def __init__(self, size: int, length: int = 14) -> None:
+        self.previous = NAN
+        self.positive = WilderWindow(length, size - 1)
+        self.negative = WilderWindow(length, size - 1)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        difference = close - self.previous
+        self.previous = close
+        if not math.isnan(difference):
+            self.positive.update(max(difference, 0.0))
+            self.negative.update(max(-difference, 0.0))
+        return self.value
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        """Value for a still forming bar, state is unchanged."""
+        difference = close - self.previous
+        if math.isnan(difference):
+            return NAN
+        return get_rsi(
+            self.positive.peek(max(difference, 0.0)),
+            self.negative.peek(max(-difference, 0.0))
+        )
+
+    @property
+    def value(self) -> float:
+        return get_rsi(self.positive.value, self.negative.value)
+
+
+class StreamingAtr:
+    """ATR of a window of `size` bars advanced by one closed bar."""
+
+    __slots__ = ('previous', 'average')
+
+    def __init__(self, size: int, length: int = 14) -> None:
+        self.previous = NAN
+        self.average = WilderWindow(length, size - 1)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if not math.isnan(self.previous):
+            self.average.update(true_range(high, low, self.previous))
+        self.previous = close
+        return self.value
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        """Value for a still forming bar, state is unchanged."""
+        if math.isnan(self.previous):
+            return NAN
+        return self.average.peek(true_range(high, low, self.previous))
+
+    @property
+    def value(self) -> float:
+        return self.average.value
+
+
+class StreamingDirections:
+    """+DI (`dmp`) and -DI (`dmn`) of `pandas_ta.adx` over `size` bars.
+
+    Both are averages of the moves over the ATR on the same window, so
+    the sums of their weights cancel out. The ADX line is not kept: it
+    averages DX values that each depend on where the window starts.
+    """
+
+    __slots__ = ('high', 'low', 'previous', 'range', 'positive', 'negative')
+
+    def __init__(self, size: int, length: int = 14) -> None:
+        self.high = NAN
+        self.low = NAN
+        self.previous = NAN
+        self.range = WilderWindow(length, size - 1)
+        self.positive = WilderWindow(length, size - 1)
+        self.negative = WilderWindow(length, size - 1)
+
+    def update(self, high: float, low: float, close: float) -> None:
+        if not math.isnan(self.previous):
+            up = high - self.high
+            down = self.low - low
+            self.range.update(true_range(high, low, self.previous))
+            self.positive.update(up if up > down and up > 0.0 else 0.0)
+            self.negative.update(down if down > up and down > 0.0 else 0.0)
+        self.high = high
+        self.low = low
+        self.previous = close
+
+    @property
+    def dmp(self) -> float:
+        return 100.0 * self.positive.value / self.range.value
+
+    @property
+    def dmn(self) -> float:
+        return 100.0 * self.negative.value / self.range.value
+
+
+class MarketIndicators:
+    """Streaming indicators of one (symbol, interval) and window size.
+
+    Values are those of the `size` bars window the jobs request, as
+    `pandas_ta` computes them on it. Closed candles are fed once, the last
+    candle of a window is treated as still forming and only gives
+    provisional values. Trend directions are kept for the closed candles
+    ending the `size - 8` bars window that `ta.trend` looks at.
+    """
+
+    def __init__(self, size: int, length: int = 14) -> None:
+        self.__size = size
+        self.__length = length
+        self.reset()
+
+    def reset(self) -> None:
+        self.__rsi = StreamingRsi(self.__size, self.__length)
+        self.__atr = StreamingAtr(self.__size, self.__length)
+        self.__directions = StreamingDirections(
+            self.__size - 8,
+            self.__length
+        )
+        self.__history: deque[tuple[float, float, float]] = deque(
+            maxlen=HISTORY_LENGTH
+        )
+        self.__last_start: float | None = None
+        self.__forming: tuple[float, float, float] = (NAN, NAN, NAN)
+
+    def feed(self, candles: Candles) -> Self:
+        start_time = candles.start_time
+        closed = len(candles) - 1
+        if self.__last_start is not None:
+            first = int(start_time.searchsorted(self.__last_start, 'right'))
+            if first == 0 or not start_time[first - 1] == self.__last_start:
+                self.reset()
+                first = 0
+        else:
+            first = 0
+        high = candles.high
+        low = candles.low
+        close = candles.close
+        directions = self.__directions
+        for index in range(first, closed):
+            bar = (float(high[index]), float(low[index]), float(close[index]))
+            self.__rsi.update(*bar)
+            self.__atr.update(*bar)
+            directions.update(*bar)
+            self.__history.append(
+                (float(start_time[index]), directions.dmp, directions.dmn)
+            )
+            self.__last_start = float(start_time[index])
+        self.__forming = (
+            float(high[closed]),
+            float(low[closed]),
+            float(close[closed])
+        )
+        return self
+
+    def directions(self, start_time: float) -> tuple[float, float]:
+        """+DI and -DI as of the closed candle starting at `start_time`."""
+        for start, dmp, dmn in reversed(self.__history):
+            if start == start_time:
+                return dmp, dmn
+        return NAN, NAN
+
+    @property
+    def rsi(self) -> float:
+        return self.__rsi.peek(*self.__forming)
+
+    @property
+    def atr(self) -> float:
+        return self.__atr.peek(*self.__forming)
+
+
+class IndicatorsRegistry:
+
+    __instance: Self = None
+
+    def __new__(cls) -> Self:
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    def __init__(self) -> None:
+        if hasattr(self, 'markets'):
+            return
+        self.markets: dict[Hashable, MarketIndicators] = {}
+
+    def get(self, key: Hashable, size: int) -> MarketIndicators:
+        market = self.markets.get(key)
+        if market is None:
+            market = self.markets[key] = MarketIndicators(size)
+        return market
+
+    def remove(self, key: Hashable) -> None:
+        self.markets.pop(key, None)
+
+    def clear(self) -> None:
+        self.markets.clear()
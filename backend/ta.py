@@ -1,94 +1,489 @@
-from pandas import (
-    DataFrame,
-    Series,
+from typing import (
+    TYPE_CHECKING,
 )
-import pandas_ta
 
+import numpy
 
-def rsi(close: Series, length: int = 14) -> DataFrame:
-    return pandas_ta.rsi(close, length)
+from backend import indicators
+from backend import settings
+
+if TYPE_CHECKING:
+    from pandas import (
+        Series,
+    )
+
+PANDAS_TA = 'pandas_ta'
+NUMPY = 'numpy'
+ENGINE = settings.BOT_INDICATORS_ENGINE
+if ENGINE not in (PANDAS_TA, NUMPY):
+    raise ValueError(f'indicators engine invalid value: {ENGINE}')
+
+FLATS_SEARCH_STEP = 16
+
+
+def as_series(values: 'Series | numpy.ndarray') -> 'Series':
+    from pandas import Series
+    return values if isinstance(values, Series) else Series(values)
+
+
+def rsi(close: 'Series | numpy.ndarray', length: int = 14) -> numpy.ndarray:
+    """RSI of every bar, computed by the `ENGINE` of the settings."""
+    if ENGINE == NUMPY:
+        return indicators.rsi(close, length)
+    import pandas_ta
+    return pandas_ta.rsi(as_series(close), length).to_numpy()
 
 
 def volatility(
-    high: Series,
-    low: Series,
-    close: Series,
+    high: 'Series | numpy.ndarray',
+    low: 'Series | numpy.ndarray',
+    close: 'Series | numpy.ndarray',
     length: int = 14
-) -> DataFrame:
-    return pandas_ta.atr(high, low, close, length)
+) -> numpy.ndarray:
+    """ATR of every bar, computed by the `ENGINE` of the settings."""
+    if ENGINE == NUMPY:
+        return indicators.atr(high, low, close, length)
+    import pandas_ta
+    return pandas_ta.atr(
+        as_series(high),
+        as_series(low),
+        as_series(close),
+        length
+    ).to_numpy()
 
 
 def flats(
-    close: Series,
+    close: 'Series | numpy.ndarray',
     max_difference: float,
     min_length: int = 4,
 ) -> list[tuple[int, int]]:
+    close = numpy.asarray(close, dtype=numpy.float64)
+    size = close.shape[0]
     result = []
+    if size < 2:
+        return result
+    upper = 1.0 + max_difference / 100.0
+    lower = 1.0 - max_difference / 100.0
     first = 0
-    value = close.iloc[first]
-    high = value * (1.0 + max_difference / 100.0)
-    low = value * (1.0 - max_difference / 100.0)
-    for index in range(1, len(close)):
-        current = close.iloc[index]
-        if current < low or current > high:
-            if index - first >= min_length:
-                result.append((first, index))
-            first = index
-            high = current * (1.0 + max_difference / 100.0)
-            low = current * (1.0 - max_difference / 100.0)
-    else:
+    while True:
+        value = close[first]
+        index = _first_outside(close, first + 1, value * lower, value * upper)
+        if index == size:
+            break
         if index - first >= min_length:
             result.append((first, index))
+        first = index
+    if size - 1 - first >= min_length:
+        result.append((first, size - 1))
     return result
 
 
+def flats_batch(
+    close: numpy.ndarray,
+    max_difference: float,
+    min_length: int = 4,
+) -> list[list[tuple[int, int]]]:
+    """`flats` for every row of a (symbols, bars) array at once."""
+    close = numpy.asarray(close, dtype=numpy.float64)
+    count, size = close.shape
+    result = [[] for _ in range(count)]
+    if size < 2:
+        return result
+    upper = 1.0 + max_difference / 100.0
+    lower = 1.0 - max_difference / 100.0
+    first = numpy.zeros(count, dtype=numpy.int64)
+    high = close[:, 0] * upper
+    low = close[:, 0] * lower
+    for index in range(1, size):
+        current = close[:, index]
+        broken = (current < low) | (current > high)
+        if not broken.any():
+            continue
+        rows = numpy.flatnonzero(broken)
+        for row in rows[index - first[rows] >= min_length]:
+            result[row].append((int(first[row]), index))
+        first[rows] = index
+        high[rows] = current[rows] * upper
+        low[rows] = current[rows] * lower
+    for row in numpy.flatnonzero(size - 1 - first >= min_length):
+        result[row].append((int(first[row]), size - 1))
+    return result
+
+
+def _first_outside(
+    close: numpy.ndarray,
+    start: int,
+    low: float,
+    high: float
+) -> int:
+    size = close.shape[0]
+    step = FLATS_SEARCH_STEP
+    while start < size:
+        stop = min(start + step, size)
+        chunk = close[start:stop]
+        outside = (chunk < low) | (chunk > high)
+        if outside.any():
+            return start + int(outside.argmax())
+        start = stop
+        step *= 2
+    return size
+
+
 def poc_val_vah(
-    high: Series,
-    low: Series,
-    volume: Series,
+    high: 'Series | numpy.ndarray',
+    low: 'Series | numpy.ndarray',
+    volume: 'Series | numpy.ndarray',
     va: float = 68.0
 ) -> dict[str, float]:
-    threshold = volume.sum() * va / 100.0
-    total = 0.0
-    sorted = volume.sort_values(inplace=False, ascending=False)
-    for number in range(len(sorted)):
-        value = sorted.iloc[number]
-        total += value
-        if total >= threshold:
-            sorted = sorted[:number]
-            break
-    first = sorted.index[0]
-    poc = (high.loc[first] + low.loc[first]) / 2
-    val = low.loc[first]
-    vah = high.loc[first]
-    for number in range(1, len(sorted)):
-        index = sorted.index[number]
-        low_value = low.loc[index]
-        high_value = high.loc[index]
-        if low_value < val:
-            val = low_value
-        if high_value > vah:
-            vah = high_value
+    return value_areas(high, low, volume, [(0, len(volume))], va)[0]
+
+
+def value_areas(
+    high: numpy.ndarray,
+    low: numpy.ndarray,
+    volume: numpy.ndarray,
+    flats: list[tuple[int, int]],
+    va: float = 68.0
+) -> list[dict[str, float]]:
+    """POC, VAL and VAH of the bars `[first:last]` of every flat.
+
+    Bars of a flat are ranked by volume, the value area holds the top bars
+    accumulated before `va` percent of the flat volume is reached and
+    always at least the POC bar. Empty flats are skipped.
+    """
+    flats = [(first, last) for first, last in flats if last > first]
+    if not flats:
+        return []
+    high = numpy.asarray(high, dtype=numpy.float64)
+    low = numpy.asarray(low, dtype=numpy.float64)
+    volume = numpy.asarray(volume, dtype=numpy.float64)
+    starts = numpy.array([flat[0] for flat in flats], dtype=numpy.int64)
+    lengths = numpy.array([flat[1] for flat in flats]) - starts
+    offsets = numpy.cumsum(lengths) - lengths
+    segment = numpy.repeat(numpy.arange(len(flats)), lengths)
+    position = numpy.arange(lengths.sum()) - numpy.repeat(offsets, lengths)
+    index = position + numpy.repeat(starts, lengths)
+    index = index[numpy.lexsort((-volume[index], segment))]
+    sorted_volume = volume[index]
+    cumulative = numpy.cumsum(sorted_volume)
+    cumulative -= numpy.repeat(
+        cumulative[offsets] - sorted_volume[offsets],
+        lengths
+    )
+    thresholds = numpy.add.reduceat(sorted_volume, offsets) * va / 100.0
+    reached = numpy.where(
+        cumulative >= numpy.repeat(thresholds, lengths),
+        position,
+        numpy.repeat(lengths, lengths)
+    )
+    counts = numpy.maximum(numpy.minimum.reduceat(reached, offsets), 1)
+    included = position < numpy.repeat(counts, lengths)
+    val = numpy.minimum.reduceat(
+        numpy.where(included, low[index], numpy.inf),
+        offsets
+    )
+    vah = numpy.maximum.reduceat(
+        numpy.where(included, high[index], -numpy.inf),
+        offsets
+    )
+    first = index[offsets]
+    poc = (high[first] + low[first]) / 2
+    return [
+        {
+            'poc': float(poc[number]),
+            'val': float(val[number]),
+            'vah': float(vah[number]),
+        }
+        for number in range(len(flats))
+    ]
+
+
+def volume_profile(
+    high: numpy.ndarray,
+    low: numpy.ndarray,
+    volume: numpy.ndarray,
+    va: float = 68.0,
+    bins: int = 24
+) -> dict[str, float]:
+    """POC, VAL and VAH of a price-binned volume profile.
+
+    Volume of every bar is spread evenly over its high-low range. The
+    value area grows from the POC bin towards the heavier neighbour bin
+    until `va` percent of the volume is covered.
+    """
+    high = numpy.asarray(high, dtype=numpy.float64)
+    low = numpy.asarray(low, dtype=numpy.float64)
+    volume = numpy.asarray(volume, dtype=numpy.float64)
+    edges = numpy.linspace(low.min(), high.max(), bins + 1)
+    spread = high - low
+    overlap = numpy.clip(
+        numpy.minimum(high[:, None], edges[None, 1:]) -
+        numpy.maximum(low[:, None], edges[None, :-1]),
+        0.0,
+        None
+    )
+    weights = numpy.divide(
+        overlap,
+        spread[:, None],
+        out=numpy.zeros_like(overlap),
+        where=spread[:, None] > 0.0
+    )
+    flat = spread <= 0.0
+    if flat.any():
+        bin_index = numpy.clip(
+            numpy.searchsorted(edges, low[flat], side='right') - 1,
+            0,
+            bins - 1
+        )
+        weights[numpy.flatnonzero(flat), bin_index] = 1.0
+    profile = volume @ weights
+    threshold = profile.sum() * va / 100.0
+    first = last = int(profile.argmax())
+    total = profile[first]
+    while total < threshold and (first > 0 or last < bins - 1):
+        below = profile[first - 1] if first > 0 else -1.0
+        above = profile[last + 1] if last < bins - 1 else -1.0
+        if above >= below:
+            last += 1
+            total += above
+        else:
+            first -= 1
+            total += below
+    poc = int(profile.argmax())
     return {
-        'poc': poc,
-        'val': val,
-        'vah': vah,
+        'poc': float((edges[poc] + edges[poc + 1]) / 2),
+        'val': float(edges[first]),
+        'vah': float(edges[last + 1]),
     }
 
 
-def trend(high: Series, low: Series, close: Series, length: int = 14) -> int:
-    indicator = pandas_ta.adx(high[:-4], low[:-4], close[:-4], length)
-    value = indicator.iloc[-1]
-    pos = value[f'DMP_{length}']
-    neg = value[f'DMN_{length}']
+def trend(
+    high: 'Series | numpy.ndarray',
+    low: 'Series | numpy.ndarray',
+    close: 'Series | numpy.ndarray',
+    length: int = 14
+) -> int:
+    high = numpy.asarray(high, dtype=numpy.float64)
+    low = numpy.asarray(low, dtype=numpy.float64)
+    close = numpy.asarray(close, dtype=numpy.float64)
+    if ENGINE == NUMPY:
+        _, pos, neg = indicators.adx(high[:-4], low[:-4], close[:-4], length)
+        pos, neg = pos[-1], neg[-1]
+    else:
+        import pandas_ta
+        value = pandas_ta.adx(
+            as_series(high[:-4]),
+            as_series(low[:-4]),
+            as_series(close[:-4]),
+            length
+        ).iloc[-1]
+        pos, neg = value[f'DMP_{length}'], value[f'DMN_{length}']
+    return trend_change(
+        pos=pos,
+        neg=neg,
+        high=high,
+        low=low,
+        close=close
+    )
+
+
+def trend_change(
+    pos: float,
+    neg: float,
+    high: 'Series | numpy.ndarray',
+    low: 'Series | numpy.ndarray',
+    close: 'Series | numpy.ndarray'
+) -> int:
+    high = numpy.asarray(high)
+    low = numpy.asarray(low)
+    close = numpy.asarray(close)
     if pos > neg:
-        threshold = low.iloc[-4]
-        if (close.iloc[-3] < threshold and close.iloc[-2] < threshold and
-                close.iloc[-1] < threshold):
+        threshold = low[-4]
+        if (close[-3] < threshold and close[-2] < threshold and
+                close[-1] < threshold):
             return -1
     if neg > pos:
-        threshold = high.iloc[-4]
-        if (close.iloc[-3] > threshold and close.iloc[-2] > threshold and
-                close.iloc[-1] > threshold):
+        threshold = high[-4]
+        if (close[-3] > threshold and close[-2] > threshold and
+                close[-1] > threshold):
             return 1
     return 0
+
+
+def trend_changes(
+    pos: numpy.ndarray,
+    neg: numpy.ndarray,
+    high: numpy.ndarray,
+    low: numpy.ndarray,
+    close: numpy.ndarray,
+    ends: numpy.ndarray
+) -> numpy.ndarray:
+    """`trend_change` of the windows ending at every index of `ends`."""
+    lows = low[ends - 3]
+    highs = high[ends - 3]
+    closes = numpy.stack((close[ends - 2], close[ends - 1], close[ends]))
+    down = (pos > neg) & (closes < lows).all(axis=0)
+    up = (neg > pos) & (closes > highs).all(axis=0)
+    return numpy.where(down, -1, numpy.where(up, 1, 0))
+
+
+def wilder_windows(
+    values: numpy.ndarray,
+    ends: numpy.ndarray,
+    count: int,
+    length: int = 14
+) -> numpy.ndarray:
+    """Weighted sums of `rma` over the `count` values ending at `ends`.
+
+    An `rma` restarted at every window is this sum over the geometric sum
+    of the same weights, which is shared by every value of equal `count`.
+    Ratios of such sums need no division by it. NaN when `count` is below
+    `length`.
+    """
+    if count < length or not len(ends):
+        return numpy.full(len(ends), numpy.nan)
+    weights = (1.0 - 1.0 / length) ** numpy.arange(count - 1, -1, -1)
+    windows = numpy.lib.stride_tricks.sliding_window_view(values, count)
+    return windows[ends - count + 1] @ weights
+
+
+def wilder_denominator(count: int, length: int = 14) -> float:
+    decay = 1.0 - 1.0 / length
+    return (1.0 - decay ** count) / (1.0 - decay)
+
+
+def true_ranges(
+    high: numpy.ndarray,
+    low: numpy.ndarray,
+    close: numpy.ndarray
+) -> numpy.ndarray:
+    previous = numpy.concatenate(([numpy.nan], close[:-1]))
+    return numpy.maximum(
+        high - low,
+        numpy.maximum(numpy.abs(high - previous), numpy.abs(low - previous))
+    )
+
+
+def rsi_windows(
+    close: numpy.ndarray,
+    ends: numpy.ndarray,
+    window: int,
+    length: int = 14
+) -> numpy.ndarray:
+    """Last `rsi` of the `window` bars ending at every index of `ends`."""
+    difference = numpy.diff(close, prepend=numpy.nan)
+    positive = wilder_windows(
+        numpy.maximum(difference, 0.0), ends, window - 1, length
+    )
+    negative = wilder_windows(
+        numpy.maximum(-difference, 0.0), ends, window - 1, length
+    )
+    return 100.0 * positive / (positive + negative)
+
+
+def volatility_windows(
+    high: numpy.ndarray,
+    low: numpy.ndarray,
+    close: numpy.ndarray,
+    ends: numpy.ndarray,
+    window: int,
+    length: int = 14
+) -> numpy.ndarray:
+    """Last `volatility` of the `window` bars ending at `ends`."""
+    return wilder_windows(
+        true_ranges(high, low, close), ends, window - 1, length
+    ) / wilder_denominator(window - 1, length)
+
+
+def directions_windows(
+    high: numpy.ndarray,
+    low: numpy.ndarray,
+    close: numpy.ndarray,
+    ends: numpy.ndarray,
+    window: int,
+    length: int = 14
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Last `adx` +DI and -DI of the `window` bars ending at `ends`."""
+    up = numpy.diff(high, prepend=numpy.nan)
+    down = -numpy.diff(low, prepend=numpy.nan)
+    positive = numpy.where((up > down) & (up > 0.0), up, 0.0)
+    negative = numpy.where((down > up) & (down > 0.0), down, 0.0)
+    ranges = wilder_windows(
+        true_ranges(high, low, close), ends, window - 1, length
+    )
+    return (
+        100.0 * wilder_windows(positive, ends, window - 1, length) / ranges,
+        100.0 * wilder_windows(negative, ends, window - 1, length) / ranges,
+    )
+
+
+def flat_breaks(
+    close: numpy.ndarray,
+    max_difference: float,
+    horizon: int
+) -> numpy.ndarray:
+    """Index of the first later bar outside the flat band of every bar.
+
+    `len(close)` when no such bar is found within `horizon` bars.
+    """
+    size = close.shape[0]
+    low = close * (1.0 - max_difference / 100.0)
+    high = close * (1.0 + max_difference / 100.0)
+    breaks = numpy.full(size, size, dtype=numpy.int64)
+    pending = numpy.arange(size - 1)
+    for offset in range(1, horizon + 1):
+        pending = pending[pending + offset < size]
+        if not len(pending):
+            break
+        value = close[pending + offset]
+        broken = (value < low[pending]) | (value > high[pending])
+        breaks[pending[broken]] = pending[broken] + offset
+        pending = pending[~broken]
+    return breaks
+
+
+def flats_windows(
+    close: numpy.ndarray,
+    ends: numpy.ndarray,
+    window: int,
+    max_difference: float,
+    min_length: int = 4
+) -> list[list[tuple[int, int]]]:
+    """`flats` of the `window` bars ending at `ends`, indexed in `close`.
+
+    The flat breaks of every bar are found once, the flats of all windows
+    then follow the breaks from the window starts together.
+    """
+    close = numpy.asarray(close, dtype=numpy.float64)
+    ends = numpy.asarray(ends, dtype=numpy.int64)
+    breaks = flat_breaks(close, max_difference, window)
+    rows = []
+    firsts = []
+    lasts = []
+    active = numpy.arange(len(ends))
+    first = ends - window + 1
+    while len(active):
+        end = ends[active]
+        index = breaks[first]
+        inside = index <= end
+        found = inside & (index - first >= min_length)
+        tail = ~inside & (end - first >= min_length)
+        rows.extend((active[found], active[tail]))
+        firsts.extend((first[found], first[tail]))
+        lasts.extend((index[found], end[tail]))
+        active = active[inside]
+        first = index[inside]
+    result = [[] for _ in range(len(ends))]
+    if not rows:
+        return result
+    rows = numpy.concatenate(rows)
+    firsts = numpy.concatenate(firsts)
+    lasts = numpy.concatenate(lasts)
+    order = numpy.lexsort((firsts, rows))
+    for row, flat_first, flat_last in zip(
+        rows[order].tolist(),
+        firsts[order].tolist(),
+        lasts[order].tolist()
+    ):
+        result[row].append((flat_first, flat_last))
+    return result
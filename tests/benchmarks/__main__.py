@@ -0,0 +1,74 @@
+"""Indicator hot path benchmarks.
+
+Run with `python -m tests.benchmarks`, results are printed and written as
+JSON with `--output`. A run compared with `--baseline` exits with status
+1 when any case got slower than the baseline by more than `--threshold`.
+"""
+import argparse
+import json
+import platform
+import sys
+
+from tests.benchmarks.suite import (
+    get_cases,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m tests.benchmarks')
+    parser.add_argument('--select', default='',
+                        help='run only cases whose key contains this text')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write results as JSON here')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio reported as a regression')
+    return parser.parse_args()
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float
+) -> list[str]:
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result['best_us'] / baseline[key]['best_us']
+        mark = ''
+        if ratio > threshold:
+            regressions.append(key)
+            mark = ' REGRESSION'
+        print(f'{key:>40} {ratio:6.2f}x baseline{mark}')
+    return regressions
+
+
+def main() -> int:
+    args = parse_args()
+    results = {}
+    for case in get_cases(args.select):
+        result = case.run(args.repeat)
+        results[case.key] = result
+        print(f'{case.key:>40} {result["best_us"]:12.1f} us per call',
+              flush=True)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regressions over '
+                  f'{args.threshold:.2f}x')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
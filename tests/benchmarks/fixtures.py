@@ -0,0 +1,58 @@
+"""Deterministic synthetic candles for the benchmarks.
+
+Every fixture is generated from its (size, seed) pair only, so two runs on
+any machine time exactly the same inputs.
+"""
+import json
+
+from backend.candles import (
+    Candles,
+    decode_klines,
+)
+
+from tests.helpers import (
+    make_values,
+)
+
+SIZES = (30, 480, 1000)
+SYMBOLS = (1, 500)
+
+
+def make_candles(size: int, seed: int) -> Candles:
+    return Candles(make_values(size, seed))
+
+
+def make_response(size: int, seed: int) -> bytes:
+    """Kline endpoint response body, newest candle first as Bybit sends."""
+    values = make_values(size, seed)
+    rows = [
+        [str(int(values[0, index]) * 1000)] + [
+            repr(float(value)) for value in values[1:, index]
+        ]
+        for index in reversed(range(size))
+    ]
+    return json.dumps({
+        'retCode': 0,
+        'retMsg': 'OK',
+        'result': {'category': 'linear', 'list': rows},
+    }).encode()
+
+
+def decode_response(body: bytes) -> Candles:
+    """The decoding step of `BybitClient.get_candles` down to a frame."""
+    candles = Candles(decode_klines(json.loads(body)['result']['list']))
+    candles.frame
+    return candles
+
+
+def make_job_args(number: int, coins: int) -> list[str]:
+    """`/add` arguments of the job `number`, spread over `coins` coins."""
+    coin = f'COIN{number % coins}USDT'
+    kind = number % 4
+    if kind == 0:
+        return ['rsi', coin, '30', str(float(number % 90))]
+    if kind == 1:
+        return ['volatility', coin, '240', str(float(number % 7) / 10.0)]
+    if kind == 2:
+        return ['flats', coin, '1440', '1.0', str(4 + number % 20), '68.0']
+    return ['trend', coin, '60']
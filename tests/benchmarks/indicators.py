@@ -0,0 +1,90 @@
+"""RSI, ATR and ADX of many symbols: `pandas_ta` per symbol against one
+`backend.indicators` call over a `(symbols, bars)` array.
+
+Run with `python -m tests.benchmarks.indicators`.
+"""
+import argparse
+import statistics
+import time
+from typing import (
+    Callable,
+)
+
+import numpy
+from pandas import (
+    Series,
+)
+
+from backend import indicators
+from backend.candles import (
+    Candles,
+)
+
+from tests.benchmarks.fixtures import (
+    make_values,
+)
+
+SYMBOLS = (1, 100, 500)
+SIZE = 480
+LENGTH = 14
+SAMPLES = 5
+
+
+def measure(function: Callable[[], object]) -> float:
+    """Median seconds of one call."""
+    timings = []
+    for _ in range(SAMPLES):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(symbols: int, size: int) -> dict[str, tuple[float, float]]:
+    """Milliseconds of `pandas_ta` and of the batch, per indicator."""
+    import pandas_ta
+    candles = [Candles(make_values(size, seed)) for seed in range(symbols)]
+    series = [
+        (Series(data.high), Series(data.low), Series(data.close))
+        for data in candles
+    ]
+    high = numpy.vstack([data.high for data in candles])
+    low = numpy.vstack([data.low for data in candles])
+    close = numpy.vstack([data.close for data in candles])
+    cases = {
+        'rsi': (
+            lambda: [pandas_ta.rsi(c, LENGTH) for _, _, c in series],
+            lambda: indicators.rsi(close, LENGTH),
+        ),
+        'atr': (
+            lambda: [pandas_ta.atr(h, low, c, LENGTH) for h, low, c in series],
+            lambda: indicators.atr(high, low, close, LENGTH),
+        ),
+        'adx': (
+            lambda: [pandas_ta.adx(h, low, c, LENGTH) for h, low, c in series],
+            lambda: indicators.adx(high, low, close, LENGTH),
+        ),
+    }
+    return {
+        name: (measure(loop) * 1e3, measure(batch) * 1e3)
+        for name, (loop, batch) in cases.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m tests.benchmarks.indicators'
+    )
+    parser.add_argument('--symbols', type=int, nargs='+', default=SYMBOLS)
+    parser.add_argument('--size', type=int, default=SIZE)
+    args = parser.parse_args()
+    print(f'{"symbols":>8} {"indicator":>10} {"pandas_ta ms":>14} '
+          f'{"numpy ms":>10} {"speedup":>8}')
+    for symbols in args.symbols:
+        for name, (loop, batch) in run(symbols, args.size).items():
+            print(f'{symbols:>8} {name:>10} {loop:>14.2f} {batch:>10.2f} '
+                  f'{loop / batch:>8.1f}', flush=True)
+
+
+if __name__ == '__main__':
+    main()
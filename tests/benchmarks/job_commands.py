@@ -0,0 +1,112 @@
+"""Latency of the job commands with many registered jobs.
+
+Run with `python -m tests.benchmarks.job_commands`.
+"""
+import argparse
+import statistics
+import time
+from typing import (
+    Callable,
+)
+
+from backend.bybit import (
+    KLineInterval,
+)
+from backend.jobs import (
+    BotJobsShell,
+    EvaluationEngine,
+)
+
+from tests.benchmarks.fixtures import (
+    make_job_args,
+)
+from tests.helpers import (
+    RecordingQueue,
+    noop,
+)
+
+SIZES = (1_000, 10_000, 100_000)
+COINS = 200
+JOBS_PER_USER = 20
+SAMPLES = 200
+
+
+def measure(command: Callable[[int], object]) -> tuple[float, float]:
+    """Median and maximum microseconds of a command over sample users."""
+    timings = []
+    for sample in range(SAMPLES):
+        started = time.perf_counter()
+        command(sample)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(timings), max(timings)
+
+
+def run(size: int) -> dict[str, tuple[float, float]]:
+    engine = EvaluationEngine()
+    engine.clear()
+    queue = RecordingQueue()
+    users = max(1, size // JOBS_PER_USER)
+    for number in range(size):
+        BotJobsShell.add_job(
+            args=make_job_args(number, COINS),
+            user_id=number % users,
+            chat_id=number % users,
+            queue=queue,
+            callback=noop
+        )
+
+    def add(sample: int) -> None:
+        BotJobsShell.add_job(
+            args=['rsi', 'BENCHUSDT', '30', str(float(sample))],
+            user_id=sample % users,
+            chat_id=sample % users,
+            queue=queue,
+            callback=noop
+        )
+
+    def remove(sample: int) -> None:
+        BotJobsShell.remove_job(
+            args=['rsi', 'BENCHUSDT', '30', str(float(sample))],
+            user_id=sample % users,
+            queue=queue
+        )
+
+    def list_all(sample: int) -> None:
+        BotJobsShell.jobs_list([], sample % users, queue)
+
+    def list_rsi(sample: int) -> None:
+        BotJobsShell.jobs_list(['rsi'], sample % users, queue)
+
+    def candle_close(sample: int) -> None:
+        engine.get_due_groups(
+            f'COIN{sample % COINS}USDT',
+            KLineInterval.minute,
+            float(sample)
+        )
+
+    results = {
+        'add': measure(add),
+        'remove': measure(remove),
+        'list': measure(list_all),
+        'list rsi': measure(list_rsi),
+        'candle close': measure(candle_close),
+    }
+    engine.clear()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m tests.benchmarks.job_commands'
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    args = parser.parse_args()
+    print(f'{"jobs":>8} {"command":>14} {"median us":>12} {"max us":>12}')
+    for size in args.sizes:
+        for command, (median, maximum) in run(size).items():
+            print(f'{size:>8} {command:>14} {median:>12.1f} {maximum:>12.1f}',
+                  flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Startup rehydration of stored jobs.
+
+Run with `python -m tests.benchmarks.job_store`.
+"""
+import os
+import tempfile
+import time
+
+from backend.jobs import (
+    BotJobsShell,
+    EvaluationEngine,
+)
+from backend.storage import (
+    JobStore,
+)
+
+from tests.benchmarks.fixtures import (
+    make_job_args,
+)
+from tests.helpers import (
+    RecordingQueue,
+    noop,
+)
+
+JOBS = 50_000
+COINS = 200
+
+
+def make_records(count: int) -> list:
+    records = []
+    for number in range(count):
+        user_id = number // 5
+        prefix, *params = make_job_args(number, COINS)
+        name = f'{user_id}-{prefix}-{"-".join(params)}'
+        records.append((name, (user_id, user_id, prefix, params)))
+    return records
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'jobs.sqlite3')
+        store = JobStore(path)
+        started = time.perf_counter()
+        store.save_many(make_records(JOBS))
+        print(f'write {JOBS} jobs: {time.perf_counter() - started:.3f} s')
+        store.close()
+
+        started = time.perf_counter()
+        store = JobStore(path)
+        records = store.load()
+        loaded = time.perf_counter()
+        queue = RecordingQueue()
+        count = BotJobsShell.restore_jobs(queue, noop, store)
+        finished = time.perf_counter()
+        print(f'load {len(records)} jobs: {loaded - started:.3f} s')
+        print(f'restore {count} jobs into {len(queue.scheduled)} groups: '
+              f'{finished - loaded:.3f} s')
+        print(f'startup total: {finished - started:.3f} s')
+        store.close()
+        EvaluationEngine().clear()
+
+
+if __name__ == '__main__':
+    main()
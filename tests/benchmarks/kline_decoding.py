@@ -0,0 +1,73 @@
+"""Kline decoding: list-of-dicts DataFrame vs columnar arrays.
+
+Run with `python -m tests.benchmarks.kline_decoding`.
+"""
+import timeit
+
+from pandas import (
+    DataFrame,
+)
+
+from backend.candles import (
+    Candles,
+    decode_klines,
+)
+
+SIZES = (30, 480, 1000)
+NUMBER = 200
+
+
+def make_json_candles(size: int) -> list[list[str]]:
+    start = 1_700_000_000_000
+    return [
+        [
+            str(start - index * 60_000),
+            f'{100.0 + index % 7:.2f}',
+            f'{101.0 + index % 5:.2f}',
+            f'{99.0 - index % 3:.2f}',
+            f'{100.5 + index % 11:.2f}',
+            f'{1000.0 + index:.3f}',
+            f'{100000.0 + index:.3f}',
+        ]
+        for index in range(size)
+    ]
+
+
+def decode_frame(json_candles: list[list[str]]) -> DataFrame:
+    candles = [
+        {
+            Candles.START_TIME_COLUMN: float(candle[0]) / 1000.0,
+            Candles.OPEN_PRICE_COLUMN: float(candle[1]),
+            Candles.HIGH_PRICE_COLUMN: float(candle[2]),
+            Candles.LOW_PRICE_COLUMN: float(candle[3]),
+            Candles.CLOSE_PRICE_COLUMN: float(candle[4]),
+            Candles.VOLUME_COLUMN: float(candle[5]),
+            Candles.TURNOVER_COLUMN: float(candle[6]),
+        }
+        for candle in reversed(json_candles)
+    ]
+    return DataFrame(candles)
+
+
+def decode_candles(json_candles: list[list[str]]) -> Candles:
+    return Candles(decode_klines(json_candles))
+
+
+def decode_candles_frame(json_candles: list[list[str]]) -> DataFrame:
+    return Candles(decode_klines(json_candles)).frame
+
+
+def main() -> None:
+    for size in SIZES:
+        json_candles = make_json_candles(size)
+        for function in (decode_frame, decode_candles, decode_candles_frame):
+            seconds = timeit.timeit(
+                lambda: function(json_candles),
+                number=NUMBER
+            )
+            print(f'{function.__name__:>22} {size:>5} bars: '
+                  f'{seconds / NUMBER * 1e6:10.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""Benchmark cases of the indicator hot path.
+
+Each case times one function over every symbol of a fixture set, the
+result is reported per call.
+"""
+import math
+import time
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+)
+
+import numpy
+from pandas import (
+    Series,
+)
+
+from backend import indicators
+from backend import ta
+from backend.bybit import (
+    BybitClient,
+)
+from backend.candles import (
+    Candles,
+)
+
+from tests.benchmarks.fixtures import (
+    SIZES,
+    SYMBOLS,
+    decode_response,
+    make_response,
+)
+from tests.helpers import (
+    make_values,
+)
+
+FLATS_MAX_DIFFERENCE = 0.5
+FLATS_MIN_LENGTH = 8
+FLATS_VA = 68.0
+MIN_SECONDS = 0.2
+
+
+class Case:
+    """One benchmark: `function` applied to each prepared input."""
+
+    __slots__ = ('name', 'size', 'symbols', 'prepare', 'function')
+
+    def __init__(
+        self,
+        name: str,
+        size: int,
+        symbols: int,
+        prepare: Callable[[int, int], Any],
+        function: Callable[[Any], Any]
+    ) -> None:
+        self.name = name
+        self.size = size
+        self.symbols = symbols
+        self.prepare = prepare
+        self.function = function
+
+    @property
+    def key(self) -> str:
+        return f'{self.name}[{self.size}x{self.symbols}]'
+
+    def run(self, repeat: int) -> dict[str, float]:
+        inputs = [
+            self.prepare(self.size, seed) for seed in range(self.symbols)
+        ]
+        function = self.function
+
+        def loop() -> float:
+            started = time.perf_counter()
+            for value in inputs:
+                function(value)
+            return time.perf_counter() - started
+
+        first = loop()
+        number = max(1, math.ceil(MIN_SECONDS / max(first, 1e-9)))
+        timings = []
+        for _ in range(repeat):
+            timings.append(sum(loop() for _ in range(number)) / number)
+        calls = self.symbols
+        return {
+            'best_us': min(timings) / calls * 1e6,
+            'mean_us': sum(timings) / len(timings) / calls * 1e6,
+            'number': number,
+            'repeat': repeat,
+        }
+
+
+def prepare_series(size: int, seed: int) -> dict[str, Series]:
+    candles = Candles(make_values(size, seed))
+    return {
+        'high': candles[Candles.HIGH_PRICE_COLUMN],
+        'low': candles[Candles.LOW_PRICE_COLUMN],
+        'close': candles[Candles.CLOSE_PRICE_COLUMN],
+        'volume': candles[Candles.VOLUME_COLUMN],
+    }
+
+
+def prepare_arrays(size: int, seed: int) -> dict[str, numpy.ndarray]:
+    candles = Candles(make_values(size, seed))
+    return {
+        'high': candles.high,
+        'low': candles.low,
+        'close': candles.close,
+    }
+
+
+def prepare_candles(size: int, seed: int) -> Candles:
+    return Candles(make_values(size, seed))
+
+
+def fresh(function: Callable[[Candles], Any]) -> Callable[[Candles], Any]:
+    """Call on a new `Candles` each time, as for every fetched window."""
+    return lambda candles: function(Candles(candles.values))
+
+
+FUNCTIONS: dict[str, tuple[Callable, Callable]] = {
+    'ta.rsi': (
+        prepare_series,
+        lambda data: ta.rsi(data['close'])
+    ),
+    'ta.volatility': (
+        prepare_series,
+        lambda data: ta.volatility(data['high'], data['low'], data['close'])
+    ),
+    'ta.flats': (
+        prepare_series,
+        lambda data: ta.flats(
+            data['close'],
+            FLATS_MAX_DIFFERENCE,
+            FLATS_MIN_LENGTH
+        )
+    ),
+    'ta.poc_val_vah': (
+        prepare_series,
+        lambda data: ta.poc_val_vah(data['high'], data['low'], data['volume'])
+    ),
+    'ta.trend': (
+        prepare_series,
+        lambda data: ta.trend(data['high'], data['low'], data['close'])
+    ),
+    'indicators.rsi': (
+        prepare_arrays,
+        lambda data: indicators.rsi(data['close'])
+    ),
+    'indicators.atr': (
+        prepare_arrays,
+        lambda data: indicators.atr(data['high'], data['low'], data['close'])
+    ),
+    'indicators.adx': (
+        prepare_arrays,
+        lambda data: indicators.adx(data['high'], data['low'], data['close'])
+    ),
+    'BybitClient.rsi': (
+        prepare_candles,
+        fresh(BybitClient.rsi)
+    ),
+    'BybitClient.volatility': (
+        prepare_candles,
+        fresh(BybitClient.volatility)
+    ),
+    'BybitClient.flats': (
+        prepare_candles,
+        fresh(lambda candles: BybitClient.flats(
+            candles,
+            FLATS_MAX_DIFFERENCE,
+            FLATS_MIN_LENGTH,
+            FLATS_VA
+        ))
+    ),
+    'BybitClient.trend': (
+        prepare_candles,
+        fresh(BybitClient.trend)
+    ),
+    'decode': (
+        make_response,
+        decode_response
+    ),
+}
+
+
+def get_cases(select: str = '') -> Iterator[Case]:
+    for name, (prepare, function) in FUNCTIONS.items():
+        for size in SIZES:
+            for symbols in SYMBOLS:
+                case = Case(name, size, symbols, prepare, function)
+                if select in case.key:
+                    yield case
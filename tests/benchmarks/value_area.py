@@ -0,0 +1,89 @@
+"""Value area: per-bar pandas loops vs argsort + cumsum engine.
+
+Run with `python -m tests.benchmarks.value_area`.
+"""
+import timeit
+
+import numpy
+from pandas import (
+    Series,
+)
+
+from backend import ta
+
+SIZES = (30, 480, 1000)
+FLATS = 20
+NUMBER = 50
+
+
+def reference_poc_val_vah(
+    high: Series,
+    low: Series,
+    volume: Series,
+    va: float = 68.0
+) -> dict[str, float]:
+    threshold = volume.sum() * va / 100.0
+    total = 0.0
+    sorted = volume.sort_values(inplace=False, ascending=False)
+    for number in range(len(sorted)):
+        total += sorted.iloc[number]
+        if total >= threshold:
+            sorted = sorted[:max(number, 1)]
+            break
+    first = sorted.index[0]
+    val = low.loc[first]
+    vah = high.loc[first]
+    for number in range(1, len(sorted)):
+        index = sorted.index[number]
+        val = min(val, low.loc[index])
+        vah = max(vah, high.loc[index])
+    return {
+        'poc': (high.loc[first] + low.loc[first]) / 2,
+        'val': val,
+        'vah': vah,
+    }
+
+
+def make_arrays(size: int) -> tuple[numpy.ndarray, ...]:
+    generator = numpy.random.default_rng(size)
+    close = 100.0 * numpy.exp(numpy.cumsum(generator.normal(0, 0.002, size)))
+    high = close * (1.0 + generator.uniform(0.0, 0.01, size))
+    low = close * (1.0 - generator.uniform(0.0, 0.01, size))
+    volume = generator.uniform(1.0, 100.0, size)
+    return high, low, volume
+
+
+def main() -> None:
+    for size in SIZES:
+        high, low, volume = make_arrays(size * FLATS)
+        flats = [(number * size, (number + 1) * size)
+                 for number in range(FLATS)]
+        frames = [
+            (Series(high[first:last]), Series(low[first:last]),
+             Series(volume[first:last]))
+            for first, last in flats
+        ]
+        cases = {
+            'reference': lambda: [
+                reference_poc_val_vah(*frame) for frame in frames
+            ],
+            'poc_val_vah': lambda: [
+                ta.poc_val_vah(high[first:last], low[first:last],
+                               volume[first:last])
+                for first, last in flats
+            ],
+            'value_areas': lambda: ta.value_areas(high, low, volume, flats),
+            'volume_profile': lambda: [
+                ta.volume_profile(high[first:last], low[first:last],
+                                  volume[first:last])
+                for first, last in flats
+            ],
+        }
+        for name, case in cases.items():
+            seconds = timeit.timeit(case, number=NUMBER)
+            print(f'{name:>15} {size:>5} bars: '
+                  f'{seconds / NUMBER / FLATS * 1e6:10.1f} us per flat')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Stand-ins and data shared by the tests, benchmarks and the load driver."""
+import numpy
+
+START = 1_700_000_000
+STEP = 60
+
+
+def make_values(
+    size: int,
+    seed: int,
+    start: float = START
+) -> numpy.ndarray:
+    """Random walk candles, columns as returned by `decode_klines`."""
+    generator = numpy.random.default_rng((size, seed))
+    close = 100.0 * numpy.exp(numpy.cumsum(generator.normal(0, 0.002, size)))
+    open = numpy.concatenate(([close[0]], close[:-1]))
+    high = numpy.maximum(open, close) * (
+        1.0 + generator.uniform(0.0, 0.003, size)
+    )
+    low = numpy.minimum(open, close) * (
+        1.0 - generator.uniform(0.0, 0.003, size)
+    )
+    volume = generator.uniform(1.0, 1000.0, size).round(3)
+    start_time = start + STEP * numpy.arange(size, dtype=numpy.float64)
+    return numpy.vstack((
+        start_time,
+        open.round(4),
+        high.round(4),
+        low.round(4),
+        close.round(4),
+        volume,
+        (volume * close).round(4),
+    ))
+
+
+class RecordedJob:
+    """Stand-in for `telegram.ext.Job`."""
+
+    def schedule_removal(self) -> None:
+        pass
+
+
+class RecordingQueue:
+    """Stand-in for `telegram.ext.JobQueue` recording scheduled groups."""
+
+    def __init__(self) -> None:
+        self.scheduled = []
+
+    def run_repeating(self, **kwargs) -> RecordedJob:
+        self.scheduled.append(kwargs)
+        return RecordedJob()
+
+
+async def noop(context) -> None:
+    pass
@@ -0,0 +1,179 @@
+"""Load driver for the job pipeline against the local Bybit stand-in.
+
+Registers jobs through `BotJobsShell.add_job` and runs every evaluation
+group once per tick, as the job queue would when all of them are due.
+Reports tick latency, API calls per tick and alert throughput.
+
+Run with `python -m tests.load --jobs 5000`, or with `--url` against a
+server started by `python -m tests.load.server`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import urllib.request
+
+os.environ.setdefault('JOBS_DATABASE', '')
+
+from backend.bybit import (  # noqa: E402
+    BybitClient,
+)
+from backend.jobs import (  # noqa: E402
+    BotJobsShell,
+    EvaluationEngine,
+    EvaluationGroup,
+)
+from backend.limiter import (  # noqa: E402
+    TokenBucket,
+)
+
+from tests.benchmarks.fixtures import (  # noqa: E402
+    make_job_args,
+)
+from tests.helpers import (  # noqa: E402
+    RecordingQueue,
+    noop,
+)
+from tests.load.server import (  # noqa: E402
+    add_arguments,
+    make_mock,
+)
+
+
+def register_jobs(count: int, coins: int, users: int) -> float:
+    queue = RecordingQueue()
+    started = time.perf_counter()
+    for number in range(count):
+        user_id = number % users
+        BotJobsShell.add_job(
+            args=make_job_args(number, coins),
+            user_id=user_id,
+            chat_id=user_id,
+            queue=queue,
+            callback=noop
+        )
+    return time.perf_counter() - started
+
+
+def percentile(values: list[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def get_server_stats(url: str) -> dict[str, int]:
+    with urllib.request.urlopen(f'{url}/stats') as response:
+        return json.load(response)
+
+
+async def run_group(group: EvaluationGroup) -> tuple[float, int]:
+    started = time.perf_counter()
+    messages = await EvaluationEngine().evaluate(group)
+    return time.perf_counter() - started, len(messages)
+
+
+async def run_tick(url: str) -> dict[str, float]:
+    client = BybitClient()
+    client.cache.clear()
+    groups = list(EvaluationEngine().groups.values())
+    requests = get_server_stats(url)['requests']
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_group(group) for group in groups))
+    seconds = time.perf_counter() - started
+    calls = get_server_stats(url)['requests'] - requests
+    latencies = [latency for latency, _ in results]
+    alerts = sum(count for _, count in results)
+    return {
+        'groups': len(groups),
+        'seconds': seconds,
+        'group_p50': percentile(latencies, 0.5),
+        'group_p95': percentile(latencies, 0.95),
+        'group_max': max(latencies),
+        'api_calls': calls,
+        'alerts': alerts,
+        'alerts_per_second': alerts / seconds,
+    }
+
+
+async def drive(args: argparse.Namespace, url: str) -> list[dict]:
+    client = BybitClient()
+    if args.max_per_second or args.max_per_minute:
+        buckets = []
+        if args.max_per_second:
+            buckets.append(
+                TokenBucket(args.max_per_second, args.max_per_second)
+            )
+        if args.max_per_minute:
+            buckets.append(
+                TokenBucket(args.max_per_minute / 60.0, args.max_per_minute)
+            )
+        client.transport.limiter.buckets = buckets
+    ticks = []
+    for number in range(args.ticks):
+        tick = await run_tick(url)
+        ticks.append(tick)
+        print(
+            f'tick {number}: {tick["groups"]} groups in '
+            f'{tick["seconds"]:.2f} s, group p50 '
+            f'{tick["group_p50"] * 1000:.1f} ms p95 '
+            f'{tick["group_p95"] * 1000:.1f} ms max '
+            f'{tick["group_max"] * 1000:.1f} ms, '
+            f'{tick["api_calls"]} API calls, '
+            f'{tick["alerts"]} alerts '
+            f'({tick["alerts_per_second"]:.0f}/s)',
+            flush=True
+        )
+    print(f'limiter: {client.transport.limiter.stats}')
+    print(f'cache: {client.cache.stats}')
+    await client.close()
+    return ticks
+
+
+def start_server(args: argparse.Namespace) -> str:
+    """Serve the stand-in from its own thread and event loop."""
+    ready = threading.Event()
+    port = []
+
+    def run() -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        port.append(make_mock(args).listen())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return f'http://127.0.0.1:{port[0]}'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m tests.load')
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--coins', type=int, default=200)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=3)
+    parser.add_argument('--url', help='use a running stand-in server')
+    parser.add_argument('--max-per-second', type=float, default=0.0,
+                        help='client rate limit instead of the settings')
+    parser.add_argument('--max-per-minute', type=float, default=0.0)
+    parser.add_argument('--output', help='write tick results as JSON here')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    url = (args.url or start_server(args)).rstrip('/')
+    client = BybitClient()
+    client.url = url
+    seconds = register_jobs(args.jobs, args.coins, args.users)
+    engine = EvaluationEngine()
+    print(f'registered {args.jobs} jobs into {len(engine.groups)} groups '
+          f'in {seconds:.2f} s')
+    ticks = asyncio.run(drive(args, url))
+    print(f'server: {get_server_stats(url)}')
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(ticks, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""Local stand-in of the Bybit market endpoints.
+
+`v5/market/instruments-info` lists 200 symbols `COIN0USDT` and up, or the
+given ones, in pages. `v5/market/kline` candles are synthetic and
+deterministic for every (symbol, interval), or taken from a recorded JSON
+file of `{"SYMBOL:INTERVAL": [rows]}` with the rows newest first as Bybit
+returns them. Latency, server errors, 429 responses and the rate limit
+headers are configurable.
+
+Run with `python -m tests.load.server --port 8080` and point the bot at it
+with `BYBIT_API_URL=http://127.0.0.1:8080`.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import zlib
+
+import numpy
+from tornado.httpserver import (
+    HTTPServer,
+)
+from tornado.netutil import (
+    bind_sockets,
+)
+from tornado.web import (
+    Application,
+    RequestHandler,
+)
+
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+)
+
+KNUTH = numpy.uint64(2654435761)
+MASK = numpy.uint64(2 ** 32 - 1)
+
+
+class MarketData:
+    """Kline rows of any market, newest first."""
+
+    def __init__(
+        self,
+        recorded: dict[str, list[list[str]]] | None = None
+    ) -> None:
+        self.recorded = recorded or {}
+
+    @staticmethod
+    def noise(index: numpy.ndarray, seed: int, salt: int) -> numpy.ndarray:
+        """Uniform [0, 1) values depending only on the bar index."""
+        value = index.astype(numpy.uint64) * KNUTH
+        value += numpy.uint64((seed * 97 + salt * 7919) & 0xFFFFFFFF)
+        return (value & MASK).astype(numpy.float64) / 2.0 ** 32
+
+    def get_synthetic(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        last: float,
+        limit: int
+    ) -> list[list[str]]:
+        seconds = interval.seconds
+        seed = zlib.crc32(symbol.encode())
+        index = numpy.floor(last / seconds) - numpy.arange(limit + 1)
+        phase = seed % 628 / 100.0
+        base = 10.0 + seed % 1000
+
+        def price(index: numpy.ndarray) -> numpy.ndarray:
+            return base * (
+                1.0
+                + 0.03 * numpy.sin(2.0 * math.pi * index / 240.0 + phase)
+                + 0.01 * numpy.sin(2.0 * math.pi * index / 37.0)
+                + 0.004 * self.noise(index, seed, 0)
+            )
+
+        close = price(index)
+        open = close[1:]
+        close = close[:-1]
+        index = index[:-1]
+        high = numpy.maximum(open, close) * (
+            1.0 + 0.002 * self.noise(index, seed, 1)
+        )
+        low = numpy.minimum(open, close) * (
+            1.0 - 0.002 * self.noise(index, seed, 2)
+        )
+        volume = 100.0 + 900.0 * self.noise(index, seed, 3)
+        return [
+            [
+                str(int(index[row] * seconds * 1000)),
+                f'{open[row]:.4f}',
+                f'{high[row]:.4f}',
+                f'{low[row]:.4f}',
+                f'{close[row]:.4f}',
+                f'{volume[row]:.3f}',
+                f'{volume[row] * close[row]:.4f}',
+            ]
+            for row in range(limit)
+        ]
+
+    def get_klines(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        limit: int,
+        start: float | None,
+        end: float | None,
+        now: float
+    ) -> list[list[str]]:
+        last = now if end is None else min(end, now)
+        rows = self.recorded.get(f'{symbol}:{interval.value}')
+        if rows is None:
+            rows = self.get_synthetic(symbol, interval, last, limit)
+        else:
+            rows = [row for row in rows if int(row[0]) <= last * 1000][:limit]
+        if start is not None:
+            rows = [row for row in rows if int(row[0]) >= start * 1000]
+        return rows
+
+
+class MockBybit:
+    """Fault configuration and counters shared by the handlers.
+
+    `limit` requests are allowed per `window` seconds, further requests in
+    the window get `retCode` 10006. Of the remaining requests a fraction
+    `error_rate` fails with 500 and a fraction `throttle_rate` with 429.
+    """
+
+    def __init__(
+        self,
+        data: MarketData | None = None,
+        symbols: list[str] | None = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        limit: int = 600,
+        window: float = 5.0,
+        seed: int = 0
+    ) -> None:
+        self.data = data or MarketData()
+        self.symbols = symbols or [
+            f'COIN{number}USDT' for number in range(200)
+        ]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.limit = limit
+        self.window = window
+        self.random = random.Random(seed)
+        self.window_start = 0.0
+        self.window_count = 0
+        self.requests = 0
+        self.served = 0
+        self.errors = 0
+        self.throttled = 0
+        self.limited = 0
+
+    def take(self, now: float) -> tuple[int, float]:
+        """Remaining requests of the current window and its reset time."""
+        if now >= self.window_start + self.window:
+            self.window_start = now
+            self.window_count = 0
+        self.window_count += 1
+        return self.limit - self.window_count, self.window_start + self.window
+
+    def make_app(self) -> Application:
+        return Application(
+            [
+                (f'/{BybitClient.KLINE_ENDPOINT}', KlineHandler,
+                 {'mock': self}),
+                (f'/{BybitClient.INSTRUMENTS_ENDPOINT}', InstrumentsHandler,
+                 {'mock': self}),
+                ('/stats', StatsHandler, {'mock': self}),
+            ],
+            log_function=lambda handler: None
+        )
+
+    def listen(self, port: int = 0, address: str = '127.0.0.1') -> int:
+        sockets = bind_sockets(port, address)
+        HTTPServer(self.make_app()).add_sockets(sockets)
+        return sockets[0].getsockname()[1]
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            'requests': self.requests,
+            'served': self.served,
+            'errors': self.errors,
+            'throttled': self.throttled,
+            'limited': self.limited,
+        }
+
+
+class BybitHandler(RequestHandler):
+    """Latency, rate limit and faults shared by the endpoints."""
+
+    def initialize(self, mock: MockBybit) -> None:
+        self.mock = mock
+
+    def reply(self, ret_code: int, ret_msg: str, result: dict) -> None:
+        self.write({
+            'retCode': ret_code,
+            'retMsg': ret_msg,
+            'result': result,
+            'time': int(time.time() * 1000),
+        })
+
+    async def get(self) -> None:
+        mock = self.mock
+        mock.requests += 1
+        if mock.latency or mock.jitter:
+            await asyncio.sleep(
+                mock.latency + mock.random.uniform(0.0, mock.jitter)
+            )
+        now = time.time()
+        remaining, reset = mock.take(now)
+        self.set_header('X-Bapi-Limit', str(mock.limit))
+        self.set_header(BybitClient.LIMIT_STATUS_HEADER,
+                        str(max(remaining, 0)))
+        self.set_header(BybitClient.LIMIT_RESET_HEADER,
+                        str(int(reset * 1000)))
+        if remaining < 0:
+            mock.limited += 1
+            return self.reply(10006, 'Too many visits!', {})
+        roll = mock.random.random()
+        if roll < mock.error_rate:
+            mock.errors += 1
+            self.set_status(500)
+            return self.finish()
+        if roll < mock.error_rate + mock.throttle_rate:
+            mock.throttled += 1
+            self.set_header(BybitClient.RETRY_AFTER_HEADER,
+                            str(mock.retry_after))
+            self.set_status(429)
+            return self.finish()
+        self.serve(now)
+
+    def serve(self, now: float) -> None:
+        raise NotImplementedError()
+
+
+class KlineHandler(BybitHandler):
+
+    def serve(self, now: float) -> None:
+        mock = self.mock
+        try:
+            symbol = self.get_query_argument('symbol')
+            interval = KLineInterval(self.get_query_argument('interval'))
+            limit = int(self.get_query_argument('limit', '200'))
+            start = self.get_query_argument('start', None)
+            end = self.get_query_argument('end', None)
+        except Exception as error:
+            return self.reply(10001, f'params error: {error}', {})
+        rows = mock.data.get_klines(
+            symbol=symbol,
+            interval=interval,
+            limit=max(1, min(limit, BybitClient.KLINE_MAX_LIMIT)),
+            start=None if start is None else int(start) / 1000.0,
+            end=None if end is None else int(end) / 1000.0,
+            now=now
+        )
+        mock.served += 1
+        self.reply(0, 'OK', {
+            'symbol': symbol,
+            'category': 'linear',
+            'list': rows,
+        })
+
+
+class InstrumentsHandler(BybitHandler):
+
+    def serve(self, now: float) -> None:
+        mock = self.mock
+        try:
+            limit = int(self.get_query_argument('limit', '500'))
+            offset = int(self.get_query_argument('cursor', '') or 0)
+        except Exception as error:
+            return self.reply(10001, f'params error: {error}', {})
+        symbols = mock.symbols[offset:offset + limit]
+        following = offset + limit
+        mock.served += 1
+        self.reply(0, 'OK', {
+            'category': 'linear',
+            'list': [
+                {'symbol': symbol, 'status': 'Trading'}
+                for symbol in symbols
+            ],
+            'nextPageCursor': (
+                str(following) if following < len(mock.symbols) else ''
+            ),
+        })
+
+
+class StatsHandler(RequestHandler):
+
+    def initialize(self, mock: MockBybit) -> None:
+        self.mock = mock
+
+    def get(self) -> None:
+        self.write(self.mock.stats)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--limit', type=int, default=600,
+                        help='requests allowed per window')
+    parser.add_argument('--window', type=float, default=5.0)
+    parser.add_argument('--recorded', help='JSON file of recorded klines')
+
+
+def make_mock(args: argparse.Namespace) -> MockBybit:
+    recorded = None
+    if args.recorded:
+        with open(args.recorded) as file:
+            recorded = json.load(file)
+    return MockBybit(
+        data=MarketData(recorded),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        limit=args.limit,
+        window=args.window
+    )
+
+
+async def serve(args: argparse.Namespace) -> None:
+    port = make_mock(args).listen(args.port, args.address)
+    print(f'mock Bybit API on http://{args.address}:{port}', flush=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m tests.load.server')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--address', default='127.0.0.1')
+    add_arguments(parser)
+    asyncio.run(serve(parser.parse_args()))
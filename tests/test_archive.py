@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import numpy
+
+from backend.archive import (
+    download,
+    get_pages,
+)
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+)
+from backend.candles import (
+    CandlesArchive,
+    CandlesColumns,
+)
+
+from tests.helpers import (
+    make_values,
+)
+from tests.load.server import (
+    MockBybit,
+)
+
+
+def test_columns_append_grow_and_readers(tmp_path):
+    path = str(tmp_path / 'BTCUSDT_1.candles')
+    columns = CandlesColumns(path, capacity=4)
+    reader = CandlesColumns(path, readonly=True)
+    assert reader.values.shape == (7, 0)
+
+    assert columns.append(make_values(3, 0, start=0.0)) == 3
+    assert columns.append(make_values(4, 0, start=60.0)) == 2
+    assert reader.values[0].tolist() == [0.0, 60.0, 120.0, 180.0, 240.0]
+    assert columns.capacity == 8
+    assert columns.last_start == 240.0
+
+    view = columns.values
+    assert not view.flags.owndata
+    assert numpy.shares_memory(view, columns.values)
+
+    columns.flush()
+    assert CandlesColumns(path).values.tolist() == view.tolist()
+
+
+def test_pages_cover_range():
+    interval = KLineInterval.minute
+    pages = get_pages(0.0, 2500 * 60.0, interval)
+    assert pages == [
+        (0.0, 60000.0 - 0.001),
+        (60000.0, 120000.0 - 0.001),
+        (120000.0, 150000.0 - 0.001),
+    ]
+
+
+def test_download_and_restart_from_archive(tmp_path):
+
+    async def scenario():
+        mock = MockBybit()
+        port = mock.listen()
+        client = BybitClient()
+        client.url = f'http://127.0.0.1:{port}'
+        archive = CandlesArchive(str(tmp_path))
+        interval = KLineInterval.minute
+        try:
+            start = time.time() - 2500 * 60.0
+            added = await download(archive, 'BTCUSDT', interval, start)
+            values = archive.read('BTCUSDT', '1')
+            assert added == values.shape[1] >= 2499
+            assert (numpy.diff(values[0]) == 60.0).all()
+            assert values[0, -1] + 60.0 <= time.time()
+            assert mock.requests == 3
+            assert await download(archive, 'BTCUSDT', interval, start) <= 1
+
+            client.archive = archive
+            client.store.remove(('BTCUSDT', interval))
+            requests = mock.requests
+            candles = await client.fetch_candles('BTCUSDT', interval, 200)
+            assert mock.requests == requests + 1
+            assert len(candles) == 200
+            assert (numpy.diff(candles.start_time) == 60.0).all()
+            assert candles.start_time[-1] > archive.last_start('BTCUSDT', '1')
+        finally:
+            client.archive = None
+            await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_archive_window_takes_latest_candles(tmp_path):
+    archive = CandlesArchive(str(tmp_path))
+    archive.append('BTCUSDT', '1', make_values(5, 0, start=0.0))
+    assert archive.window('BTCUSDT', '1', 2)[0].tolist() == [180.0, 240.0]
+    assert archive.window('BTCUSDT', '1', 10).shape == (7, 5)
+    assert archive.window('BTCUSDT', '1', 0).shape == (7, 0)
+    assert archive.window('BTCUSDT', '1', -1).shape == (7, 0)
+    assert archive.window('ETHUSDT', '1', 2).shape == (7, 0)
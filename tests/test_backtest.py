@@ -0,0 +1,101 @@
+import sys
+
+import pytest
+
+from backend.backtest import (
+    Backtest,
+    main,
+    resample,
+)
+from backend.bybit import (
+    KLineInterval,
+)
+from backend.candles import (
+    Candles,
+    CandlesArchive,
+)
+from backend.jobs import (
+    FlatsJob,
+    RsiJob,
+    TrendJob,
+    VolatilityJob,
+)
+
+from tests.helpers import (
+    START,
+    make_values,
+)
+
+
+@pytest.mark.parametrize('helper', [
+    RsiJob(0, 'BTCUSDT', '30', '70.0'),
+    RsiJob(0, 'BTCUSDT', '240', '60.0'),
+    VolatilityJob(0, 'BTCUSDT', '30', '0.4'),
+    FlatsJob(0, 'BTCUSDT', '60', '0.3', '8', '68.0'),
+    FlatsJob(0, 'BTCUSDT', '1440', '1.0', '20', '68.0'),
+    TrendJob(0, 'BTCUSDT', '30'),
+    TrendJob(0, 'BTCUSDT', '240'),
+])
+def test_backtest_matches_evaluate(helper) -> None:
+    if not isinstance(helper, FlatsJob):
+        pytest.importorskip('pandas_ta')
+    backtest = Backtest(
+        {'BTCUSDT': make_values(6000, 3)},
+        KLineInterval.minute
+    )
+    report = backtest.run(helper)
+    coin, interval, limit = helper.get_market()
+    history = backtest.get_candles(coin, interval)
+    expected = []
+    for end in helper.get_ticks(history):
+        window = Candles(history.values[:, end - limit + 1:end + 1])
+        message = helper.evaluate(window)
+        if message:
+            close_time = float(history.start_time[end]) + interval.seconds
+            expected.append((close_time, message))
+    assert [time for time, _ in report] == [time for time, _ in expected]
+    for (_, message), (_, reference) in zip(report, expected):
+        if isinstance(helper, (RsiJob, VolatilityJob)):
+            assert float(message) == pytest.approx(float(reference), abs=0.01)
+        else:
+            assert message == reference
+
+
+def test_resample_merges_candles() -> None:
+    values = make_values(9, 1)
+    merged = resample(values, KLineInterval.minute, KLineInterval.minute_x3)
+    first = int((START // 180) * 180 == START)
+    assert merged.shape[0] == 7
+    assert merged[0, 1] - merged[0, 0] == 180.0
+    for column, candle in enumerate(merged.T[first:-1], start=first):
+        bars = values[:, (values[0] // 180) * 180 == candle[0]]
+        assert candle[1] == bars[1, 0]
+        assert candle[2] == bars[2].max()
+        assert candle[3] == bars[3].min()
+        assert candle[4] == bars[4, -1]
+        assert candle[5] == pytest.approx(bars[5].sum())
+
+
+@pytest.mark.parametrize('days, bars', [
+    ([], 3000),
+    (['--days', '1'], 1440),
+    (['--days', '0.0001'], 1),
+])
+def test_days_select_latest_bars(tmp_path, monkeypatch, capsys, days, bars):
+    CandlesArchive(str(tmp_path)).append('BTCUSDT', '1', make_values(3000, 2))
+    monkeypatch.setattr(sys, 'argv', [
+        'backtest', 'BTCUSDT', '--archive', str(tmp_path), '--summary',
+        '--job', 'flats {coin} 60 0.3 8 68', *days,
+    ])
+    main()
+    assert f'{bars} bars of 1 symbols' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('days', ['0', '-1'])
+def test_days_must_be_positive(monkeypatch, days):
+    monkeypatch.setattr(sys, 'argv', [
+        'backtest', 'BTCUSDT', '--archive', 'candles', '--days', days,
+        '--job', 'flats {coin} 60 0.3 8 68',
+    ])
+    with pytest.raises(SystemExit):
+        main()
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend.bybit import (
+    BybitClient,
+    RateLimitTransport,
+    RetryPolicy,
+)
+from backend.exceptions import (
+    BybitClientApiError,
+    BybitClientConnectionError,
+)
+from backend.limiter import (
+    Priority,
+)
+
+OK = {'retCode': 0, 'retMsg': 'OK', 'result': {}}
+
+
+class RecordingRetry(RetryPolicy):
+    """Retry policy with short delays recording every computed delay."""
+
+    def __init__(self, attempts: int = 3) -> None:
+        super().__init__(attempts, base_delay=0.001, max_delay=0.001)
+        self.delays: list[tuple[float | None, float]] = []
+
+    def get_delay(self, attempt: int, retry_after: float | None) -> float:
+        delay = super().get_delay(attempt, retry_after)
+        self.delays.append((retry_after, delay))
+        return delay
+
+
+def run_request(monkeypatch, responses: list[httpx.Response]) -> tuple:
+    """Result of `BybitClient.request` against `responses` in turn."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    client = BybitClient()
+    monkeypatch.setattr(client, 'url', 'http://bybit.test')
+    monkeypatch.setattr(client, 'transport', RateLimitTransport(0, 0))
+    retry = RecordingRetry()
+
+    async def scenario():
+        monkeypatch.setattr(client, 'client', httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ))
+        try:
+            return await client.request(
+                endpoint='v5/market/kline',
+                params={},
+                retry=retry,
+                priority=Priority.BACKGROUND,
+                user=None
+            )
+        finally:
+            await client.client.aclose()
+
+    try:
+        return asyncio.run(scenario()), len(calls), retry.delays, client
+    except Exception as error:
+        return error, len(calls), retry.delays, client
+
+
+def get_reset(seconds: float) -> str:
+    return str(int((time.time() + seconds) * 1000))
+
+
+def test_api_errors_are_not_retried(monkeypatch):
+    error, calls, delays, _ = run_request(monkeypatch, [
+        httpx.Response(200, json={'retCode': 10001, 'retMsg': 'symbol'}),
+    ])
+    assert isinstance(error, BybitClientApiError)
+    assert error.ret_code == 10001
+    assert (calls, delays) == (1, [])
+
+    error, calls, delays, _ = run_request(monkeypatch, [httpx.Response(404)])
+    assert isinstance(error, BybitClientConnectionError)
+    assert (calls, delays) == (1, [])
+
+
+def test_retry_after_is_honoured(monkeypatch):
+    result, calls, delays, _ = run_request(monkeypatch, [
+        httpx.Response(429, headers={'Retry-After': '0.05'}),
+        httpx.Response(200, json=OK),
+    ])
+    assert result == OK
+    assert calls == 2
+    assert delays == [(0.05, 0.05)]
+
+
+def test_exhausted_limit_waits_for_reset(monkeypatch):
+    result, calls, delays, client = run_request(monkeypatch, [
+        httpx.Response(
+            200,
+            json={'retCode': 10006, 'retMsg': 'Too many visits'},
+            headers={
+                'X-Bapi-Limit-Status': '0',
+                'X-Bapi-Limit-Reset-Timestamp': get_reset(0.3),
+            }
+        ),
+        httpx.Response(
+            200,
+            json=OK,
+            headers={
+                'X-Bapi-Limit-Status': '5',
+                'X-Bapi-Limit-Reset-Timestamp': get_reset(10.0),
+            }
+        ),
+    ])
+    assert result == OK
+    assert calls == 2
+    [(retry_after, delay)] = delays
+    assert 0.0 < retry_after <= delay <= 0.3
+    server = client.transport.limiter.server
+    assert server.rate == pytest.approx(0.5, rel=0.05)
+
+
+def test_backoff_stops_after_attempts(monkeypatch):
+    error, calls, delays, _ = run_request(monkeypatch, [httpx.Response(503)])
+    assert isinstance(error, BybitClientConnectionError)
+    assert isinstance(error.__cause__, httpx.HTTPStatusError)
+    assert calls == 3
+    assert [retry_after for retry_after, _ in delays] == [None, None]
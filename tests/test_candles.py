@@ -0,0 +1,196 @@
+import asyncio
+import types
+
+import numpy
+import pytest
+
+from backend import bybit
+from backend import candles
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+)
+from backend.candles import (
+    COLUMNS_COUNT,
+    Candles,
+    CandlesBuffer,
+    CandlesCache,
+    CandlesStore,
+)
+
+from tests.helpers import (
+    make_values,
+)
+
+
+def test_cache_coalesces_concurrent_loads():
+    calls = []
+
+    async def loader():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return 'value'
+
+    async def scenario():
+        cache = CandlesCache()
+        results = await asyncio.gather(*(
+            cache.get('key', loader, lambda value: float('inf'))
+            for _ in range(10)
+        ))
+        assert results == ['value'] * 10
+        assert await cache.get('key', loader, lambda value: 0.0) == 'value'
+        return cache.stats
+
+    stats = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert stats == {'hits': 1, 'misses': 1, 'coalesced': 9, 'entries': 1}
+
+
+def test_cache_error_reaches_every_waiter():
+    calls = []
+
+    async def loader():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        raise ValueError('failed')
+
+    async def scenario():
+        cache = CandlesCache()
+        results = await asyncio.gather(
+            *(
+                cache.get('key', loader, lambda value: float('inf'))
+                for _ in range(5)
+            ),
+            return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+        assert cache.peek('key') is None
+        with pytest.raises(ValueError):
+            await cache.get('key', loader, lambda value: float('inf'))
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_candles_expire_when_last_candle_closes(monkeypatch):
+    data = Candles(make_values(30, 0))
+    last_start = float(data.start_time[-1])
+    clock = types.SimpleNamespace(time=lambda: last_start)
+    monkeypatch.setattr(candles, 'time', clock)
+    client = BybitClient()
+    monkeypatch.setattr(client, 'cache', CandlesCache())
+    fetched = []
+
+    async def fetch_candles(symbol, interval, limit, priority, user):
+        fetched.append((symbol, interval, limit))
+        return data
+
+    monkeypatch.setattr(client, 'fetch_candles', fetch_candles)
+
+    async def scenario():
+        interval = KLineInterval.minute
+        assert await client.get_candles('BTCUSDT', interval, 30) is data
+        clock.time = lambda: last_start + interval.seconds - 0.001
+        assert await client.get_candles('BTCUSDT', interval, 30) is data
+        assert len(fetched) == 1
+        clock.time = lambda: last_start + interval.seconds
+        assert await client.get_candles('BTCUSDT', interval, 30) is data
+        assert len(fetched) == 2
+        assert await client.get_candles('BTCUSDT', interval, 20) is data
+        assert len(fetched) == 3
+
+    asyncio.run(scenario())
+    assert client.cache.stats == {
+        'hits': 1,
+        'misses': 3,
+        'coalesced': 0,
+        'entries': 2,
+    }
+
+
+def test_buffer_overwrites_forming_candle():
+    values = make_values(10, 0)
+    buffer = CandlesBuffer(8)
+    buffer.merge(values[:, :5])
+    forming = values[:, 4:7].copy()
+    forming[4, 0] += 1.0
+    buffer.merge(forming)
+    assert buffer.size == 7
+    assert buffer.last_start == values[0, 6]
+    window = buffer.window(7)
+    numpy.testing.assert_array_equal(window[:, :4], values[:, :4])
+    numpy.testing.assert_array_equal(window[:, 4:], forming)
+    values[4, 4] += 1.0
+    buffer.merge(values[:, 5:])
+    numpy.testing.assert_array_equal(buffer.window(8), values[:, 2:])
+
+
+def test_store_evicts_least_recently_used():
+    budget = bybit.CANDLES_STORE_MAX_BYTES
+    capacity = budget // (2 * COLUMNS_COUNT * 8)
+    store = CandlesStore(budget)
+    first, second, third = (CandlesBuffer(capacity) for _ in range(3))
+    store.put('first', first)
+    store.put('second', second)
+    assert store.nbytes == 2 * first.nbytes <= budget
+    assert store.get('first') is first
+    store.put('third', third)
+    assert store.get('second') is None
+    assert store.get('first') is first
+    assert store.get('third') is third
+    store.put('large', CandlesBuffer(2 * capacity + 1))
+    assert store.get('large') is None
+    assert store.stats == {
+        'buffers': 2,
+        'nbytes': 2 * first.nbytes,
+        'evictions': 1,
+    }
+
+
+def test_fetch_requests_only_missing_candles(monkeypatch):
+    history = make_values(1100, 1)
+    interval = KLineInterval.minute
+    clock = types.SimpleNamespace(time=lambda: 0.0)
+    visible = [0]
+    requests = []
+
+    async def get_klines(symbol, interval, limit, start=None, **kwargs):
+        requests.append((limit, start))
+        values = history[:, :visible[0]]
+        if start is None:
+            return values[:, -limit:]
+        return values[:, values[0] >= start][:, :limit]
+
+    def advance(count):
+        visible[0] = count
+        clock.time = lambda: float(history[0, count - 1]) + 10.0
+
+    client = BybitClient()
+    monkeypatch.setattr(bybit, 'time', clock)
+    monkeypatch.setattr(client, 'store', CandlesStore(1 << 20))
+    monkeypatch.setattr(client, 'archive', None)
+    monkeypatch.setattr(client, 'get_klines', get_klines)
+
+    async def fetch():
+        data = await client.fetch_candles('BTCUSDT', interval, 30)
+        numpy.testing.assert_array_equal(
+            data.values,
+            history[:, visible[0] - 30:visible[0]]
+        )
+
+    async def scenario():
+        advance(50)
+        await fetch()
+        assert requests.pop() == (30, None)
+        history[4, 49] += 1.0
+        advance(52)
+        await fetch()
+        assert requests.pop() == (3, history[0, 49])
+        advance(52)
+        await fetch()
+        assert requests.pop() == (1, history[0, 51])
+        advance(1100)
+        await fetch()
+        assert requests.pop() == (30, None)
+
+    asyncio.run(scenario())
@@ -0,0 +1,64 @@
+import asyncio
+
+import numpy
+import pytest
+
+from backend.executor import (
+    IndicatorsExecutor,
+)
+from backend.jobs import (
+    BotJobsShell,
+    evaluate_helpers,
+    evaluate_helpers_windows,
+)
+
+from tests.helpers import (
+    make_values,
+)
+
+JOBS = [
+    ['rsi', 'BTCUSDT', '240', '50'],
+    ['volatility', 'BTCUSDT', '240', '0.5'],
+    ['flats', 'BTCUSDT', '240', '0.3', '10', '68'],
+    ['trend', 'BTCUSDT', '240'],
+]
+
+
+def make_helpers() -> list:
+    return [
+        BotJobsShell.get_helper_class(prefix)(1, *params)
+        for prefix, *params in JOBS
+    ]
+
+
+def strip(results: list) -> list:
+    """Results without the measured seconds."""
+    return [result[:-2] + result[-1:] for result in results]
+
+
+@pytest.mark.parametrize('kind', ['thread', 'process'])
+def test_executor_matches_inline(kind):
+    values = make_values(960, 3)
+    ends = numpy.arange(239, 960, 240)
+    helpers = make_helpers()
+    expected = strip(evaluate_helpers(values[:, -240:], helpers))
+    expected_windows = strip(evaluate_helpers_windows(values, helpers, ends))
+    assert any(message for message, _ in expected)
+
+    async def scenario():
+        executor = IndicatorsExecutor(kind, 2)
+        try:
+            results = await executor.run(
+                evaluate_helpers, values[:, -240:], helpers
+            )
+            windows = await executor.run(
+                evaluate_helpers_windows, values, helpers, ends
+            )
+        finally:
+            executor.shutdown()
+        assert executor.stats['tasks'] == 2
+        return results, windows
+
+    results, windows = asyncio.run(scenario())
+    assert strip(results) == expected
+    assert strip(windows) == expected_windows
@@ -0,0 +1,89 @@
+import numpy
+import pytest
+from pandas import (
+    Series,
+)
+
+from backend import indicators
+from backend import ta
+
+SIZE = 600
+SYMBOLS = 8
+
+
+def make_prices(
+    seed: int,
+    shape: tuple[int, ...] = (SIZE,)
+) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    generator = numpy.random.default_rng(seed)
+    close = 100.0 * numpy.exp(
+        numpy.cumsum(generator.normal(0, 0.01, shape), axis=-1)
+    )
+    high = close * (1.0 + generator.uniform(0.0, 0.01, shape))
+    low = close * (1.0 - generator.uniform(0.0, 0.01, shape))
+    high[..., 100] = low[..., 100] = close[..., 100]
+    return high, low, close
+
+
+@pytest.mark.parametrize('length', [1, 2, 14, 30])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_indicators_match_pandas_ta(seed, length):
+    pandas_ta = pytest.importorskip('pandas_ta')
+    high, low, close = make_prices(seed)
+    numpy.testing.assert_allclose(
+        indicators.rsi(close, length),
+        pandas_ta.rsi(Series(close), length),
+        rtol=1e-12,
+        equal_nan=True
+    )
+    numpy.testing.assert_allclose(
+        indicators.atr(high, low, close, length),
+        pandas_ta.atr(Series(high), Series(low), Series(close), length),
+        rtol=1e-12,
+        equal_nan=True
+    )
+    expected = pandas_ta.adx(Series(high), Series(low), Series(close), length)
+    for result, column in zip(
+        indicators.adx(high, low, close, length),
+        ('ADX', 'DMP', 'DMN')
+    ):
+        numpy.testing.assert_allclose(
+            result,
+            expected[f'{column}_{length}'],
+            rtol=1e-12,
+            atol=1e-10,
+            equal_nan=True
+        )
+
+
+def test_batch_matches_rows():
+    high, low, close = make_prices(2, (SYMBOLS, SIZE))
+    rsi = indicators.rsi(close)
+    atr = indicators.atr(high, low, close)
+    adx = indicators.adx(high, low, close)
+    assert rsi.shape == atr.shape == (SYMBOLS, SIZE)
+    for row in range(SYMBOLS):
+        numpy.testing.assert_array_equal(rsi[row], indicators.rsi(close[row]))
+        numpy.testing.assert_array_equal(
+            atr[row],
+            indicators.atr(high[row], low[row], close[row])
+        )
+        for batch, single in zip(
+            adx,
+            indicators.adx(high[row], low[row], close[row])
+        ):
+            numpy.testing.assert_array_equal(batch[row], single)
+
+
+def test_engines_agree(monkeypatch):
+    pytest.importorskip('pandas_ta')
+    high, low, close = make_prices(3, (240,))
+    results = {}
+    for engine in (ta.PANDAS_TA, ta.NUMPY):
+        monkeypatch.setattr(ta, 'ENGINE', engine)
+        results[engine] = (
+            ta.rsi(close)[-1],
+            ta.volatility(high, low, close)[-1],
+            ta.trend(high, low, close),
+        )
+    numpy.testing.assert_allclose(results[ta.NUMPY], results[ta.PANDAS_TA])
@@ -0,0 +1,250 @@
+import asyncio
+import pickle
+import time
+
+import httpx
+import pytest
+
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+    RateLimitTransport,
+)
+from backend import jobs
+from backend import ta
+from backend.jobs import (
+    BotJobsShell,
+    EvaluationEngine,
+    EvaluationGroup,
+    FlatsJob,
+    RsiJob,
+    Subscription,
+)
+
+from tests.helpers import (
+    RecordingQueue,
+    noop,
+)
+from tests.load.server import (
+    MarketData,
+    MockBybit,
+)
+
+
+def test_helper_is_immutable_and_pickles():
+    helper = RsiJob(1, 'BTCUSDT', '30', '50')
+    assert helper.name == '1-rsi-BTCUSDT-30-50.0'
+    assert helper.name is helper.name
+    with pytest.raises(AttributeError):
+        helper._RsiJob__setpoint = 10.0
+    with pytest.raises(AttributeError):
+        helper.extra = 1
+    copy = pickle.loads(pickle.dumps(helper))
+    assert copy.name == helper.name
+    assert copy.title == helper.title == 'RSI[BTCUSDT, 30, 50.0]'
+
+
+def test_index_follows_commands():
+    engine = EvaluationEngine()
+    engine.clear()
+    queue = RecordingQueue()
+    jobs = [
+        (1, ['rsi', 'BTCUSDT', '30', '50']),
+        (1, ['trend', 'BTCUSDT', '60']),
+        (2, ['rsi', 'BTCUSDT', '30', '40']),
+        (1, ['rsi', 'ETHUSDT', '30', '50']),
+    ]
+    try:
+        for user_id, args in jobs:
+            BotJobsShell.add_job(list(args), user_id, user_id, queue, noop)
+        assert len(queue.scheduled) == 3
+        assert BotJobsShell.jobs_list(['rsi'], 1, queue) == (
+            'Jobs list:\nRSI[BTCUSDT, 30, 50.0]\nRSI[ETHUSDT, 30, 50.0]'
+        )
+        assert len(list(engine.find(1))) == 3
+        market = engine.index.markets[('BTCUSDT', KLineInterval.minute)]
+        assert len(market) == 2
+
+        BotJobsShell.remove_job(['trend', 'BTCUSDT', '60'], 1, queue)
+        assert [helper.title for helper in engine.find(1)] == [
+            'RSI[BTCUSDT, 30, 50.0]',
+            'RSI[ETHUSDT, 30, 50.0]',
+        ]
+        assert len(market) == 1
+        BotJobsShell.remove_job(['rsi', 'BTCUSDT', '30', '50'], 1, queue)
+        BotJobsShell.remove_job(['rsi', 'BTCUSDT', '30', '40'], 2, queue)
+        assert ('BTCUSDT', KLineInterval.minute) not in engine.index.markets
+        assert 2 not in engine.index.users
+        assert engine.get_due_groups('BTCUSDT', KLineInterval.minute, 0) == []
+    finally:
+        engine.clear()
+
+
+def test_commands_share_groups_and_keep_messages():
+    engine = EvaluationEngine()
+    engine.clear()
+    queue = RecordingQueue()
+    first = ['rsi', 'BTCUSDT', '30', '50']
+    second = ['rsi', 'BTCUSDT', '30', '40']
+    try:
+        assert BotJobsShell.add_job(list(first), 1, 1, queue, noop) == (
+            'Add job:\nRSI[BTCUSDT, 30, 50.0]'
+        )
+        assert BotJobsShell.add_job(list(second), 2, 2, queue, noop) == (
+            'Add job:\nRSI[BTCUSDT, 30, 40.0]'
+        )
+        assert len(queue.scheduled) == 1
+        group = queue.scheduled[0]['data']
+        assert list(engine.groups.values()) == [group]
+        assert len(group) == 2
+
+        assert BotJobsShell.add_job(list(first), 1, 3, queue, noop) == (
+            'Remove job:\nRSI[BTCUSDT, 30, 50.0]\n'
+            'Add job:\nRSI[BTCUSDT, 30, 50.0]'
+        )
+        assert len(queue.scheduled) == 1
+        assert len(group) == 2
+        assert group.subscriptions['1-rsi-BTCUSDT-30-50.0'].chat_id == 3
+
+        assert BotJobsShell.remove_job(list(first), 1, queue) == (
+            'Remove job:\nRSI[BTCUSDT, 30, 50.0]'
+        )
+        assert BotJobsShell.remove_job(list(first), 1, queue) is None
+        assert BotJobsShell.jobs_list([], 1, queue) == 'Jobs list:\n'
+        assert engine.groups and group.job is not None
+        BotJobsShell.remove_job(list(second), 2, queue)
+        assert not engine.groups and group.job is None
+    finally:
+        engine.clear()
+
+
+@pytest.mark.parametrize('timeframe', ['30', '1440'])
+def test_aligned_groups_tick_after_candle_closes(timeframe):
+    now = 1_700_000_123.4
+    groups = [
+        EvaluationGroup(EvaluationGroup.get_key(
+            FlatsJob(1, f'COIN{number}USDT', timeframe, '1.0', '10', '68')
+        ))
+        for number in range(300)
+    ]
+    candle = groups[0].key[1].seconds
+    slots = set()
+    for group in groups:
+        delay = group.get_delay(now)
+        assert 0.0 <= delay < group.interval
+        assert delay == group.get_delay(now)
+        tick = now + delay
+        assert jobs.SCHEDULE_SETTLE <= tick % candle < candle
+        assert (tick + group.interval) % candle == pytest.approx(
+            tick % candle
+        )
+        slots.add(int(tick % group.interval // candle))
+    assert len(slots) == group.interval // candle
+
+
+@pytest.mark.parametrize('aligned', [False, True])
+def test_groups_start_at_their_phase_only_if_aligned(monkeypatch, aligned):
+    monkeypatch.setattr(jobs, 'SCHEDULE_ALIGNED', aligned)
+    engine = EvaluationEngine()
+    engine.clear()
+    queue = RecordingQueue()
+    try:
+        BotJobsShell.add_job(['rsi', 'BTCUSDT', '30', '50'], 1, 1, queue, noop)
+        scheduled = queue.scheduled[0]
+        if aligned:
+            group = scheduled['data']
+            assert 0.0 <= scheduled['first'] < group.interval
+        else:
+            assert scheduled['first'] is None
+    finally:
+        engine.clear()
+
+
+def test_unchanged_candles_skip_evaluation(monkeypatch):
+    pytest.importorskip('pandas_ta')
+    monkeypatch.setattr(jobs, 'SKIP_UNCHANGED', True)
+
+    async def scenario():
+        data = MarketData()
+        recorded = {
+            'BTCUSDT:1': data.get_synthetic(
+                'BTCUSDT', KLineInterval.minute, 1_700_000_000.0, 30
+            ),
+        }
+        mock = MockBybit(data=MarketData(recorded))
+        port = mock.listen()
+        client = BybitClient()
+        client.url = f'http://127.0.0.1:{port}'
+        client.transport = RateLimitTransport(0, 0)
+        client.client = httpx.AsyncClient(transport=client.transport)
+        engine = EvaluationEngine()
+        group = EvaluationGroup(EvaluationGroup.get_key(
+            RsiJob(1, 'BTCUSDT', '30', '10')
+        ))
+        group.subscriptions['rsi'] = Subscription(
+            RsiJob(1, 'BTCUSDT', '30', '10'), 7
+        )
+        client.store.remove(('BTCUSDT', KLineInterval.minute))
+        runs, skips = engine.runs, engine.skips
+        try:
+            messages = await engine.evaluate(group)
+            assert messages and mock.requests == 1
+            assert await engine.evaluate(group) == []
+            assert mock.requests == 2
+            assert engine.skips == skips + 1
+
+            group.closed = time.time() - KLineInterval.minute.seconds
+            assert await engine.evaluate(group) == []
+            assert mock.requests == 2
+            assert engine.skips == skips + 2
+
+            group.version += 1
+            group.closed = None
+            assert await engine.evaluate(group) == messages
+            assert engine.skips == skips + 2
+            assert engine.runs == runs + 4
+        finally:
+            client.store.remove(('BTCUSDT', KLineInterval.minute))
+            await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_jobs_faster_than_candles_skip_forming_candles(monkeypatch):
+    monkeypatch.setattr(jobs, 'SKIP_UNCHANGED', True)
+    monkeypatch.setattr(ta, 'ENGINE', ta.NUMPY)
+    monkeypatch.setattr(RsiJob, 'job_interval', 20.0)
+    start = 1_700_000_040.0
+    now = [start]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+
+    async def scenario():
+        mock = MockBybit()
+        port = mock.listen()
+        client = BybitClient()
+        client.url = f'http://127.0.0.1:{port}'
+        client.transport = RateLimitTransport(0, 0)
+        client.client = httpx.AsyncClient(transport=client.transport)
+        engine = EvaluationEngine()
+        helper = RsiJob(1, 'BTCUSDT', '30', '10')
+        group = EvaluationGroup(EvaluationGroup.get_key(helper))
+        group.subscriptions[helper.name] = Subscription(helper, 7)
+        assert group.interval < KLineInterval.minute.seconds
+        client.store.remove(('BTCUSDT', KLineInterval.minute))
+        evaluated = jobs.GROUP_RUNS.labels('evaluated').value
+        unchanged = jobs.GROUP_RUNS.labels('unchanged').value
+        closed = []
+        try:
+            for _ in range(7):
+                now[0] += group.interval
+                await engine.evaluate(group)
+                closed.append(group.closed - start)
+            assert closed == [-60.0, -60.0, 0.0, 0.0, 0.0, 60.0, 60.0]
+            assert mock.requests == 3
+            assert jobs.GROUP_RUNS.labels('evaluated').value == evaluated + 3
+            assert jobs.GROUP_RUNS.labels('unchanged').value == unchanged + 4
+        finally:
+            client.store.remove(('BTCUSDT', KLineInterval.minute))
+            await client.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from backend.limiter import (
+    Priority,
+    RateLimiter,
+    TokenBucket,
+)
+
+
+def get_order(requests: list[tuple[str, Priority, object]]) -> list[str]:
+    """Tags of queued requests in the order the limiter lets them through."""
+
+    async def scenario():
+        limiter = RateLimiter([TokenBucket(1000.0, 1)])
+        order = []
+
+        async def acquire(tag, priority, user):
+            await limiter.acquire(priority, user)
+            order.append(tag)
+
+        assert await limiter.acquire() == 0.0
+        await asyncio.gather(*(
+            asyncio.create_task(acquire(*request)) for request in requests
+        ))
+        assert limiter.stats['requests'] == len(requests) + 1
+        assert limiter.stats['delayed'] == len(requests)
+        return order
+
+    return asyncio.run(scenario())
+
+
+def test_requests_keep_their_order():
+    requests = [
+        (str(number), Priority.BACKGROUND, None) for number in range(8)
+    ]
+    assert get_order(requests) == [tag for tag, _, _ in requests]
+
+
+def test_interactive_lane_goes_first():
+    requests = [
+        ('b1', Priority.BACKGROUND, 1),
+        ('b2', Priority.BACKGROUND, 1),
+        ('b3', Priority.BACKGROUND, 2),
+        ('i1', Priority.INTERACTIVE, 3),
+        ('i2', Priority.INTERACTIVE, 3),
+    ]
+    assert get_order(requests) == ['i1', 'i2', 'b1', 'b3', 'b2']
+
+
+def test_users_take_turns():
+    requests = [
+        ('a1', Priority.BACKGROUND, 'a'),
+        ('a2', Priority.BACKGROUND, 'a'),
+        ('a3', Priority.BACKGROUND, 'a'),
+        ('a4', Priority.BACKGROUND, 'a'),
+        ('b1', Priority.BACKGROUND, 'b'),
+        ('b2', Priority.BACKGROUND, 'b'),
+        ('c1', Priority.BACKGROUND, 'c'),
+    ]
+    assert get_order(requests) == ['a1', 'b1', 'c1', 'a2', 'b2', 'a3', 'a4']
+
+
+def test_server_allowance_keeps_pace():
+
+    async def scenario():
+        limiter = RateLimiter([])
+        now = asyncio.get_running_loop().time()
+        limiter.adjust(remaining=10, reset_in=10.0)
+        for _ in range(3):
+            limiter.consume(now, 0.0)
+        assert limiter.get_delay(now) == pytest.approx(3.0, abs=0.01)
+        limiter.adjust(remaining=7, reset_in=9.0)
+        assert limiter.server.rate == pytest.approx(7.0 / 9.0, abs=0.01)
+        assert limiter.get_delay(now) == pytest.approx(3.0, abs=0.01)
+        limiter.adjust(remaining=0, reset_in=5.0)
+        assert limiter.get_delay(now) == pytest.approx(5.0, abs=0.01)
+        assert limiter.get_delay(now + 5.1) == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_server_allowance_is_spread_over_window():
+    window = 0.5
+    allowance = 5
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        limiter = RateLimiter([TokenBucket(100.0, 1)])
+        start = loop.time()
+        window_end = start + window
+        served = []
+        sent = []
+
+        for _ in range(allowance + 1):
+            await limiter.acquire()
+            sent.append(loop.time() - start)
+            await asyncio.sleep(0.002)
+            now = loop.time()
+            if now >= window_end:
+                window_end += window * (1 + (now - window_end) // window)
+                served.clear()
+            served.append(now)
+            assert len(served) <= allowance
+            limiter.adjust(allowance - len(served), window_end - now)
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert sent[allowance - 1] > window / 2
+    assert sent[allowance] >= window
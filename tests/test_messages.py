@@ -0,0 +1,119 @@
+import asyncio
+
+from telegram.error import (
+    RetryAfter,
+)
+
+from backend import messages
+from backend.messages import (
+    MessageScheduler,
+    split_message,
+)
+
+
+class RecordingBot:
+
+    def __init__(self) -> None:
+        self.messages: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        self.messages.append((chat_id, text))
+
+
+def test_split_message_packs_texts_up_to_limit() -> None:
+    messages = split_message(['a' * 6, 'b' * 2, 'c' * 5, 'd' * 23], 10)
+    assert messages == [
+        'aaaaaa\n\nbb',
+        'ccccc',
+        'd' * 10,
+        'd' * 10,
+        'ddd',
+    ]
+    assert all(len(message) <= 10 for message in messages)
+
+
+def test_scheduler_merges_alerts_per_chat() -> None:
+    async def run() -> list[tuple[int, str]]:
+        bot = RecordingBot()
+        scheduler = MessageScheduler(bot, window=0.01)
+        for index in range(40):
+            scheduler.send(1, f'alert {index}')
+        scheduler.send(2, 'other')
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        assert scheduler.stats['sent'] == 2
+        assert scheduler.stats['queued'] == 0
+        return bot.messages
+
+    messages = asyncio.run(run())
+    assert sorted(chat_id for chat_id, _ in messages) == [1, 2]
+    text = dict(messages)[1]
+    assert text.split('\n\n') == [f'alert {index}' for index in range(40)]
+
+
+class FloodedBot(RecordingBot):
+    """Bot asking to wait before the first message to chat 1."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__()
+        self.retry_after = retry_after
+        self.times: dict[int, float] = {}
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        if chat_id == 1 and self.retry_after:
+            retry_after, self.retry_after = self.retry_after, 0.0
+            raise RetryAfter(retry_after)
+        self.times[chat_id] = asyncio.get_running_loop().time()
+        await super().send_message(chat_id, text)
+
+
+def test_retry_after_pauses_only_its_chat(monkeypatch) -> None:
+    monkeypatch.setattr(messages, 'CHAT_MAX_PER_SECOND', 100.0)
+
+    async def run() -> tuple[FloodedBot, float]:
+        bot = FloodedBot(retry_after=0.2)
+        scheduler = MessageScheduler(bot, window=0.0)
+        started = asyncio.get_running_loop().time()
+        scheduler.send(1, 'flooded')
+        scheduler.send(2, 'other')
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return bot, started
+
+    bot, started = asyncio.run(run())
+    assert sorted(bot.messages) == [(1, 'flooded'), (2, 'other')]
+    assert bot.times[2] - started < 0.1
+    assert bot.times[1] - started >= 0.2
+
+
+class BrokenBot(RecordingBot):
+    """Bot failing with a non Telegram error on the first message."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.broken = True
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        if self.broken:
+            self.broken = False
+            raise ValueError(text)
+        await super().send_message(chat_id, text)
+
+
+def test_unexpected_send_error_keeps_draining(monkeypatch) -> None:
+    monkeypatch.setattr(MessageScheduler, 'MAX_MESSAGE_LENGTH', 10)
+    monkeypatch.setattr(messages, 'CHAT_MAX_PER_SECOND', 100.0)
+
+    async def run() -> tuple[BrokenBot, dict[str, float]]:
+        bot = BrokenBot()
+        scheduler = MessageScheduler(bot, window=0.0)
+        for text in ('first', 'second', 'third'):
+            scheduler.send(1, text)
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return bot, scheduler.stats
+
+    bot, stats = asyncio.run(run())
+    assert bot.messages == [(1, 'second'), (1, 'third')]
+    assert stats['failed'] == 1
+    assert stats['sent'] == 2
@@ -0,0 +1,36 @@
+from backend.metrics import (
+    Counter,
+    Histogram,
+    MetricsRegistry,
+)
+
+
+def test_render_labelled_histogram_and_counter() -> None:
+    counter = Counter('test_sends_total', 'Sends.', ('chat',))
+    counter.labels('a"b').inc()
+    counter.labels('a"b').inc(2)
+    histogram = Histogram(
+        'test_latency_seconds',
+        'Latency.',
+        ('job',),
+        buckets=(0.1, 1.0)
+    )
+    histogram.labels('rsi').observe(0.05)
+    histogram.labels('rsi').observe(0.5)
+    histogram.labels('rsi').observe(5.0)
+    text = MetricsRegistry().render()
+    assert '# TYPE test_sends_total counter\n' in text
+    assert 'test_sends_total{chat="a\\"b"} 3\n' in text
+    assert 'test_latency_seconds_bucket{job="rsi",le="0.1"} 1\n' in text
+    assert 'test_latency_seconds_bucket{job="rsi",le="1"} 2\n' in text
+    assert 'test_latency_seconds_bucket{job="rsi",le="+Inf"} 3\n' in text
+    assert 'test_latency_seconds_sum{job="rsi"} 5.55\n' in text
+    assert 'test_latency_seconds_count{job="rsi"} 3\n' in text
+
+
+def test_render_stats_source() -> None:
+    registry = MetricsRegistry()
+    registry.add_stats('test_cache', lambda: {'hits': 2, 'ratio': 0.5})
+    text = registry.render()
+    assert 'test_cache_hits 2\n' in text
+    assert 'test_cache_ratio 0.5\n' in text
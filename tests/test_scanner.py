@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+    RateLimitTransport,
+)
+from backend.jobs import (
+    BotJobsShell,
+    EvaluationEngine,
+    EvaluationGroup,
+    Subscription,
+)
+
+from tests.load.server import (
+    MarketData,
+    MockBybit,
+)
+
+SYMBOLS = ['AUSDT', 'BUSDT', 'CUSDC', 'DUSDT']
+LAST = 1_700_000_000.0
+
+JOBS = [
+    (['rsi', '*USDT', '30', '50'], ['AUSDT', 'BUSDT', 'DUSDT']),
+    (['volatility', '*USDT', '240', '0.5'], ['AUSDT', 'BUSDT', 'DUSDT']),
+    (['flats', '*USDT', '240', '0.3', '10', '68'],
+     ['AUSDT', 'BUSDT', 'DUSDT']),
+    (['trend', '*USDT', '60'], ['AUSDT', 'BUSDT', 'DUSDT']),
+    (['rsi', '[AC]*', '240', '50'], ['AUSDT', 'CUSDC']),
+]
+
+
+def make_recorded() -> dict[str, list[list[str]]]:
+    data = MarketData()
+    return {
+        f'{symbol}:{interval.value}': data.get_synthetic(
+            symbol, interval, LAST, 500
+        )
+        for symbol in SYMBOLS
+        for interval in (KLineInterval.minute, KLineInterval.minute_x3)
+    }
+
+
+@pytest.mark.parametrize(
+    'args, symbols',
+    JOBS,
+    ids=[' '.join(args) for args, _ in JOBS]
+)
+def test_scanner_matches_single_symbol_jobs(args, symbols):
+    if not args[0] == 'flats':
+        pytest.importorskip('pandas_ta')
+
+    async def scenario():
+        mock = MockBybit(data=MarketData(make_recorded()), symbols=SYMBOLS)
+        port = mock.listen()
+        client = BybitClient()
+        client.url = f'http://127.0.0.1:{port}'
+        client.transport = RateLimitTransport(0, 0)
+        client.client = httpx.AsyncClient(transport=client.transport)
+        client.symbols_expires = 0.0
+        prefix, pattern, *params = args
+        helper_class = BotJobsShell.get_helper_class(prefix)
+        helper = helper_class(1, pattern, *params)
+        group = EvaluationGroup(EvaluationGroup.get_key(helper))
+        group.subscriptions[helper.name] = Subscription(helper, 7)
+        try:
+            assert group.scanner
+            messages = await EvaluationEngine().evaluate(group)
+            assert mock.requests == 1 + len(symbols)
+            expected = []
+            for symbol in symbols:
+                single = helper_class(1, symbol, *params)
+                _, interval, limit = single.get_market()
+                data = await client.get_candles(symbol, interval, limit)
+                text = single.evaluate(data)
+                if text:
+                    expected.append(f'{symbol}: {text}')
+            assert messages == (
+                [(7, '\n'.join([helper.title, *expected]))] if expected
+                else []
+            )
+        finally:
+            await client.close()
+
+    asyncio.run(scenario())
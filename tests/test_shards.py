@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend import shards
+from backend.bybit import (
+    BybitClient,
+    RateLimitTransport,
+)
+from backend.jobs import (
+    RsiJob,
+)
+from backend.shards import (
+    ShardsHub,
+    get_shard,
+)
+
+from tests.load.server import (
+    MockBybit,
+)
+
+COINS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']
+
+
+async def wait_for(condition, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.05)
+
+
+def test_workers_evaluate_with_candles_of_the_hub(monkeypatch):
+    pytest.importorskip('pandas_ta')
+    monkeypatch.setattr(shards, 'WATCH_INTERVAL', 0.1)
+
+    async def scenario():
+        mock = MockBybit()
+        port = mock.listen()
+        client = BybitClient()
+        client.url = f'http://127.0.0.1:{port}'
+        client.transport = RateLimitTransport(0, 0)
+        client.client = httpx.AsyncClient(transport=client.transport)
+        hub = ShardsHub(2)
+        received = []
+        helpers = [RsiJob(1, coin, '30', '10') for coin in COINS]
+        assert {
+            get_shard(*helper.get_market()[:2], 2) for helper in helpers
+        } == {0, 1}
+        try:
+            await hub.start(received.extend)
+            await wait_for(lambda: hub.stats['connected'] == 2)
+            # workers and the check below must see the same closed candles
+            seconds = time.time() % 60.0
+            if seconds > 45.0:
+                await asyncio.sleep(61.0 - seconds)
+            for chat_id, helper in enumerate(helpers):
+                hub.add(helper, chat_id, first=0.0)
+            await wait_for(lambda: len(received) == len(helpers))
+            expected = []
+            for chat_id, helper in enumerate(helpers):
+                coin, interval, limit = helper.get_market()
+                data = await client.get_candles(coin, interval, limit)
+                expected.append(
+                    (chat_id, f'{helper.title}\n{helper.evaluate(data)}')
+                )
+            assert sorted(received) == expected
+            assert mock.requests == len(helpers)
+            assert hub.stats['requests'] == len(helpers)
+
+            hub.processes[0].kill()
+            await wait_for(lambda: hub.stats['restarts'] == 1)
+            await wait_for(lambda: hub.stats['connected'] == 2)
+            hub.remove(helpers[0].name)
+            hub.clear()
+            assert hub.stats['subscriptions'] == 0
+        finally:
+            await hub.stop()
+            await client.close()
+
+    asyncio.run(scenario())
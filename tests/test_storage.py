@@ -0,0 +1,78 @@
+from backend.jobs import (
+    BotJobsShell,
+    EvaluationEngine,
+)
+from backend.storage import (
+    JobStore,
+)
+
+from tests.helpers import (
+    RecordingQueue,
+    noop,
+)
+
+JOBS = [
+    (1, 10, ['rsi', 'BTCUSDT', '30', '50']),
+    (1, 10, ['trend', 'BTCUSDT', '60']),
+    (2, 20, ['rsi', 'BTCUSDT', '30', '40']),
+    (2, 20, ['flats', 'ETHUSDT', '240', '1.0', '10', '68']),
+    (3, 30, ['volatility', 'ETHUSDT', '30', '0.5']),
+]
+
+
+def get_groups(engine: EvaluationEngine) -> dict:
+    return {
+        key: sorted(
+            (name, subscription.chat_id)
+            for name, subscription in group.subscriptions.items()
+        )
+        for key, group in engine.groups.items()
+    }
+
+
+def test_store_round_trips(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    store = JobStore(path)
+    store.save('a', 1, 10, 'rsi', ['BTCUSDT', '30', '50.0'])
+    store.save('a', 1, 11, 'rsi', ['BTCUSDT', '30', '40.0'])
+    store.save_many([
+        ('b', (2, 20, 'trend', ['ETHUSDT', '60'])),
+        ('c', (3, 30, 'rsi', ['SOLUSDT', '240', '70.0'])),
+    ])
+    store.delete('c')
+    store.delete('missing')
+    store.close()
+
+    store = JobStore(path)
+    assert sorted(store.load()) == [
+        (1, 11, 'rsi', ['BTCUSDT', '30', '40.0']),
+        (2, 20, 'trend', ['ETHUSDT', '60']),
+    ]
+    store.clear()
+    assert store.load() == []
+    store.close()
+
+
+def test_restore_rebuilds_groups(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(JobStore, 'get_instance', lambda: store)
+    engine = EvaluationEngine()
+    engine.clear()
+    try:
+        queue = RecordingQueue()
+        for user_id, chat_id, args in JOBS:
+            BotJobsShell.add_job(list(args), user_id, chat_id, queue, noop)
+        BotJobsShell.remove_job(['trend', 'BTCUSDT', '60'], 1, queue)
+        expected = get_groups(engine)
+        store.save('broken', 4, 40, 'rsi', ['BTCUSDT', '5', '50.0'])
+
+        engine.clear()
+        queue = RecordingQueue()
+        assert BotJobsShell.restore_jobs(queue, noop, store) == len(JOBS) - 1
+        assert get_groups(engine) == expected
+        assert {
+            scheduled['data'].key for scheduled in queue.scheduled
+        } == expected.keys()
+    finally:
+        engine.clear()
+        store.close()
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import numpy
+from tornado.web import (
+    Application,
+)
+from tornado.websocket import (
+    WebSocketHandler,
+)
+from tornado.testing import (
+    bind_unused_port,
+)
+from tornado.httpserver import (
+    HTTPServer,
+)
+
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+)
+from backend.candles import (
+    CandlesBuffer,
+)
+from backend.stream import (
+    KlineStream,
+)
+
+START = 1_700_000_000.0
+
+
+class BybitStandIn(WebSocketHandler):
+    """Local stand-in of the Bybit public kline stream."""
+
+    def initialize(self, server: dict) -> None:
+        self.server = server
+
+    def open(self) -> None:
+        self.server['connections'].append(self)
+
+    def on_message(self, message: str) -> None:
+        self.server['messages'].append(json.loads(message))
+
+    def send_kline(self, topic: str, start: float, confirm: bool) -> None:
+        self.write_message(json.dumps({
+            'topic': topic,
+            'type': 'snapshot',
+            'data': [{
+                'start': int(start * 1000),
+                'end': int(start * 1000) + 59999,
+                'interval': '1',
+                'open': '1.0',
+                'high': '2.0',
+                'low': '0.5',
+                'close': '1.5',
+                'volume': '10.0',
+                'turnover': '15.0',
+                'confirm': confirm,
+            }],
+        }))
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_kline_stream_feeds_store_and_resubscribes():
+
+    async def scenario():
+        server = {'connections': [], 'messages': []}
+        sock, port = bind_unused_port()
+        http = HTTPServer(Application([
+            (r'/v5/public/linear', BybitStandIn, {'server': server}),
+        ]))
+        http.add_sockets([sock])
+        buffer = CandlesBuffer.from_values(numpy.array([
+            [START - 60.0, START],
+            [1.0, 1.0], [1.0, 1.0], [1.0, 1.0], [1.0, 1.0],
+            [1.0, 1.0], [1.0, 1.0],
+        ]))
+        BybitClient().store.put(('BTCUSDT', KLineInterval.minute), buffer)
+        closed = []
+
+        async def callback(symbol, interval, start_time):
+            closed.append((symbol, interval, start_time))
+
+        stream = KlineStream()
+        stream.url = f'ws://127.0.0.1:{port}/v5/public/linear'
+        stream.RECONNECT_MIN_DELAY = 0.01
+        stream.subscribe('BTCUSDT', KLineInterval.minute)
+        stream.start(callback)
+        topic = 'kline.1.BTCUSDT'
+        try:
+            await wait_for(lambda: server['messages'])
+            assert server['messages'][0] == {'op': 'subscribe',
+                                             'args': [topic]}
+            connection = server['connections'][0]
+            connection.send_kline(topic, START, True)
+            await wait_for(lambda: closed)
+            assert closed == [('BTCUSDT', KLineInterval.minute, START)]
+            assert buffer.live
+            assert buffer.window(2)[4].tolist() == [1.0, 1.5]
+            connection.send_kline(topic, START + 60.0, False)
+            await wait_for(lambda: buffer.last_start == START + 60.0)
+
+            connection.close()
+            await wait_for(lambda: len(server['connections']) == 2)
+            await wait_for(lambda: len(server['messages']) == 2)
+            assert server['messages'][1] == server['messages'][0]
+
+            stream.unsubscribe('BTCUSDT', KLineInterval.minute)
+            await wait_for(lambda: len(server['messages']) == 3)
+            assert server['messages'][2] == {'op': 'unsubscribe',
+                                             'args': [topic]}
+            assert not buffer.live
+        finally:
+            await stream.stop()
+            http.stop()
+            await BybitClient().close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,143 @@
+import numpy
+import pytest
+from pandas import (
+    Series,
+)
+
+from backend import indicators
+from backend import jobs
+from backend.bybit import (
+    BybitClient,
+    KLineInterval,
+)
+from backend.candles import (
+    Candles,
+)
+from backend.jobs import (
+    EvaluationEngine,
+    RsiJob,
+)
+from backend.streaming import (
+    IndicatorsRegistry,
+    MarketIndicators,
+    StreamingAtr,
+    StreamingDirections,
+    StreamingRsi,
+)
+
+SIZE = 600
+LENGTH = 14
+
+
+@pytest.fixture
+def prices() -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    generator = numpy.random.default_rng(0)
+    close = 100.0 * numpy.exp(numpy.cumsum(generator.normal(0, 0.01, SIZE)))
+    high = close * (1.0 + generator.uniform(0.0, 0.01, SIZE))
+    low = close * (1.0 - generator.uniform(0.0, 0.01, SIZE))
+    high[200:220] = low[200:220] = close[200:220] = close[199]
+    return high, low, close
+
+
+def make_values(high, low, close) -> numpy.ndarray:
+    start_time = numpy.arange(len(close)) * 60.0
+    return numpy.stack([start_time, close, high, low, close, close, close])
+
+
+@pytest.mark.parametrize('window', [30, 240])
+def test_rsi_and_atr_match_their_window(prices, window):
+    high, low, close = prices
+    rsi = StreamingRsi(window, LENGTH)
+    atr = StreamingAtr(window, LENGTH)
+    for end in range(SIZE):
+        bar = high[end], low[end], close[end]
+        start = max(0, end + 1 - window)
+        expected_rsi = indicators.rsi(close[start:end + 1], LENGTH)[-1]
+        expected_atr = indicators.atr(
+            high[start:end + 1], low[start:end + 1], close[start:end + 1],
+            LENGTH
+        )[-1]
+        assert rsi.peek(*bar) == pytest.approx(expected_rsi, nan_ok=True)
+        assert atr.peek(*bar) == pytest.approx(expected_atr, nan_ok=True)
+        assert rsi.update(*bar) == pytest.approx(expected_rsi, nan_ok=True)
+        assert atr.update(*bar) == pytest.approx(expected_atr, nan_ok=True)
+
+
+def test_directions_match_their_window(prices):
+    high, low, close = prices
+    window = 232
+    directions = StreamingDirections(window, LENGTH)
+    for end in range(SIZE):
+        directions.update(high[end], low[end], close[end])
+        start = max(0, end + 1 - window)
+        _, dmp, dmn = indicators.adx(
+            high[start:end + 1], low[start:end + 1], close[start:end + 1],
+            LENGTH
+        )
+        assert directions.dmp == pytest.approx(dmp[-1], nan_ok=True)
+        assert directions.dmn == pytest.approx(dmn[-1], nan_ok=True)
+
+
+def test_market_indicators_continue_over_windows(prices):
+    values = make_values(*prices)
+    window = 240
+    market = MarketIndicators(window, LENGTH)
+    for end in (240, 241, 300, 301, 301, 450, 600, 500):
+        data = Candles(values[:, end - window:end])
+        market.feed(data)
+        assert market.rsi == pytest.approx(
+            indicators.rsi(data.close, LENGTH)[-1]
+        )
+        assert market.atr == pytest.approx(
+            indicators.atr(data.high, data.low, data.close, LENGTH)[-1]
+        )
+        _, dmp, dmn = indicators.adx(
+            data.high[:-8], data.low[:-8], data.close[:-8], LENGTH
+        )
+        assert market.directions(float(data.start_time[-9])) == (
+            pytest.approx(dmp[-1]),
+            pytest.approx(dmn[-1]),
+        )
+
+
+def test_market_indicators_match_pandas_ta(prices):
+    pandas_ta = pytest.importorskip('pandas_ta')
+    values = make_values(*prices)
+    market = MarketIndicators(30, LENGTH)
+    for end in (30, 31, 100):
+        data = Candles(values[:, end - 30:end])
+        market.feed(data)
+        close = Series(data.close)
+        expected = pandas_ta.rsi(close, LENGTH).iloc[-1]
+        assert market.rsi == pytest.approx(expected)
+        expected = pandas_ta.atr(
+            Series(data.high), Series(data.low), close, LENGTH
+        ).iloc[-1]
+        assert market.atr == pytest.approx(expected)
+
+
+def test_indicators_of_removed_groups_are_dropped(monkeypatch):
+    monkeypatch.setattr(jobs, 'STREAMING_INDICATORS', True)
+    registry = IndicatorsRegistry()
+    engine = EvaluationEngine()
+    engine.clear()
+    rsi = RsiJob(1, 'BTCUSDT', '30', '50')
+    other = RsiJob(2, 'BTCUSDT', '30', '40')
+    key = ('BTCUSDT', KLineInterval.minute, 30)
+    try:
+        engine.add(rsi, 1)
+        engine.add(other, 2)
+        data = Candles(make_values(*(
+            numpy.linspace(100.0, 130.0, 30) for _ in range(3)
+        )))
+        assert BybitClient.rsi(
+            data,
+            jobs.get_indicators(*rsi.get_market(), data)
+        ) == pytest.approx(100.0)
+        assert key in registry.markets
+        engine.remove(rsi.name)
+        assert key in registry.markets
+        engine.remove(other.name)
+        assert key not in registry.markets
+    finally:
+        engine.clear()
@@ -0,0 +1,121 @@
+import numpy
+import pytest
+from pandas import (
+    Series,
+)
+
+from backend import ta
+
+
+def reference_flats(
+    close: Series,
+    max_difference: float,
+    min_length: int = 4,
+) -> list[tuple[int, int]]:
+    result = []
+    first = 0
+    value = close.iloc[first]
+    high = value * (1.0 + max_difference / 100.0)
+    low = value * (1.0 - max_difference / 100.0)
+    for index in range(1, len(close)):
+        current = close.iloc[index]
+        if current < low or current > high:
+            if index - first >= min_length:
+                result.append((first, index))
+            first = index
+            high = current * (1.0 + max_difference / 100.0)
+            low = current * (1.0 - max_difference / 100.0)
+    else:
+        if index - first >= min_length:
+            result.append((first, index))
+    return result
+
+
+def random_close(generator: numpy.random.Generator, size: int) -> Series:
+    steps = generator.normal(0.0, generator.uniform(0.001, 0.02), size)
+    return Series(100.0 * numpy.exp(numpy.cumsum(steps)))
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_flats_matches_reference(seed):
+    generator = numpy.random.default_rng(seed)
+    close = random_close(generator, int(generator.integers(2, 1000)))
+    max_difference = float(generator.uniform(0.1, 5.0))
+    min_length = int(generator.integers(0, 30))
+    assert ta.flats(close, max_difference, min_length) == reference_flats(
+        close, max_difference, min_length
+    )
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_flats_batch_matches_flats(seed):
+    generator = numpy.random.default_rng(seed)
+    close = numpy.stack([
+        random_close(generator, 480).to_numpy() for _ in range(20)
+    ])
+    result = ta.flats_batch(close, 1.0, 10)
+    assert result == [ta.flats(row, 1.0, 10) for row in close]
+
+
+def reference_poc_val_vah(
+    high: Series,
+    low: Series,
+    volume: Series,
+    va: float = 68.0
+) -> dict[str, float]:
+    threshold = volume.sum() * va / 100.0
+    total = 0.0
+    sorted = volume.sort_values(inplace=False, ascending=False)
+    for number in range(len(sorted)):
+        value = sorted.iloc[number]
+        total += value
+        if total >= threshold:
+            sorted = sorted[:number]
+            break
+    first = sorted.index[0]
+    poc = (high.loc[first] + low.loc[first]) / 2
+    val = low.loc[first]
+    vah = high.loc[first]
+    for number in range(1, len(sorted)):
+        index = sorted.index[number]
+        low_value = low.loc[index]
+        high_value = high.loc[index]
+        if low_value < val:
+            val = low_value
+        if high_value > vah:
+            vah = high_value
+    return {
+        'poc': poc,
+        'val': val,
+        'vah': vah,
+    }
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_value_areas_match_reference(seed):
+    generator = numpy.random.default_rng(seed)
+    close = random_close(generator, 480)
+    high = close * (1.0 + generator.uniform(0.0, 0.01, 480))
+    low = close * (1.0 - generator.uniform(0.0, 0.01, 480))
+    volume = Series(generator.uniform(1.0, 100.0, 480))
+    flats = ta.flats(close, 0.5, 10)
+    result = ta.value_areas(high, low, volume, flats, 68.0)
+    assert len(result) == len(flats)
+    for (first, last), value in zip(flats, result):
+        expected = reference_poc_val_vah(
+            high.iloc[first:last],
+            low.iloc[first:last],
+            volume.iloc[first:last],
+            68.0
+        )
+        assert value == pytest.approx(expected)
+
+
+def test_value_areas_keep_dominant_bar():
+    result = ta.poc_val_vah(
+        high=numpy.array([2.0, 3.0, 4.0]),
+        low=numpy.array([1.0, 2.0, 3.0]),
+        volume=numpy.array([1.0, 100.0, 1.0]),
+        va=68.0
+    )
+    assert result == {'poc': 2.5, 'val': 2.0, 'vah': 3.0}